@@ -0,0 +1,51 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.barnes_hut_model import BarnesHutModel
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+def set_masses(model, masses):
+    model.masses = masses
+    model.source_masses = masses
+    model.sources = np.arange(len(masses))
+
+# Accuracy of the BarnesHutModel accelerations for a range of opening angles, measured against the
+# direct sum of VectorizedNewtonianMechanicsModel on a star cluster like (gaussian) distribution
+def accuracy_report(num_objects: int, dimension: int, opening_angles: list[float], seed: int = 0):
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(size=(num_objects, dimension)) * 1e11
+    masses = rng.uniform(1e20, 1e24, num_objects)
+
+    direct_sum_model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(dimension), [])
+    set_masses(direct_sum_model, masses)
+    start = perf_counter()
+    direct_sum_accelerations = direct_sum_model.accelerations(positions)
+    direct_sum_seconds = perf_counter() - start
+
+    print(f"{dimension}D, N={num_objects}, direct sum: {direct_sum_seconds:.3f} s")
+    print(f"{'theta':>6} {'median error':>13} {'99% error':>10} {'max error':>10} {'seconds':>8}")
+    for opening_angle in opening_angles:
+        model = BarnesHutModel(CartesianCoordinateSystem(dimension), [], opening_angle=opening_angle)
+        set_masses(model, masses)
+        start = perf_counter()
+        accelerations = model.accelerations(positions)
+        seconds = perf_counter() - start
+
+        relative_error = np.linalg.norm(accelerations - direct_sum_accelerations, axis=1) / np.linalg.norm(direct_sum_accelerations, axis=1)
+        print(f"{opening_angle:>6.2f} {np.median(relative_error):>13.2e} {np.percentile(relative_error, 99):>10.2e} {relative_error.max():>10.2e} {seconds:>8.3f}")
+    print()
+
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for dimension in [2, 3]:
+        accuracy_report(num_objects, dimension, [0.0, 0.2, 0.3, 0.5, 0.7, 1.0])
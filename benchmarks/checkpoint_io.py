@@ -0,0 +1,57 @@
+import os
+import pickle
+import sys
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.checkpoint import restore_checkpoint, write_checkpoint
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+def random_model(num_objects: int) -> VectorizedNewtonianMechanicsModel:
+    rng = np.random.default_rng(0)
+    objects = [PointParticle(1.0, Vector([0.0, 0.0, 0.0]), Vector([0.0, 0.0, 0.0])) for _ in range(num_objects)]
+    model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3))
+    model.set_state(objects, rng.normal(size=(num_objects, 3)), rng.normal(size=(num_objects, 3)), rng.uniform(size=num_objects))
+    return model
+
+# Time to write and restore checkpoints of num_objects objects, compared to pickling the model
+def checkpoint_report(num_objects: int, directory: str):
+    model = random_model(num_objects)
+    checkpoint_path = os.path.join(directory, 'model.ckpt')
+    pickle_path = os.path.join(directory, 'model.pickle')
+
+    print(f"{num_objects} objects")
+    for sync in [False, True]:
+        start = perf_counter()
+        write_checkpoint(checkpoint_path, model, sync)
+        print(f"write checkpoint{' (fsync)' if sync else ''}: {perf_counter() - start:.3f} s, {os.path.getsize(checkpoint_path) / 1e6:.1f} MB")
+
+    start = perf_counter()
+    restored_model = restore_checkpoint(checkpoint_path, VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3)))
+    print(f"restore checkpoint: {perf_counter() - start:.3f} s")
+    assert np.array_equal(restored_model.positions, model.positions)
+
+    start = perf_counter()
+    with open(pickle_path, 'wb') as file:
+        pickle.dump(model, file)
+    print(f"pickle: {perf_counter() - start:.3f} s, {os.path.getsize(pickle_path) / 1e6:.1f} MB")
+    start = perf_counter()
+    with open(pickle_path, 'rb') as file:
+        pickle.load(file)
+    print(f"unpickle: {perf_counter() - start:.3f} s")
+
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint_report(num_objects, directory)
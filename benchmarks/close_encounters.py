@@ -0,0 +1,37 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.spatial_index import UniformGridIndex
+
+# Time to find the pairs of num_objects objects within an encounter radius with the spatial hash grid of
+# EncounterDetector compared to checking all pairs, for uniformly spread objects with about 1% of them in an encounter
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    for num_objects in [1000, 4000, 16000, 64000]:
+        positions = rng.uniform(size=(num_objects, 3))
+        encounter_radius = (0.01 / num_objects * 3.0 / (4.0 * np.pi)) ** (1.0 / 3.0) * 2.0
+
+        start = perf_counter()
+        pairs = UniformGridIndex(positions, encounter_radius).pairs_within(encounter_radius)
+        grid_seconds = perf_counter() - start
+
+        report = f"{num_objects} objects, {len(pairs)} pairs: grid {grid_seconds:.4f} s"
+        if num_objects <= 16000:
+            start = perf_counter()
+            num_pairs = 0
+            # all pairs, in blocks of rows so the distance matrix fits in memory
+            for block_start in range(0, num_objects, 1000):
+                block = positions[block_start:block_start + 1000]
+                r_mag_squared = np.einsum('ijk,ijk->ij', block[:, np.newaxis] - positions, block[:, np.newaxis] - positions)
+                num_pairs += np.count_nonzero(np.triu(r_mag_squared <= encounter_radius ** 2, block_start + 1))
+            report += f", all pairs {perf_counter() - start:.4f} s ({num_pairs} pairs)"
+        print(report)
@@ -0,0 +1,26 @@
+import os
+import sys
+from time import perf_counter
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+    # the stub server of the tests
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../tst'))
+
+import_src()
+
+from gravity_lab.data import TrajectoryData
+from horizons_stub import StubHorizonsHandler, start_stub_server, stop_stub_server
+
+# Requests sent and wall time of loading the solar system from a cold and a warm cache
+if __name__ == "__main__":
+    server = start_stub_server()
+    for cache in ['cold', 'warm']:
+        num_requests = len(StubHorizonsHandler.requests)
+        start = perf_counter()
+        TrajectoryData.load_solar_system_from_jpl_horizons_system()
+        seconds = perf_counter() - start
+        print(f"{cache} cache: {len(StubHorizonsHandler.requests) - num_requests} requests, {seconds:.3f} s")
+    print(f"max concurrent requests: {StubHorizonsHandler.max_active_requests}")
+    stop_stub_server(server)
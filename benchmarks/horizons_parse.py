@@ -0,0 +1,100 @@
+from datetime import datetime
+import os
+import sys
+import tempfile
+from time import perf_counter
+import tracemalloc
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+    # the stub responses of the tests
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../tst'))
+
+import_src()
+
+from gravity_lab.data import parse_jpl_horizons_vector_table
+from horizons_stub import stub_vectors
+
+# The line splitting parser parse_jpl_horizons_ephemeris_vector used before the vector table parser, as a baseline
+def split_lines_parse(jpl_horizons_response: str) -> list[dict]:
+    vector_data_lines = []
+    after_start_str = False
+    for line in jpl_horizons_response.split('\n'):
+        if line == '$$EOE':
+            break
+        if after_start_str:
+            vector_data_lines.append(line)
+        if line == '$$SOE':
+            after_start_str = True
+
+    vector_data_lines = [vector_data_lines[i:i+4] for i in range(0, len(vector_data_lines), 4)]
+    vector_data = []
+    for vector_data_strs in vector_data_lines:
+        date_data = vector_data_strs[0].split(' ')
+        ephemeris_datetime = datetime.strptime(f"{date_data[3]} {date_data[4]}", "%Y-%b-%d %H:%M:%S.%f")
+
+        position_data = vector_data_strs[1].split(' ')
+        position_vector = {}
+        for i in range(len(position_data)):
+            offset = 1
+            if position_data[i] in ('X', 'Y', 'Z'):
+                if position_data[i+offset] == '=':
+                    offset += 1
+                position_vector[position_data[i].lower()] = float(position_data[i+offset][1:]) * 1000.0
+
+        velocity_data = vector_data_strs[2].split(' ')
+        velocity_vector = {}
+        for i in range(len(velocity_data)):
+            for axis in ('x', 'y', 'z'):
+                name = 'V' + axis.upper()
+                if velocity_data[i] == name or velocity_data[i] == name + '=':
+                    velocity_vector[axis] = float(velocity_data[i+1]) * 1000.0
+                elif velocity_data[i].startswith(name + '='):
+                    velocity_vector[axis] = float(velocity_data[i].split('=')[1]) * 1000.0
+
+        vector_data.append({'datetime': ephemeris_datetime, 'position': position_vector, 'velocity': velocity_vector})
+    return vector_data
+
+def measure(parse) -> tuple[float, float]:
+    # seconds, and peak traced memory in MB from a second run as tracing slows the parsers down
+    start = perf_counter()
+    parse()
+    seconds = perf_counter() - start
+
+    tracemalloc.start()
+    parse()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak_bytes / 1e6
+
+# Throughput of parsing a saved VECTORS response with num_epochs epochs, streamed from the file
+def throughput_report(num_epochs: int, directory: str):
+    text_path = os.path.join(directory, 'vectors.txt')
+    csv_path = os.path.join(directory, 'vectors_csv.txt')
+    with open(text_path, 'w') as file:
+        file.write(stub_vectors(399, num_epochs))
+    with open(csv_path, 'w') as file:
+        file.write(stub_vectors(399, num_epochs, csv=True))
+
+    def parse_file(path: str):
+        with open(path, 'r') as file:
+            return parse_jpl_horizons_vector_table(file)
+
+    def split_lines_parse_file(path: str):
+        with open(path, 'r') as file:
+            return split_lines_parse(file.read())
+
+    print(f"{num_epochs} epochs")
+    print(f"{'parser':>22} {'MB':>7} {'seconds':>8} {'MB/s':>7} {'epochs/s':>10} {'peak MB':>8}")
+    for name, path, parse in [('split lines (text)', text_path, split_lines_parse_file), ('vector table (text)', text_path, parse_file),
+            ('vector table (csv)', csv_path, parse_file)]:
+        size_mb = os.path.getsize(path) / 1e6
+        seconds, peak_mb = measure(lambda: parse(path))
+        print(f"{name:>22} {size_mb:>7.1f} {seconds:>8.3f} {size_mb / seconds:>7.1f} {num_epochs / seconds:>10.0f} {peak_mb:>8.1f}")
+    print()
+
+if __name__ == "__main__":
+    num_epochs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        throughput_report(num_epochs, directory)
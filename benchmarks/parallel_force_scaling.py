@@ -0,0 +1,54 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.force_backends import NumpyForceBackend, ProcessPoolForceBackend
+
+def best_time(backend, positions: np.ndarray, masses: np.ndarray, repeats: int) -> float:
+    # the first call starts the workers and allocates the shared memory
+    backend.accelerations(positions, positions, masses)
+    best_seconds = float('inf')
+    for _ in range(repeats):
+        start = perf_counter()
+        backend.accelerations(positions, positions, masses)
+        best_seconds = min(best_seconds, perf_counter() - start)
+    return best_seconds
+
+# Wall time of one all pairs force evaluation with ProcessPoolForceBackend for 1 to max_workers workers,
+# against NumpyForceBackend in this process. The workers only run in parallel on as many CPUs as the host has, so
+# the scaling is only measured on a multi-core host, up to os.cpu_count() workers
+def scaling_report(num_objects: int, max_workers: int, repeats: int = 3, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(size=(num_objects, 3)) * 1e11
+    masses = rng.uniform(1e20, 1e24, num_objects)
+
+    expected_accelerations = NumpyForceBackend().accelerations(positions, positions, masses)
+    numpy_seconds = best_time(NumpyForceBackend(), positions, masses, repeats)
+
+    print(f"N={num_objects}, {os.cpu_count()} cpus, numpy backend: {numpy_seconds:.3f} s")
+    if os.cpu_count() < 2:
+        print("a single cpu runs the workers one after another, the times do not show any scaling")
+    print(f"{'workers':>7} {'seconds':>8} {'vs numpy':>8} {'max error':>10}")
+    num_workers = 1
+    while num_workers <= max_workers:
+        with ProcessPoolForceBackend(num_workers) as backend:
+            seconds = best_time(backend, positions, masses, repeats)
+            accelerations = backend.accelerations(positions, positions, masses)
+
+        relative_error = np.linalg.norm(accelerations - expected_accelerations, axis=1) / np.linalg.norm(expected_accelerations, axis=1)
+        print(f"{num_workers:>7} {seconds:>8.3f} {numpy_seconds / seconds:>8.2f} {relative_error.max():>10.2e}")
+        num_workers *= 2
+    print()
+
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    scaling_report(num_objects, max_workers)
@@ -0,0 +1,70 @@
+import os
+import sys
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.simulation_process import SimulationProcess
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+DELTA = 1.0 / 120.0
+
+def random_model(num_objects: int) -> VectorizedNewtonianMechanicsModel:
+    rng = np.random.default_rng(0)
+    objects = [PointParticle(1e10, Vector(rng.normal(scale=1e3, size=2)), Vector(rng.normal(size=2))) for _ in range(num_objects)]
+    return VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(2), objects)
+
+# stands in for a window redrawing: pure Python work holding the GIL, with a pause between frames
+def redraw_load(seconds: float, busy_fraction: float):
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        frame_end = perf_counter() + busy_fraction / 60.0
+        while perf_counter() < frame_end:
+            pass
+        sleep((1.0 - busy_fraction) / 60.0)
+
+def thread_steps_per_second(num_objects: int, seconds: float, busy_fraction: float) -> float:
+    model = random_model(num_objects)
+    stop = Event()
+    def run():
+        while not stop.is_set():
+            model.step(DELTA)
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    redraw_load(seconds, busy_fraction)
+    stop.set()
+    thread.join()
+    return model.time / DELTA / seconds
+
+def process_steps_per_second(num_objects: int, seconds: float, busy_fraction: float) -> float:
+    simulation_process = SimulationProcess(random_model(num_objects), DELTA, speed_up=None)
+    simulation_process.start()
+    while simulation_process.latest_frame() is None:
+        sleep(0.01)
+    start_frame = simulation_process.latest_frame()
+    start = perf_counter()
+    redraw_load(seconds, busy_fraction)
+    frame = simulation_process.latest_frame()
+    elapsed = perf_counter() - start
+    simulation_process.stop()
+    return (frame.time - start_frame.time) / DELTA / elapsed
+
+# Steps per second of a model stepped in a thread of the UI process and in a SimulationProcess, while the main
+# thread spends a fraction of every 1/60 s frame redrawing
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seconds = 3.0
+    print(f"{num_objects} objects, steps per second")
+    for busy_fraction in [0.0, 0.5, 0.9]:
+        print(f"redraw {busy_fraction:.0%} of frame: thread {thread_steps_per_second(num_objects, seconds, busy_fraction):.0f}, "
+            f"process {process_steps_per_second(num_objects, seconds, busy_fraction):.0f}")
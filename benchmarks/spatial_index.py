@@ -0,0 +1,56 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.spatial_index import UniformGridIndex
+
+NUM_QUERIES = 1000
+
+# Time of nearest neighbour and radius queries on a UniformGridIndex of num_objects points compared to linear scans,
+# and of refreshing the index after the points moved a small step compared to building it again
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(num_objects, 3))
+    queries = rng.normal(size=(NUM_QUERIES, 3))
+
+    start = perf_counter()
+    index = UniformGridIndex(positions)
+    print(f"{num_objects} objects, build: {perf_counter() - start:.4f} s, cell size {index.cell_size:.3g}")
+
+    start = perf_counter()
+    for query in queries:
+        index.nearest(query)
+    print(f"nearest: index {(perf_counter() - start) / NUM_QUERIES * 1e6:.1f} us", end=', ')
+    start = perf_counter()
+    for query in queries:
+        np.argmin(np.linalg.norm(positions - query, axis=1))
+    print(f"linear scan {(perf_counter() - start) / NUM_QUERIES * 1e6:.1f} us")
+
+    radius = 2.0 * index.cell_size
+    start = perf_counter()
+    for query in queries:
+        index.within_radius(query, radius)
+    print(f"within radius: index {(perf_counter() - start) / NUM_QUERIES * 1e6:.1f} us", end=', ')
+    start = perf_counter()
+    for query in queries:
+        np.flatnonzero(np.linalg.norm(positions - query, axis=1) <= radius)
+    print(f"linear scan {(perf_counter() - start) / NUM_QUERIES * 1e6:.1f} us")
+
+    for step in [0.001, 0.01]:
+        moved_positions = positions + rng.normal(scale=step * index.cell_size, size=positions.shape)
+        start = perf_counter()
+        index.update(moved_positions)
+        update_seconds = perf_counter() - start
+        start = perf_counter()
+        UniformGridIndex(moved_positions, index.cell_size)
+        print(f"update after steps of {step:g} cells: {update_seconds:.4f} s, rebuild {perf_counter() - start:.4f} s")
+        positions = moved_positions
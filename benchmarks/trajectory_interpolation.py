@@ -0,0 +1,67 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.trajectory_store import Trajectory
+
+# Circular orbit of the Earth around the Sun, so the interpolated states can be compared to the exact ones
+ORBIT_RADIUS = 1.496e11
+ORBIT_PERIOD = 365.25 * 86400.0
+
+def circular_orbit(times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    angles = 2.0 * np.pi * times / ORBIT_PERIOD
+    speed = 2.0 * np.pi * ORBIT_RADIUS / ORBIT_PERIOD
+    positions = np.column_stack([ORBIT_RADIUS * np.cos(angles), ORBIT_RADIUS * np.sin(angles), np.zeros_like(angles)])
+    velocities = np.column_stack([-speed * np.sin(angles), speed * np.cos(angles), np.zeros_like(angles)])
+    return positions, velocities
+
+def sampled_orbit(step_seconds: float) -> Trajectory:
+    times = np.arange(0.0, ORBIT_PERIOD, step_seconds)
+    positions, velocities = circular_orbit(times)
+    columns = {'time': times}
+    for i, axis in enumerate(('x', 'y', 'z')):
+        columns[axis] = positions[:, i]
+        columns['v' + axis] = velocities[:, i]
+    return Trajectory(columns, is_sorted=True)
+
+# Largest position and velocity error of the Hermite and of linear interpolation between samples step_seconds apart
+def accuracy_report():
+    print(f"{'step':>8} {'hermite m':>12} {'hermite m/s':>12} {'linear m':>12}")
+    for step_hours in [1, 6, 24, 24 * 7]:
+        trajectory = sampled_orbit(step_hours * 3600.0)
+        times = np.linspace(0.0, float(trajectory.times[-1]), 100000)
+        exact_positions, exact_velocities = circular_orbit(times)
+        positions, velocities = trajectory.states_at(times)
+        linear_positions = np.column_stack([np.interp(times, trajectory.times, trajectory.columns[axis]) for axis in ('x', 'y', 'z')])
+
+        position_error = np.max(np.linalg.norm(positions - exact_positions, axis=1))
+        velocity_error = np.max(np.linalg.norm(velocities - exact_velocities, axis=1))
+        linear_error = np.max(np.linalg.norm(linear_positions - exact_positions, axis=1))
+        print(f"{str(step_hours) + ' h':>8} {position_error:>12.3e} {velocity_error:>12.3e} {linear_error:>12.3e}")
+    print()
+
+def lookup_report():
+    trajectory = sampled_orbit(3600.0)
+    times = np.random.default_rng(0).uniform(0.0, float(trajectory.times[-1]), 100000)
+
+    start = perf_counter()
+    trajectory.states_at(times)
+    batch_seconds = perf_counter() - start
+
+    start = perf_counter()
+    for time in times[:10000]:
+        trajectory.state_at(time)
+    single_seconds = perf_counter() - start
+    print(f"{len(trajectory)} samples: {len(times) / batch_seconds:.0f} states/s batched, {10000 / single_seconds:.0f} states/s one at a time")
+
+if __name__ == "__main__":
+    accuracy_report()
+    lookup_report()
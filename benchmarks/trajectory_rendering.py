@@ -0,0 +1,40 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.trajectory_store import Trajectory
+from gravity_lab.ui.rendering import polyline_pieces, screen_coordinates
+
+WIDTH, HEIGHT = 800, 600
+
+def orbit_trajectory(num_points: int, num_orbits: int = 10) -> Trajectory:
+    angles = np.linspace(0.0, 2.0 * np.pi * num_orbits, num_points)
+    zeros = np.zeros(num_points)
+    return Trajectory({'time': np.arange(num_points, dtype=np.float64), 'x': 1.5e11 * np.cos(angles), 'y': zeros,
+        'z': 1.5e11 * np.sin(angles), 'vx': zeros, 'vy': zeros, 'vz': zeros}, is_sorted=True)
+
+# Time to compute the canvas points of a trajectory of num_points points for a view, compared to the per point
+# transform of drawing every point as an oval (without the cost of the Tk calls, one per point)
+if __name__ == "__main__":
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    trajectory = orbit_trajectory(num_points)
+    positions = trajectory.positions()
+
+    for zoom in [1e-12, 1e-9, 1e-8]:
+        start = perf_counter()
+        pieces = polyline_pieces(screen_coordinates(positions, [0, 2], zoom, [WIDTH / 2, HEIGHT / 2]), WIDTH, HEIGHT, 16)
+        print(f"zoom {zoom:g}: {perf_counter() - start:.3f} s, {len(pieces)} polylines of {sum(len(coordinates) // 2 for _, coordinates in pieces)} points in total")
+
+    start = perf_counter()
+    for i in range(num_points):
+        position = trajectory.position(i)
+        (position[0] * 1e-9) + WIDTH / 2, (position[2] * 1e-9) + HEIGHT / 2
+    print(f"per point transform: {perf_counter() - start:.3f} s for {num_points} ovals")
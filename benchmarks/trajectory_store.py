@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+import tracemalloc
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.trajectory_store import TRAJECTORY_COLUMNS, Trajectory, open_trajectory_file, write_trajectory_file
+
+def random_trajectory(num_samples: int) -> Trajectory:
+    columns = {column: np.random.default_rng(0).normal(size=num_samples) for column in TRAJECTORY_COLUMNS[1:]}
+    columns['time'] = np.arange(num_samples) * 3600.0
+    return Trajectory(columns, is_sorted=True)
+
+# The list of dicts of datetimes and Vectors used to store trajectories before the trajectory store, as a baseline
+def list_of_dicts(trajectory: Trajectory) -> list[dict]:
+    return [{'datetime': trajectory.datetime(i), 'coordinate': trajectory.position(i), 'velocity': trajectory.velocity(i)}
+        for i in range(len(trajectory))]
+
+def measure_memory(function) -> tuple[object, float]:
+    tracemalloc.start()
+    result = function()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak_bytes / 1e6
+
+# Size, open time and random access time of a trajectory file of num_objects objects with num_samples samples each
+def trajectory_store_report(num_objects: int, num_samples: int, directory: str):
+    path = os.path.join(directory, 'trajectories.gltraj')
+    object_trajectories = {f"object {i}": ({'mass_kg': 1.0}, random_trajectory(num_samples)) for i in range(num_objects)}
+    write_trajectory_file(path, 'benchmark', object_trajectories)
+
+    start = perf_counter()
+    _, opened_trajectories = open_trajectory_file(path)
+    open_seconds = perf_counter() - start
+
+    _, in_memory_mb = measure_memory(lambda: {name: list_of_dicts(trajectory) for name, (_, trajectory) in object_trajectories.items()})
+
+    num_lookups = 100000
+    lookups = [(random.choice(list(opened_trajectories)), random.uniform(0.0, (num_samples - 1) * 3600.0)) for _ in range(num_lookups)]
+    start = perf_counter()
+    for name, time in lookups:
+        trajectory = opened_trajectories[name][1]
+        trajectory.position(trajectory.index(time))
+    lookup_seconds = perf_counter() - start
+
+    print(f"{num_objects} objects x {num_samples} samples")
+    print(f"file: {os.path.getsize(path) / 1e6:.1f} MB, list of dicts in memory: {in_memory_mb:.1f} MB")
+    print(f"open: {open_seconds * 1e3:.2f} ms")
+    print(f"random lookups: {num_lookups / lookup_seconds:.0f} /s")
+
+if __name__ == "__main__":
+    num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        trajectory_store_report(10, num_samples, directory)
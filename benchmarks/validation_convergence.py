@@ -0,0 +1,59 @@
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.data import TrajectoryData
+from gravity_lab.integrators import LeapfrogIntegrator, WisdomHolmanIntegrator, YoshidaIntegrator, kepler_drift
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.trajectory_store import Trajectory
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+SUN_MASS = 1.98847e30
+AU = 1.495978707e11
+DAY = 86400.0
+
+# Sun and planets of negligible mass on Kepler orbits (semi-major axis in AU, eccentricity), so the exact trajectories are known
+PLANET_ORBITS = {'Mercury': (0.387, 0.206), 'Earth': (1.0, 0.017), 'Jupiter': (5.2, 0.049)}
+
+def kepler_trajectory_data(num_days: int) -> TrajectoryData:
+    times = np.arange(num_days + 1) * DAY
+    mu = gravitational_constant * SUN_MASS
+    object_trajectories = {'Sun': ({'mass_kg': SUN_MASS}, Trajectory({'time': times, **{column: np.zeros(len(times)) for column in ['x', 'y', 'z', 'vx', 'vy', 'vz']}}))}
+    for name, (semi_major_axis, eccentricity) in PLANET_ORBITS.items():
+        # starting at perihelion
+        perihelion = semi_major_axis * AU * (1.0 - eccentricity)
+        speed = np.sqrt(mu * (1.0 + eccentricity) / perihelion)
+        positions, velocities = kepler_drift(np.tile([perihelion, 0.0, 0.0], (len(times), 1)), np.tile([0.0, speed, 0.0], (len(times), 1)), mu, times)
+        columns = {'time': times}
+        for i, axis in enumerate(('x', 'y', 'z')):
+            columns[axis] = positions[:, i]
+            columns['v' + axis] = velocities[:, i]
+        object_trajectories[name] = ({'mass_kg': 1.0}, Trajectory(columns))
+    return TrajectoryData("Kepler orbits", object_trajectories)
+
+# Largest final position error of the planets against the force evaluations for decreasing step sizes, run as one sweep
+if __name__ == "__main__":
+    trajectory_data = kepler_trajectory_data(365)
+    model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3))
+    delta_steps = [DAY * 2 ** -i for i in range(5)]
+    integrators = [LeapfrogIntegrator(), YoshidaIntegrator(), WisdomHolmanIntegrator()]
+
+    start = perf_counter()
+    results = trajectory_data.validation_sweep(model, delta_steps, integrators)
+    seconds = perf_counter() - start
+
+    print(f"{'integrator':>24} {'step h':>7} {'force evals':>12} {'max error m':>12} {'final error m':>14}")
+    for result in results:
+        max_error = result.coordinate_errors[:, 1:].max()
+        final_error = result.coordinate_errors[-1, 1:].max()
+        print(f"{result.integrator_name:>24} {result.delta_step / 3600.0:>7.2f} {result.force_evaluations:>12} {max_error:>12.3e} {final_error:>14.3e}")
+    print(f"{len(results)} validations in {seconds:.2f} s")
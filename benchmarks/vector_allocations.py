@@ -0,0 +1,118 @@
+import os
+import sys
+from math import sqrt
+from time import perf_counter
+
+import numpy as np
+
+def import_src():
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
+
+import_src()
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel, gravitational_constant
+from gravity_lab.point_particle import PointParticle
+
+# The list backed Vector and NewtonianMechanicsModel.step inner loop before Vector was array backed, as a baseline
+class ListVector():
+    created = 0
+
+    def __init__(self, components=[]):
+        ListVector.created += 1
+        self.components = components
+        self.dimension = len(components)
+
+    def magnitude(self):
+        return sqrt(sum(i*i for i in self.components))
+
+    def __add__(self, other_vector):
+        return ListVector([self.components[i] + other_vector.components[i] for i in range(self.dimension)])
+
+    def __sub__(self, other_vector):
+        return ListVector([self.components[i] - other_vector.components[i] for i in range(self.dimension)])
+
+    def __mul__(self, scalar):
+        return ListVector([self.components[i] * scalar for i in range(self.dimension)])
+
+    def __truediv__(self, scalar):
+        return ListVector([self.components[i] / scalar for i in range(self.dimension)])
+
+    def __neg__(self):
+        return self.__mul__(-1)
+
+def list_vector_step(objects: list, dimension: int, delta: float):
+    for object in objects:
+        object.coordinate += object.velocity * delta
+        gravity_acceleration = ListVector([0.0] * dimension)
+        for other_object in objects:
+            if object != other_object:
+                r_vec = object.coordinate - other_object.coordinate
+                r_mag = r_vec.magnitude()
+                r_unit_vec = r_vec / r_mag
+                acceleration = -r_unit_vec * (gravitational_constant * other_object.mass / (r_mag*r_mag))
+                gravity_acceleration += acceleration
+        object.velocity += gravity_acceleration * delta
+
+class CountingVector():
+    # counts the Vectors created while it is active
+    def __enter__(self):
+        self.created = 0
+        self.original_init = Vector.__init__
+        self.original_from_components = Vector._from_components
+        def counting_init(vector, *args, **kwargs):
+            self.created += 1
+            self.original_init(vector, *args, **kwargs)
+        def counting_from_components(components):
+            self.created += 1
+            return self.original_from_components(components)
+        Vector.__init__ = counting_init
+        Vector._from_components = staticmethod(counting_from_components)
+        return self
+
+    def __exit__(self, *exc_info):
+        Vector.__init__ = self.original_init
+        Vector._from_components = staticmethod(self.original_from_components)
+
+# Vectors created and wall time of one NewtonianMechanicsModel step with the array backed Vector against the list backed baseline
+def allocation_report(num_objects: int, dimension: int, num_steps: int = 3, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(size=(num_objects, dimension)) * 1e11
+    velocities = rng.normal(size=(num_objects, dimension)) * 1e4
+    masses = rng.uniform(1e20, 1e24, num_objects)
+
+    baseline_objects = [PointParticle(masses[i], ListVector(list(positions[i])), ListVector(list(velocities[i]))) for i in range(num_objects)]
+    ListVector.created = 0
+    list_vector_step(baseline_objects, dimension, 60.0)
+    baseline_created = ListVector.created
+    start = perf_counter()
+    for _ in range(num_steps):
+        list_vector_step(baseline_objects, dimension, 60.0)
+    baseline_seconds = (perf_counter() - start) / num_steps
+
+    model = NewtonianMechanicsModel(CartesianCoordinateSystem(dimension),
+        [PointParticle(masses[i], Vector(list(positions[i])), Vector(list(velocities[i]))) for i in range(num_objects)])
+    with CountingVector() as counter:
+        model.step(60.0)
+    created = counter.created
+    start = perf_counter()
+    for _ in range(num_steps):
+        model.step(60.0)
+    seconds = (perf_counter() - start) / num_steps
+
+    max_difference = max(abs(model.objects[i].velocity[axis] - baseline_objects[i].velocity.components[axis]) / abs(baseline_objects[i].velocity.components[axis])
+        for i in range(num_objects) for axis in range(dimension))
+
+    print(f"{dimension}D, N={num_objects}")
+    print(f"{'vector':>7} {'vectors/step':>13} {'seconds/step':>13}")
+    print(f"{'list':>7} {baseline_created:>13.0f} {baseline_seconds:>13.4f}")
+    print(f"{'array':>7} {created:>13.0f} {seconds:>13.4f}")
+    print(f"max relative velocity difference after {num_steps + 1} steps: {max_difference:.2e}")
+    print()
+
+if __name__ == "__main__":
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for dimension in [2, 3]:
+        allocation_report(num_objects, dimension)
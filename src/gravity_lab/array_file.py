@@ -0,0 +1,68 @@
+import json
+import os
+import struct
+from threading import get_ident
+
+import numpy as np
+
+# An array file is
+#   its magic bytes (8 bytes naming the kind of file), the length of the header (little endian uint64), the header as JSON,
+#   then the arrays in little endian byte order, each aligned to ARRAY_FILE_ALIGNMENT bytes.
+# The header holds the data of the kind of file and, under 'arrays', the dtype, shape and offset of every array
+# from the end of the header. The arrays are memory mapped when the file is opened, so opening does not read them
+ARRAY_FILE_ALIGNMENT = 64
+ARRAY_FILE_MAGIC_LENGTH = 8
+
+def _align(offset: int) -> int:
+    return -(-offset // ARRAY_FILE_ALIGNMENT) * ARRAY_FILE_ALIGNMENT
+
+def write_array_file(path: str, magic: bytes, header: dict, arrays: dict[str, np.ndarray], sync: bool = False):
+    # header must be JSON serializable. The file is written next to path and renamed, so readers never see a partial
+    # file. With sync the file is flushed to disk before it is renamed, so it survives a crash of the machine
+    if len(magic) != ARRAY_FILE_MAGIC_LENGTH:
+        raise ValueError(f"The magic bytes of an array file must be {ARRAY_FILE_MAGIC_LENGTH} bytes long, not {len(magic)}")
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        dtype = np.dtype(array.dtype).newbyteorder('<')
+        layout[name] = {'dtype': dtype.str, 'shape': list(np.shape(array)), 'offset': offset}
+        offset = _align(offset + np.size(array) * dtype.itemsize)
+
+    header = json.dumps({**header, 'arrays': layout}).encode('utf-8')
+    data_offset = _align(ARRAY_FILE_MAGIC_LENGTH + 8 + len(header))
+
+    temporary_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(magic)
+        file.write(struct.pack('<Q', len(header)))
+        file.write(header)
+        for name, array in arrays.items():
+            file.seek(data_offset + layout[name]['offset'])
+            # written from the buffer of the array, only copied if it is not contiguous and little endian
+            file.write(np.ascontiguousarray(array, dtype=layout[name]['dtype']).data)
+        file.truncate(data_offset + offset)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+def open_array_file(path: str, magic: bytes, mode: str = 'r') -> tuple[dict, dict[str, np.ndarray]]:
+    # Returns (header, arrays) with the arrays viewing one memory mapping of the file. mode is the mode of numpy.memmap:
+    # 'r' for read only arrays, 'c' for arrays that can be written without changing the file
+    with open(path, 'rb') as file:
+        if file.read(ARRAY_FILE_MAGIC_LENGTH) != magic:
+            raise ValueError(f"{path} is not a {magic.decode('ascii', 'replace')} file")
+        header_length, = struct.unpack('<Q', file.read(8))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    data_offset = _align(ARRAY_FILE_MAGIC_LENGTH + 8 + header_length)
+
+    file_map = np.memmap(path, dtype=np.uint8, mode=mode) if os.path.getsize(path) > data_offset else np.zeros(0, dtype=np.uint8)
+    arrays = {}
+    for name, array_layout in header.pop('arrays').items():
+        dtype = np.dtype(array_layout['dtype'])
+        start = data_offset + array_layout['offset']
+        num_bytes = int(np.prod(array_layout['shape'])) * dtype.itemsize
+        # plain arrays viewing the mapping, indexing a numpy.memmap is much slower
+        arrays[name] = np.asarray(file_map[start:start + num_bytes]).view(dtype).reshape(array_layout['shape'])
+    return header, arrays
@@ -0,0 +1,260 @@
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import Integrator
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+# number of bits per axis of the morton keys. This is also the maximum depth of the tree
+MAX_TREE_DEPTH = {2: 31, 3: 21}
+
+def morton_keys(cell_coordinates: np.ndarray, depth: int) -> np.ndarray:
+    # interleave the bits of the integer cell coordinates so bit (dimension * b + a) of a key is
+    # bit b of the coordinate on axis a. Sorting by key puts the particles of every tree node next to each other
+    num_particles, dimension = cell_coordinates.shape
+    keys = np.zeros(num_particles, dtype=np.uint64)
+    for bit in range(depth):
+        for axis in range(dimension):
+            coordinate_bit = (cell_coordinates[:, axis] >> np.uint64(bit)) & np.uint64(1)
+            keys |= coordinate_bit << np.uint64(dimension * bit + axis)
+    return keys
+
+def range_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # sum values[starts[i]:ends[i]] for all i. The ranges are sorted and do not overlap
+    # but may have gaps between them
+    padded_values = np.concatenate([values, np.zeros((1,) + values.shape[1:])])
+    boundaries = np.empty(2 * len(starts), dtype=np.int64)
+    boundaries[0::2] = starts
+    boundaries[1::2] = ends
+    return np.add.reduceat(padded_values, boundaries, axis=0)[0::2]
+
+def expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # concatenation of arange(starts[i], starts[i] + counts[i]) for all i
+    total = counts.sum()
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+class BarnesHutTree():
+    # A quadtree (2D) or octree (3D) stored as flat arrays. The particles are sorted by morton key so the
+    # particles of every node are the contiguous range [node_start, node_start + node_count) of the sorted
+    # order, and the children of every node are the contiguous range
+    # [node_child_start, node_child_start + node_child_count) of the nodes
+    def __init__(self, dimension: int, leaf_size: int = 8):
+        self.dimension = dimension
+        self.leaf_size = leaf_size
+        self.depth = MAX_TREE_DEPTH[dimension]
+
+        self.order = None
+        self.keys = None
+        self.root_center = None
+        self.root_half_width = None
+
+    def build(self, positions: np.ndarray, masses: np.ndarray):
+        # The tree is rebuilt incrementally: the bounding box is only grown when a particle leaves it, the
+        # particles are sorted starting from the order of the previous build (nearly sorted between steps)
+        # and the node ranges are only recomputed when a particle changed cell
+        num_particles = len(positions)
+        topology_changed = self.order is None or len(self.order) != num_particles
+
+        lower, upper = positions.min(axis=0), positions.max(axis=0)
+        if topology_changed or np.any(lower < self.root_center - self.root_half_width) or np.any(upper >= self.root_center + self.root_half_width):
+            self.root_center = (lower + upper) / 2.0
+            # padding leaves room for the particles to move before the bounding box has to change
+            self.root_half_width = max(float(np.max(upper - lower)) / 2.0 * 1.25, np.finfo(float).tiny)
+            topology_changed = True
+
+        if topology_changed:
+            self.order = np.arange(num_particles)
+
+        cell_width = 2.0 * self.root_half_width / (2 ** self.depth)
+        cell_coordinates = ((positions[self.order] - (self.root_center - self.root_half_width)) / cell_width).astype(np.int64)
+        np.clip(cell_coordinates, 0, 2 ** self.depth - 1, out=cell_coordinates)
+        keys = morton_keys(cell_coordinates.astype(np.uint64), self.depth)
+
+        # stable sort (timsort) is close to O(N) on the nearly sorted keys of the previous order
+        resort = np.argsort(keys, kind='stable')
+        self.order = self.order[resort]
+        keys = keys[resort]
+
+        if topology_changed or not np.array_equal(keys, self.keys):
+            self.keys = keys
+            self._build_nodes()
+
+        self.sorted_positions = positions[self.order]
+        self.sorted_masses = masses[self.order]
+        self._compute_node_moments()
+
+    def _build_nodes(self):
+        num_particles = len(self.keys)
+        num_children = 2 ** self.dimension
+
+        level_starts = [np.array([0])]
+        level_counts = [np.array([num_particles])]
+        level_centers = [self.root_center[np.newaxis, :]]
+        level_parent_index = []
+
+        half_width = self.root_half_width
+        level = 0
+        while True:
+            internal = level_counts[-1] > self.leaf_size
+            if level == self.depth or not np.any(internal):
+                break
+
+            parent_starts = level_starts[-1][internal]
+            parent_counts = level_counts[-1][internal]
+            parent_centers = level_centers[-1][internal]
+
+            # the particles in internal nodes, split into the cells of the next level
+            particles = expand_ranges(parent_starts, parent_counts)
+            shift = np.uint64(self.dimension * (self.depth - level - 1))
+            prefixes = self.keys[particles] >> shift
+            new_cell = np.ones(len(particles), dtype=bool)
+            new_cell[1:] = (prefixes[1:] != prefixes[:-1]) | (particles[1:] != particles[:-1] + 1)
+            first = np.flatnonzero(new_cell)
+
+            starts = particles[first]
+            counts = np.diff(np.append(first, len(particles)))
+            child_bits = (prefixes[first] & np.uint64(num_children - 1)).astype(np.int64)
+
+            parent_index = np.searchsorted(parent_starts, starts, side='right') - 1
+            half_width /= 2.0
+            axis_bits = (child_bits[:, np.newaxis] >> np.arange(self.dimension)) & 1
+            centers = parent_centers[parent_index] + (2 * axis_bits - 1) * half_width
+
+            level_parent_index.append(parent_index)
+            level_starts.append(starts)
+            level_counts.append(counts)
+            level_centers.append(centers)
+            level += 1
+
+        # flatten the levels into global node arrays
+        level_offsets = np.cumsum([0] + [len(starts) for starts in level_starts])
+        num_nodes = level_offsets[-1]
+        self.node_start = np.concatenate(level_starts)
+        self.node_count = np.concatenate(level_counts)
+        self.node_center = np.concatenate(level_centers)
+        self.node_half_width = np.concatenate([np.full(len(starts), self.root_half_width / (2 ** l)) for l, starts in enumerate(level_starts)])
+        self.node_child_start = np.zeros(num_nodes, dtype=np.int64)
+        self.node_child_count = np.zeros(num_nodes, dtype=np.int64)
+
+        for l, parent_index in enumerate(level_parent_index):
+            internal = np.flatnonzero(level_counts[l] > self.leaf_size)
+            child_counts = np.bincount(parent_index, minlength=len(internal))
+            parent_nodes = level_offsets[l] + internal
+            self.node_child_count[parent_nodes] = child_counts
+            self.node_child_start[parent_nodes] = level_offsets[l + 1] + np.cumsum(child_counts) - child_counts
+
+    def _compute_node_moments(self):
+        node_end = self.node_start + self.node_count
+        # moments are computed relative to the root center to keep the sums well conditioned
+        relative_positions = self.sorted_positions - self.root_center
+        self.node_mass = range_sums(self.sorted_masses, self.node_start, node_end)
+        weighted_positions = range_sums(relative_positions * self.sorted_masses[:, np.newaxis], self.node_start, node_end)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            center_of_mass = weighted_positions / self.node_mass[:, np.newaxis]
+        # massless nodes fall back to their geometric center
+        self.node_center_of_mass = np.where(self.node_mass[:, np.newaxis] > 0.0, center_of_mass + self.root_center, self.node_center)
+
+    def accelerations(self, opening_angle: float, groups_per_chunk: int = 256, softening_length: float = 0.0) -> np.ndarray:
+        # accelerations of the particles of the tree, in sorted order. The tree is walked once per group of
+        # particles (the particles of a leaf) instead of once per particle, so the opening criterion is
+        # evaluated against the bounding box of the group
+        leaves = np.flatnonzero(self.node_child_count == 0)
+        leaves = leaves[np.argsort(self.node_start[leaves])]
+        group_start = self.node_start[leaves]
+        group_count = self.node_count[leaves]
+        group_lower = np.minimum.reduceat(self.sorted_positions, group_start, axis=0)
+        group_upper = np.maximum.reduceat(self.sorted_positions, group_start, axis=0)
+        group_center = (group_lower + group_upper) / 2.0
+        group_half_width = (group_upper - group_lower) / 2.0
+
+        # distance from the center of mass of a node to its geometric center. The criterion of a node is
+        # made stricter by that offset so nodes with lopsided mass are opened more often
+        node_offset = np.sqrt(np.einsum('ij,ij->i', self.node_center_of_mass - self.node_center, self.node_center_of_mass - self.node_center))
+        node_reach = 2.0 * self.node_half_width + opening_angle * node_offset
+
+        accelerations = np.zeros_like(self.sorted_positions)
+        for chunk_start in range(0, len(leaves), groups_per_chunk):
+            groups = np.arange(chunk_start, min(chunk_start + groups_per_chunk, len(leaves)))
+
+            # walk the tree for all groups of the chunk at once. Each (group, node) pair is either accepted
+            # and the node approximated by a point mass at its center of mass, or opened into its children or particles
+            group_index = groups
+            node_index = np.zeros(len(groups), dtype=np.int64)
+            while len(group_index) > 0:
+                box_distance = np.maximum(np.abs(self.node_center_of_mass[node_index] - group_center[group_index]) - group_half_width[group_index], 0.0)
+                min_r_mag_squared = np.einsum('ij,ij->i', box_distance, box_distance)
+                reach = node_reach[node_index]
+                accept = (min_r_mag_squared > 0.0) & (reach * reach < opening_angle * opening_angle * min_r_mag_squared)
+
+                accepted = np.flatnonzero(accept)
+                if len(accepted) > 0:
+                    counts = group_count[group_index[accepted]]
+                    targets = expand_ranges(group_start[group_index[accepted]], counts)
+                    sources = np.repeat(node_index[accepted], counts)
+                    self._accumulate(accelerations, targets, self.node_center_of_mass[sources], self.node_mass[sources], softening_length)
+
+                leaf = self.node_child_count[node_index] == 0
+
+                # opened leaves interact directly with their particles
+                direct = np.flatnonzero(~accept & leaf)
+                if len(direct) > 0:
+                    targets, sources = self._leaf_pairs(group_start[group_index[direct]], group_count[group_index[direct]],
+                        self.node_start[node_index[direct]], self.node_count[node_index[direct]])
+                    self._accumulate(accelerations, targets, self.sorted_positions[sources], self.sorted_masses[sources], softening_length)
+
+                # opened internal nodes are replaced by their children
+                internal = np.flatnonzero(~accept & ~leaf)
+                internal_nodes = node_index[internal]
+                child_counts = self.node_child_count[internal_nodes]
+                group_index = np.repeat(group_index[internal], child_counts)
+                node_index = expand_ranges(self.node_child_start[internal_nodes], child_counts)
+
+        return accelerations
+
+    def _leaf_pairs(self, target_starts, target_counts, source_starts, source_counts):
+        # all (target, source) pairs of particles between the target and source ranges
+        pair_sizes = target_counts * source_counts
+        pair = np.repeat(np.arange(len(pair_sizes)), pair_sizes)
+        k = expand_ranges(np.zeros(len(pair_sizes), dtype=np.int64), pair_sizes)
+        targets = target_starts[pair] + k // source_counts[pair]
+        sources = source_starts[pair] + k % source_counts[pair]
+        # a particle does not feel a force from itself
+        not_self = targets != sources
+        return targets[not_self], sources[not_self]
+
+    def _accumulate(self, accelerations, targets, source_positions, source_masses, softening_length):
+        # Plummer softened like VectorizedNewtonianMechanicsModel
+        r_vecs = source_positions - self.sorted_positions[targets]
+        r_mag_squared = np.einsum('ij,ij->i', r_vecs, r_vecs)
+        softened_r_mag_squared = r_mag_squared + softening_length * softening_length
+        # distinct particles at the same position feel no force from each other, as in pairwise_accelerations
+        weights = np.divide(gravitational_constant * source_masses, softened_r_mag_squared * np.sqrt(softened_r_mag_squared),
+            out=np.zeros_like(r_mag_squared), where=r_mag_squared > 0.0)
+        for axis in range(self.dimension):
+            accelerations[:, axis] += np.bincount(targets, weights=r_vecs[:, axis] * weights, minlength=len(accelerations))
+
+class BarnesHutModel(VectorizedNewtonianMechanicsModel):
+    # Approximates the force of gravity from groups of distant objects by the force from their center of mass.
+    # A group is approximated when (width of its tree node) / (distance to its center of mass) < opening_angle,
+    # measured from the bounding box of the particles the force is calculated for,
+    # so opening_angle = 0 is the same as the direct sum of VectorizedNewtonianMechanicsModel and larger
+    # values are faster and less accurate
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = [], opening_angle: float = 0.5, leaf_size: int = 8,
+            integrator: Integrator = None, softening_length: float = 0.0):
+        super().__init__(coordinate_system, objects, integrator, softening_length=softening_length)
+        self.opening_angle = opening_angle
+        # quadtree in 2D, octree in 3D
+        self.tree = BarnesHutTree(coordinate_system.dimension, leaf_size)
+
+    def accelerations(self, positions: np.ndarray, time: float = None, targets: np.ndarray = None) -> np.ndarray:
+        if len(positions) == 0:
+            return np.zeros_like(positions)
+        positions = self._with_kinematic_positions(positions, time)
+        # test particles are in the tree without mass, so they are walked but exert no force
+        self.tree.build(positions, self.source_masses)
+        accelerations = np.empty_like(positions)
+        accelerations[self.tree.order] = self.tree.accelerations(self.opening_angle, softening_length=self.softening_length)
+        # the tree walk calculates the accelerations of all objects at once
+        return accelerations if targets is None else accelerations[targets]
@@ -0,0 +1,101 @@
+from time import monotonic
+
+import numpy as np
+
+from gravity_lab.array_file import open_array_file, write_array_file
+from gravity_lab.gravity_model import GravityModel
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, TestParticle
+
+# A checkpoint is an array file (see array_file.py) with the positions, velocities, masses and object types of the
+# objects of a model as arrays. The header holds the class and dimension of the model, its time and the state of its integrator
+CHECKPOINT_FILE_MAGIC = b'GLCKPT01'
+
+# the types of objects a checkpoint can hold, stored as their index. KinematicParticles refer to trajectories
+# outside of the model and cannot be checkpointed
+CHECKPOINT_OBJECT_TYPES = [PointParticle, TestParticle]
+
+def state_arrays(model: GravityModel) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (positions, velocities, masses) of the objects of the model. Models that keep their state in arrays return their
+    # arrays, which change as the model is stepped
+    if hasattr(model, 'sync_state'):
+        model.sync_state()
+        return model.positions, model.velocities, model.masses
+
+    dimension = model.coordinate_system.dimension
+    positions = np.array([object.coordinate.components for object in model.objects]).reshape(len(model.objects), dimension)
+    velocities = np.array([object.velocity.components for object in model.objects]).reshape(len(model.objects), dimension)
+    masses = np.array([object.mass for object in model.objects], dtype=np.float64)
+    return positions, velocities, masses
+
+def write_checkpoint(path: str, model: GravityModel, sync: bool = True, metadata: dict = None):
+    # Models that keep their state in arrays are written straight from the arrays. The checkpoint replaces the file at
+    # path atomically, and with sync it is on disk before it does. metadata is any JSON serializable data of the run,
+    # returned in the header by read_checkpoint
+    object_types = []
+    for object in model.objects:
+        if type(object) not in CHECKPOINT_OBJECT_TYPES:
+            raise ValueError(f"Objects of type {type(object).__name__} cannot be checkpointed")
+        object_types.append(CHECKPOINT_OBJECT_TYPES.index(type(object)))
+
+    positions, velocities, masses = state_arrays(model)
+    integrator = getattr(model, 'integrator', None)
+    header = {
+        'model': model.__class__.__name__,
+        'dimension': model.coordinate_system.dimension,
+        'time': model.time,
+        'integrator': {'name': integrator.__class__.__name__, 'state': integrator.state()} if integrator is not None else None,
+        'metadata': metadata
+    }
+    arrays = {'positions': positions, 'velocities': velocities, 'masses': masses, 'object_types': np.array(object_types, dtype=np.int8)}
+    write_array_file(path, CHECKPOINT_FILE_MAGIC, header, arrays, sync)
+
+def read_checkpoint(path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    # (header, arrays) of a checkpoint. The arrays are memory mapped copy on write, so they can be stepped without
+    # changing the file
+    return open_array_file(path, CHECKPOINT_FILE_MAGIC, mode='c')
+
+def restore_checkpoint(path: str, model: GravityModel) -> GravityModel:
+    # Replaces the objects, time and integrator state of the model by the checkpoint. Models that keep their state in
+    # arrays use the memory mapped arrays of the checkpoint as their state, other models get objects viewing them.
+    # The integrator state is only restored if the model has the integrator of the checkpoint
+    header, arrays = read_checkpoint(path)
+    if header['dimension'] != model.coordinate_system.dimension:
+        raise ValueError(f"The checkpoint is {header['dimension']}D but the model is {model.coordinate_system.dimension}D")
+
+    positions, velocities, masses = arrays['positions'], arrays['velocities'], arrays['masses']
+    # set_state gives the objects views of the arrays, other models get them here
+    has_state_arrays = hasattr(model, 'set_state')
+    objects = []
+    for i, (object_type, mass) in enumerate(zip(arrays['object_types'].tolist(), masses.tolist())):
+        coordinate, velocity = (None, None) if has_state_arrays else (Vector(positions[i]), Vector(velocities[i]))
+        if CHECKPOINT_OBJECT_TYPES[object_type] is TestParticle:
+            objects.append(TestParticle(coordinate, velocity, mass))
+        else:
+            objects.append(PointParticle(mass, coordinate, velocity))
+
+    if has_state_arrays:
+        model.set_state(objects, positions, velocities, masses)
+    else:
+        model.objects = objects
+    model.time = header['time']
+
+    integrator = getattr(model, 'integrator', None)
+    if header['integrator'] is not None and integrator is not None and integrator.__class__.__name__ == header['integrator']['name']:
+        integrator.restore_state(header['integrator']['state'])
+    return model
+
+class Checkpointer():
+    # Writes checkpoints of a model to path while it is run by a ModelRunner, at most every interval_seconds of wall
+    # time so checkpointing a fast model does not slow it down
+    def __init__(self, path: str, interval_seconds: float = 5.0, sync: bool = True, metadata: dict = None):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.sync = sync
+        self.metadata = metadata
+        self.last_checkpoint_time = monotonic()
+
+    def update(self, model: GravityModel, force: bool = False):
+        if force or monotonic() - self.last_checkpoint_time >= self.interval_seconds:
+            write_checkpoint(self.path, model, self.sync, self.metadata)
+            self.last_checkpoint_time = monotonic()
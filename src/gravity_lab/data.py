@@ -1,11 +1,23 @@
-from datetime import datetime
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+import io
+import itertools
+import os
 import re
-from time import sleep
-from typing import Any, Mapping, Tuple, Union
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Iterable, Iterator, Mapping, Tuple, Union
+
+import numpy as np
 
-from gravity_lab.math import Vector
 from gravity_lab.gravity_model import GravityModel
-from gravity_lab.point_particle import PointParticle
+from gravity_lab.integrators import Integrator
+from gravity_lab.model_validation import ValidationResult, trajectories_time_span, validate_model, validation_sweep
+from gravity_lab.point_particle import KinematicParticle
+from gravity_lab.response_cache import ResponseCache
+from gravity_lab.trajectory_store import J2000, JULIAN_DAY_J2000, Trajectory, open_trajectory_file, write_trajectory_file
 
 import requests
 
@@ -14,82 +26,264 @@ class Data():
         self.name: str = name
 
 class TrajectoryData(Data):
-    # object_trajectories maps an index or string id to a tuple (object_data, trajectory data)
-    def __init__(self, name: str, object_trajectories: Mapping[Union[int, str], Tuple[Any, list]]):
+    # object_trajectories maps an index or string id to a tuple (object_data, Trajectory).
+    # path is the trajectory file the data was opened from, None if the data is not in a file or has changed since
+    def __init__(self, name: str, object_trajectories: Mapping[Union[int, str], Tuple[Any, Trajectory]], path: str = None):
         super().__init__(name)
         self.object_trajectories = object_trajectories
+        self.path = path
 
-    def validate_model(self, model: GravityModel, delta_step: float):
-        object_name_to_model_object = {}
-        for object_name in self.object_trajectories:
-            object_data, trajectory_data = self.object_trajectories[object_name]
-            def parse_vector(vector):
-                return Vector([vector['x'], vector['y'], vector['z']])
-
-            point_particle = PointParticle(object_data['mass_kg'], parse_vector(trajectory_data[0]['position']), parse_vector(trajectory_data[0]['velocity']))
-            model.objects.append(point_particle)
-            object_name_to_model_object[object_name] = point_particle
-
-        # step through model for the duration of the trajectory data
-        total_duration_seconds = 0.0
-        for i in range(len(trajectory_data) - 1):
-            duration = trajectory_data[i+1]['datetime'] - trajectory_data[i]['datetime']
-            total_duration_seconds += duration.total_seconds()
-
-        for _ in range(int(total_duration_seconds // delta_step)):
-            model.step(delta_step)
-
-        model.step(total_duration_seconds % delta_step)
-
-        # calculate model error by comparing to trajectory data
-        error_from_trajectory_data = {}
-        for object_name in self.object_trajectories:
-            object_data, trajectory_data = self.object_trajectories[object_name]
-            object_last_trajectory_data = trajectory_data[-1]
-            def parse_vector(vector):
-                return Vector([vector['x'], vector['y'], vector['z']])
-            object_last_trajectory_position = parse_vector(object_last_trajectory_data['position'])
-            object_last_trajectory_velocity = parse_vector(object_last_trajectory_data['velocity'])
-
-            coordinate_error = (object_name_to_model_object[object_name].coordinate - object_last_trajectory_position).magnitude()
-            velocity_error = (object_name_to_model_object[object_name].velocity - object_last_trajectory_velocity).magnitude()
-
-            error_from_trajectory_data[object_name] = {
-                'coordinate_error': coordinate_error,
-                'velocity_error': velocity_error
-            }
-
-        print(error_from_trajectory_data)
+    # Saves to a trajectory file (see trajectory_store.py). The object data must be JSON serializable
+    def save(self, path: str):
+        write_trajectory_file(path, self.name, self.object_trajectories)
 
+    # The trajectories are memory mapped from the file, so opening takes the same time for any size of file
     @classmethod
-    def load_solar_system_from_jpl_horizons_system(cls) -> 'TrajectoryData':
+    def open(cls, path: str) -> 'TrajectoryData':
+        name, object_trajectories = open_trajectory_file(path)
+        return cls(name, object_trajectories, path)
+
+    # (start, stop) of the time span covered by the trajectories of all objects, in seconds since J2000
+    def time_span(self) -> tuple[float, float]:
+        return trajectories_time_span(self.object_trajectories)
+
+    # Objects that follow the trajectories instead of being integrated, with the time 0 of the model at epoch
+    # (seconds since J2000), the start of the time span of the trajectories by default
+    def kinematic_objects(self, epoch: float = None) -> dict[Union[int, str], KinematicParticle]:
+        epoch = epoch if epoch is not None else self.time_span()[0]
+        return {object_name: KinematicParticle(object_data['mass_kg'], trajectory, epoch)
+            for object_name, (object_data, trajectory) in self.object_trajectories.items()}
+
+    # Validates a fresh copy of the model against the trajectories at every epoch of the data, see model_validation.validate_model.
+    # integrator replaces the integrator of the model, e.g. a WisdomHolmanIntegrator for the solar system
+    def validate_model(self, model: GravityModel, delta_step: float, integrator: Integrator = None) -> ValidationResult:
+        return validate_model(self.object_trajectories, model, delta_step, integrator)
+
+    # Validates the model for every combination of step size and integrator in a pool of processes. Data opened from a
+    # trajectory file is memory mapped by the processes instead of being copied to them
+    def validation_sweep(self, model: GravityModel, delta_steps: list[float], integrators: list[Integrator] = [None],
+            max_workers: int = None) -> list[ValidationResult]:
+        trajectory_source = self.path if self.path is not None else self.object_trajectories
+        return validation_sweep(trajectory_source, model, delta_steps, integrators, max_workers)
+
+    # Without a start, stop and step the default time span and step of the JPL Horizons System are loaded
+    @classmethod
+    def load_solar_system_from_jpl_horizons_system(cls, start: datetime = None, stop: datetime = None, step: timedelta = None) -> 'TrajectoryData':
         object_trajectories = {}
-        for body_name in ["Sun", "Mercury", "Venus", "Earth", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]:
-            body_jpl_horizons_id = jpl_horizons_search_major_body_id(body_name)
-            sleep(0.1)
-            vector_data = jpl_horizons_ephemeris_vector(body_jpl_horizons_id)
-            sleep(0.1)
-            mass_kg = jpl_horizons_body_mass_kg(body_jpl_horizons_id)
-            sleep(0.1)
+        for body_name, (mass_kg, trajectory) in jpl_horizons_fetch_bodies(SOLAR_SYSTEM_BODY_NAMES, start=start, stop=stop, step=step).items():
             object_data = {"mass_kg": mass_kg}
-            object_trajectories[body_name] = (object_data, vector_data)
+            object_trajectories[body_name] = (object_data, trajectory)
 
         return TrajectoryData("JPL Horizons Solar System", object_trajectories)
 
-JPL_HORIZONS_SYSTEM_API_URL = "https://ssd.jpl.nasa.gov/api/horizons.api"
+    def extend_from_jpl_horizons_system(self, start: datetime, stop: datetime, center: str = "@0"):
+        # Extends the trajectories of the bodies (named by their keys) to cover [start, stop] with the step of the
+        # trajectories. Only the time ranges before and after the stored trajectories are requested, so extending
+        # the data by a month is one small request per body
+        first_trajectory = next(iter(self.object_trajectories.values()))[1]
+        if len(first_trajectory) < 2:
+            raise RuntimeError(f"{self.name} needs at least 2 samples to extend it with the same step")
+        first, last = first_trajectory.datetime(0), first_trajectory.datetime(len(first_trajectory) - 1)
+        step = first_trajectory.datetime(1) - first
+
+        # the missing ranges are aligned to the epochs of the stored trajectories and rounded out to whole steps,
+        # so they cover start and stop
+        missing_ranges = []
+        if start < first:
+            missing_ranges.append((first - -((first - start) // -step) * step, first - step))
+        if stop > last:
+            missing_ranges.append((last + step, last + -((stop - last) // -step) * step))
+
+        body_names = list(self.object_trajectories)
+        for missing_start, missing_stop in missing_ranges:
+            bodies = jpl_horizons_fetch_bodies(body_names, center, missing_start, missing_stop, step)
+            for body_name, (_, missing_trajectory) in bodies.items():
+                object_data, trajectory = self.object_trajectories[body_name]
+                self.object_trajectories[body_name] = (object_data, Trajectory.concatenate([trajectory, missing_trajectory]))
+        if missing_ranges:
+            self.path = None
+
+SOLAR_SYSTEM_BODY_NAMES = ["Sun", "Mercury", "Venus", "Earth", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
+
+# GRAVITY_LAB_HORIZONS_URL points the requests at another server, e.g. a local stub server in tests
+JPL_HORIZONS_SYSTEM_API_URL = os.environ.get('GRAVITY_LAB_HORIZONS_URL', "https://ssd.jpl.nasa.gov/api/horizons.api")
+
+# responses are cached on disk, see ResponseCache for the environment variables configuring it
+jpl_horizons_cache = ResponseCache.from_environment()
+
+class TokenBucket():
+    # Rate limiter shared between threads. Tokens are added at rate per second up to capacity,
+    # so up to capacity requests can be sent at once and rate per second after that
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill_time = monotonic()
+        self.lock = Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill_time) * self.rate)
+                self.last_refill_time = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait_seconds = (1.0 - self.tokens) / self.rate
+            sleep(wait_seconds)
+
+# requests sent to the JPL Horizons System, cached responses are not limited
+jpl_horizons_rate_limiter = TokenBucket(rate=10.0, capacity=4.0)
+
+# requests for different bodies are sent concurrently by up to JPL_HORIZONS_MAX_WORKERS threads,
+# which share pooled connections
+JPL_HORIZONS_MAX_WORKERS = 4
+_jpl_horizons_session = None
+_jpl_horizons_session_lock = Lock()
+
+def jpl_horizons_session() -> requests.Session:
+    global _jpl_horizons_session
+    with _jpl_horizons_session_lock:
+        if _jpl_horizons_session is None:
+            _jpl_horizons_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=JPL_HORIZONS_MAX_WORKERS)
+            _jpl_horizons_session.mount('http://', adapter)
+            _jpl_horizons_session.mount('https://', adapter)
+        return _jpl_horizons_session
+
+# responses are read from the connection in chunks of this many bytes and handed on line by line
+JPL_HORIZONS_STREAM_CHUNK_BYTES = 64 * 1024
+
+def _jpl_horizons_network_request(url: str, request_params: dict) -> Iterator[str]:
+    # the lines of the response as they are received
+    jpl_horizons_rate_limiter.acquire()
+    with jpl_horizons_session().get(url, params=request_params, stream=True) as response:
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        yield from _jpl_horizons_checked_lines(request_params,
+            (line + '\n' for line in response.iter_lines(chunk_size=JPL_HORIZONS_STREAM_CHUNK_BYTES, decode_unicode=True)))
+
+def _jpl_horizons_checked_lines(request_params: dict, lines: Iterable[str]) -> Iterator[str]:
+    # Horizons answers requests it cannot serve (e.g. an epoch outside the ephemeris of a body) with status 200 and
+    # an error message in place of the ephemeris. These are raised at the end of the response, before it would be
+    # cached. Only the lines before the ephemeris are kept for the message
+    if 'EPHEM_TYPE' not in request_params:
+        yield from lines
+        return
+    lines_before_ephemeris = []
+    for line in lines:
+        if lines_before_ephemeris is not None:
+            lines_before_ephemeris.append(line)
+            if line.strip() == JPL_HORIZONS_START_OF_EPHEMERIS:
+                lines_before_ephemeris = None
+        yield line
+    if lines_before_ephemeris is not None:
+        message = ' '.join(line.strip() for line in lines_before_ephemeris if line.strip() and not line.startswith('API '))
+        raise RuntimeError(f"JPL Horizons System returned no ephemeris for {request_params}: {message[:500]}")
+
+# The lines of the response, as they are received or read from the cache. The response is cached once all its lines
+# were read, so a caller that stops reading early (e.g. a parser at the end of the ephemeris) reads the rest of them
+def jpl_horizons_request_lines(request_params: dict) -> Iterator[str]:
+    return jpl_horizons_cache.fetch_lines(JPL_HORIZONS_SYSTEM_API_URL, request_params, _jpl_horizons_network_request)
+
+# returns the text of the response
+def jpl_horizons_request(request_params: dict) -> str:
+    return ''.join(jpl_horizons_request_lines(request_params))
+
+# Horizons returns at most about 90000 lines per request, the ephemeris of a longer time range is fetched in chunks
+JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST = 10000
+JPL_HORIZONS_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def jpl_horizons_step_size(step: timedelta) -> str:
+    if step <= timedelta(0) or step % timedelta(minutes=1) != timedelta(0):
+        raise ValueError(f"The step of a JPL Horizons System request must be a positive number of minutes, not {step}")
+    return f"'{step // timedelta(minutes=1)} m'"
+
+def jpl_horizons_time_ranges(start: datetime, stop: datetime, step: timedelta, max_epochs_per_request: int = None) -> list[Tuple[datetime, datetime]]:
+    # Splits [start, stop] into ranges of at most max_epochs_per_request (JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST by default)
+    # epochs on the grid start + i * step. The ranges include both ends, like START_TIME and STOP_TIME
+    if max_epochs_per_request is None:
+        max_epochs_per_request = JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST
+    if stop < start:
+        raise ValueError(f"The stop {stop} is before the start {start}")
+    num_epochs = (stop - start) // step + 1
+    return [(start + first_epoch * step, start + (min(first_epoch + max_epochs_per_request, num_epochs) - 1) * step)
+        for first_epoch in range(0, num_epochs, max_epochs_per_request)]
+
+# body requests of jpl_horizons_ephemeris_vector and jpl_horizons_body_mass_kg. Both are parsed from the same response.
+# Without a start, stop and step the default time span and step of Horizons are used
+def jpl_horizons_body_request_params(body_id: int, center: str = "@0", start: datetime = None, stop: datetime = None, step: timedelta = None) -> dict:
+    request_params = {
+        'format': 'text',
+        'COMMAND': body_id,
+        'EPHEM_TYPE': "VECTORS",
+        'CENTER': center
+    }
+    if start is not None:
+        request_params['START_TIME'] = f"'{start.strftime(JPL_HORIZONS_DATETIME_FORMAT)}'"
+        request_params['STOP_TIME'] = f"'{stop.strftime(JPL_HORIZONS_DATETIME_FORMAT)}'"
+        request_params['STEP_SIZE'] = jpl_horizons_step_size(step)
+    return request_params
+
+def jpl_horizons_body_request(body_id: int, center: str = "@0", start: datetime = None, stop: datetime = None, step: timedelta = None) -> str:
+    return jpl_horizons_request(jpl_horizons_body_request_params(body_id, center, start, stop, step))
+
+def parse_jpl_horizons_body_lines(lines: Iterable[str]) -> tuple[float, Trajectory]:
+    # (mass_kg, Trajectory) of a body request, parsed from its lines as they are read. The mass is in the lines
+    # before the ephemeris, which are the only ones kept. Reads all the lines, so a streamed response gets cached
+    lines = iter(lines)
+    lines_before_ephemeris = []
+    for line in lines:
+        lines_before_ephemeris.append(line)
+        if line.strip() == JPL_HORIZONS_START_OF_EPHEMERIS:
+            break
+    mass_kg = parse_jpl_horizons_body_mass_kg(''.join(lines_before_ephemeris))
+    trajectory = Trajectory.from_vector_table(parse_jpl_horizons_vector_table(itertools.chain(lines_before_ephemeris[-1:], lines)))
+    for _ in lines:
+        pass
+    return mass_kg, trajectory
+
+def jpl_horizons_fetch_bodies(body_names: list[str], center: str = "@0", start: datetime = None, stop: datetime = None, step: timedelta = None,
+        max_workers: int = JPL_HORIZONS_MAX_WORKERS) -> dict:
+    # Returns {body_name: (mass_kg, Trajectory)}. The ids of all bodies are resolved from one major body listing.
+    # The time range of every body is split by jpl_horizons_time_ranges and all body and time range requests are sent
+    # concurrently, limited by jpl_horizons_rate_limiter
+    major_body_ids = jpl_horizons_major_body_ids()
+    body_ids = {}
+    for body_name in body_names:
+        if body_name.lower() not in major_body_ids:
+            raise RuntimeError(f'Could not find major body with name {body_name} in JPL Horizons System')
+        body_ids[body_name] = major_body_ids[body_name.lower()]
+
+    time_ranges = [(None, None)] if start is None else jpl_horizons_time_ranges(start, stop, step)
+
+    def fetch_chunk(body_name: str, time_range: Tuple[datetime, datetime]):
+        # parsed while it is received, the response is never held as a whole
+        request_params = jpl_horizons_body_request_params(body_ids[body_name], center, time_range[0], time_range[1], step)
+        with closing(jpl_horizons_request_lines(request_params)) as lines:
+            return parse_jpl_horizons_body_lines(lines)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        chunks = {body_name: [executor.submit(fetch_chunk, body_name, time_range) for time_range in time_ranges] for body_name in body_names}
+
+        bodies = {}
+        for body_name in body_names:
+            mass_kg = chunks[body_name][0].result()[0]
+            bodies[body_name] = (mass_kg, Trajectory.concatenate([chunk.result()[1] for chunk in chunks[body_name]]))
+    return bodies
 
 # TODO: Rewrite code below to use regex. Currently very hacky
 
-def jpl_horizons_request(request_params: dict):
-    return requests.get(JPL_HORIZONS_SYSTEM_API_URL, params=request_params)
-
-def jpl_horizons_search_major_body_id(body_name: str):
+def jpl_horizons_major_body_ids() -> dict[str, int]:
+    # maps the lower case names of the major bodies to their ids, from one listing of all major bodies
     jpl_mb_response = jpl_horizons_request({
         'format': 'text',
         'COMMAND': 'MB'
     })
 
-    response_lines = jpl_mb_response.text.split('\n')
+    response_lines = jpl_mb_response.split('\n')
 
     def str_is_int(str_):
         try: 
@@ -98,6 +292,7 @@ def jpl_horizons_search_major_body_id(body_name: str):
         except ValueError:
             return False
 
+    major_body_ids = {}
     for line in response_lines:
         words = line.split(' ')
 
@@ -112,111 +307,115 @@ def jpl_horizons_search_major_body_id(body_name: str):
         if len(words) < 2:
             continue
 
-        if str_is_int(words[0]) and body_name.lower() == words[1].lower():
-            return int(words[0])
+        # the first body listed with a name is used
+        if str_is_int(words[0]) and words[1].lower() not in major_body_ids:
+            major_body_ids[words[1].lower()] = int(words[0])
 
-    raise RuntimeError(f'Could not find major body with name {body_name} in JPL Horizons System')
+    return major_body_ids
+
+def jpl_horizons_search_major_body_id(body_name: str):
+    major_body_ids = jpl_horizons_major_body_ids()
+    if body_name.lower() not in major_body_ids:
+        raise RuntimeError(f'Could not find major body with name {body_name} in JPL Horizons System')
+    return major_body_ids[body_name.lower()]
 
 # @0 is the Solar System Barycenter
 def jpl_horizons_ephemeris_vector(body_id: int, center: str = "@0"):
-    jpl_horizons_response = jpl_horizons_request({
-        'format': 'text',
-        'COMMAND': body_id,
-        'EPHEM_TYPE': "VECTORS",
-        'CENTER': center
-    })
+    return parse_jpl_horizons_ephemeris_vector(jpl_horizons_body_request(body_id, center))
 
-    response_lines = jpl_horizons_response.text.split('\n')
+def parse_jpl_horizons_ephemeris_vector(jpl_horizons_response: str):
+    # one dict per epoch, built from the columns of parse_jpl_horizons_vector_table
+    columns = parse_jpl_horizons_vector_table(io.StringIO(jpl_horizons_response))
+    vector_data = []
+    for i in range(len(columns['epoch'])):
+        vector_data.append({
+            'datetime': julian_day_to_datetime(columns['epoch'][i]),
+            'position': {'x': float(columns['x'][i]), 'y': float(columns['y'][i]), 'z': float(columns['z'][i])},
+            'velocity': {'x': float(columns['vx'][i]), 'y': float(columns['vy'][i]), 'z': float(columns['vz'][i])}
+        })
 
-    vector_data_lines = []
-    after_start_str = False
-    for line in response_lines:
-        if line == '$$EOE':
-            break
+    return vector_data
 
-        if after_start_str:
-            vector_data_lines.append(line)
+# columns of parse_jpl_horizons_vector_table. epoch is the julian day (TDB), positions are in m and velocities in m/s
+JPL_HORIZONS_VECTOR_COLUMNS = ['epoch', 'x', 'y', 'z', 'vx', 'vy', 'vz']
 
-        if line == '$$SOE':
-            after_start_str = True
+JPL_HORIZONS_START_OF_EPHEMERIS = '$$SOE'
+JPL_HORIZONS_END_OF_EPHEMERIS = '$$EOE'
 
-    # group vector data lines by 4. Each 4 lines is a ephemeris vector data calculation
-    n = 4
-    vector_data_lines = [vector_data_lines[i:i+n] for i in range(0, len(vector_data_lines), n)]
+# lines of a record of the text output, e.g.
+# 2460000.500000000 = A.D. 2023-Feb-25 00:00:00.0000 TDB
+#  X =-1.400591006362508E+08 Y = 4.751264113434012E+07 Z = 2.540380187003128E+04
+#  VX=-1.013766519808087E+01 VY=-2.831015628960298E+01 VZ= 1.590082963946047E-03
+_jpl_horizons_epoch_regex = re.compile(r'\s*(\d+\.\d*)\s*=\s*A\.D\.')
+_jpl_horizons_position_regex = re.compile(r'\s*X\s*=\s*(\S+)\s*Y\s*=\s*(\S+)\s*Z\s*=\s*(\S+)')
+_jpl_horizons_velocity_regex = re.compile(r'\s*VX\s*=\s*(\S+)\s*VY\s*=\s*(\S+)\s*VZ\s*=\s*(\S+)')
 
+def parse_jpl_horizons_vector_table(lines) -> dict[str, np.ndarray]:
+    # Parses the ephemeris between $$SOE and $$EOE of a VECTORS response into columns (see JPL_HORIZONS_VECTOR_COLUMNS).
+    # lines is any iterable of lines, e.g. an open file or io.StringIO, and is read one line at a time so a long
+    # ephemeris is never held as a list of lines. Both the text output and the CSV output (CSV_FORMAT=YES) are parsed.
     # TODO: verify that all JPL Horizons Vector data always uses km units. Currently assuming
     # this is true and converting values to m
-    vector_data = []
-    for vector_data_strs in vector_data_lines:
-        date_data = vector_data_strs[0].split(' ')
-        ephemeris_datetime = datetime.strptime(f"{date_data[3]} {date_data[4]}", "%Y-%b-%d %H:%M:%S.%f")
-
-        position_data = vector_data_strs[1].split(' ')
-        position_vector = {}
-        for i in range(len(position_data)):
-            offset = 1
-            if position_data[i] == 'X':
-                if position_data[i+offset] == '=':
-                    offset += 1
-
-                value = float(position_data[i+offset][1:])
-                position_vector['x'] = value * 1000.0
-            elif position_data[i] == 'Y':
-                if position_data[i+offset] == '=':
-                    offset += 1
-
-                value = float(position_data[i+offset][1:])
-                position_vector['y'] = value * 1000.0
-            elif position_data[i] == 'Z':
-                if position_data[i+offset] == '=':
-                    offset += 1
-
-                value = float(position_data[i+offset][1:])
-                position_vector['z'] = value * 1000.0
-
-        velocity_data = vector_data_strs[2].split(' ')
-        velocity_vector = {}
-        for i in range(len(velocity_data)):
-            if velocity_data[i] == 'VX' or velocity_data[i] == 'VX=':
-                value = float(velocity_data[i+1])
-                velocity_vector['x'] = value * 1000.0
-                continue
-            elif velocity_data[i] == 'VY' or velocity_data[i] == 'VY=':
-                value = float(velocity_data[i+1])
-                velocity_vector['y'] = value * 1000.0
-                continue
-            elif velocity_data[i] == 'VZ' or velocity_data[i] == 'VZ=':
-                value = float(velocity_data[i+1])
-                velocity_vector['z'] = value * 1000.0
-                continue
-
-            if velocity_data[i].startswith('VX='):
-                _, value = velocity_data[i].split('=')
-                velocity_vector['x'] = float(value) * 1000.0
-            elif velocity_data[i].startswith('VY='):
-                _, value = velocity_data[i].split('=')
-                velocity_vector['y'] = float(value) * 1000.0
-            elif velocity_data[i].startswith('VZ='):
-                _, value = velocity_data[i].split('=')
-                velocity_vector['z'] = float(value) * 1000.0
+    columns = {column: array('d') for column in JPL_HORIZONS_VECTOR_COLUMNS}
+    epoch, x, y, z = columns['epoch'], columns['x'], columns['y'], columns['z']
+    vx, vy, vz = columns['vx'], columns['vy'], columns['vz']
 
-        vector_data.append({
-            'datetime': ephemeris_datetime,
-            'position': position_vector,
-            'velocity': velocity_vector
-        })
+    lines = iter(lines)
+    for line in lines:
+        if line.strip() == JPL_HORIZONS_START_OF_EPHEMERIS:
+            break
 
-    return vector_data
+    for line in lines:
+        if line.startswith(JPL_HORIZONS_END_OF_EPHEMERIS):
+            break
+
+        if ',' in line:
+            # JDTDB, Calendar Date (TDB), X, Y, Z, VX, VY, VZ[, LT, RG, RR],
+            fields = line.split(',')
+            epoch.append(float(fields[0]))
+            x.append(float(fields[2]) * 1000.0)
+            y.append(float(fields[3]) * 1000.0)
+            z.append(float(fields[4]) * 1000.0)
+            vx.append(float(fields[5]) * 1000.0)
+            vy.append(float(fields[6]) * 1000.0)
+            vz.append(float(fields[7]) * 1000.0)
+            continue
+
+        # the lines of a record are told apart by their first character, e.g. LT= lines are skipped
+        first_character = line.lstrip()[:1]
+        if first_character == 'X':
+            match = _jpl_horizons_position_regex.match(line)
+            if match:
+                x.append(float(match.group(1)) * 1000.0)
+                y.append(float(match.group(2)) * 1000.0)
+                z.append(float(match.group(3)) * 1000.0)
+        elif first_character == 'V':
+            match = _jpl_horizons_velocity_regex.match(line)
+            if match:
+                vx.append(float(match.group(1)) * 1000.0)
+                vy.append(float(match.group(2)) * 1000.0)
+                vz.append(float(match.group(3)) * 1000.0)
+        elif first_character.isdigit():
+            match = _jpl_horizons_epoch_regex.match(line)
+            if match:
+                epoch.append(float(match.group(1)))
+
+    if len(set(len(column) for column in columns.values())) != 1:
+        raise RuntimeError("Incomplete records in JPL Horizons System vector table")
+    return {column: np.frombuffer(values, dtype=np.float64) if len(values) else np.zeros(0) for column, values in columns.items()}
+
+def julian_day_to_datetime(julian_day: float) -> datetime:
+    # rounded to 0.1 ms, the resolution of the calendar dates of the JPL Horizons System
+    return J2000 + timedelta(microseconds=round((julian_day - JULIAN_DAY_J2000) * 864e6) * 100)
+
+def datetime_to_julian_day(date_time: datetime) -> float:
+    return JULIAN_DAY_J2000 + (date_time - J2000) / timedelta(days=1)
 
 def jpl_horizons_body_mass_kg(body_id: int, center: str = "@0"):
-    jpl_horizons_response = jpl_horizons_request({
-        'format': 'text',
-        'COMMAND': body_id,
-        'EPHEM_TYPE': "VECTORS",
-        'CENTER': center
-    })
+    return parse_jpl_horizons_body_mass_kg(jpl_horizons_body_request(body_id, center))
 
-    response_lines = jpl_horizons_response.text.split('\n')
+def parse_jpl_horizons_body_mass_kg(jpl_horizons_response: str):
+    response_lines = jpl_horizons_response.split('\n')
 
     mass_kg_regex = r"Mass(?:\,)?(?:\s*)?(?:x)?(?:\s*)?10\^(\d\d)(?:\s*)?(?:\()?kg(?:\))?(?:\s*)?=(?:\s*)(?:\~)?(\d+(?:.\d+)?)"
 
@@ -0,0 +1,117 @@
+import numpy as np
+
+from gravity_lab.checkpoint import state_arrays
+from gravity_lab.gravity_model import GravityModel
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, is_kinematic, is_test_particle
+from gravity_lab.spatial_index import UniformGridIndex
+
+# what an EncounterDetector does with the pairs of objects within the encounter radius
+ENCOUNTER_ACTIONS = ['flag', 'merge']
+
+class EncounterEvent():
+    # kind is 'encounter' when the pair of objects came within the encounter radius of each other and 'merge' when
+    # they were merged, into merged_object (one of the pair). distance is the distance of the pair at time
+    def __init__(self, kind: str, time: float, objects: tuple[PointParticle, PointParticle], distance: float,
+            merged_object: PointParticle = None):
+        self.kind = kind
+        self.time = time
+        self.objects = objects
+        self.distance = distance
+        self.merged_object = merged_object
+
+    def __str__(self) -> str:
+        return f"<{self.kind} at time={self.time} s, distance={self.distance} m>"
+
+def merge_objects(first: PointParticle, first_state: tuple[np.ndarray, np.ndarray],
+        second: PointParticle, second_state: tuple[np.ndarray, np.ndarray]) -> tuple[PointParticle, PointParticle]:
+    # Merges two objects in a perfectly inelastic collision, returns (merged object, absorbed object). The merged
+    # object is the kinematic one if there is one (it stays on its trajectory and gains the mass of the other), otherwise
+    # the heavier one, which takes the total mass at the center of mass with the total momentum. Test particles add
+    # no mass or momentum. The states are the (coordinate, velocity) of the objects as arrays
+    masses = [0.0 if is_test_particle(object) else object.mass for object in (first, second)]
+    if is_kinematic(second) or (not is_kinematic(first) and masses[1] > masses[0]):
+        first, second = second, first
+        first_state, second_state = second_state, first_state
+        masses.reverse()
+
+    total_mass = masses[0] + masses[1]
+    if total_mass > 0.0 and not is_test_particle(first):
+        if not is_kinematic(first):
+            first.coordinate = Vector(((masses[0] * first_state[0] + masses[1] * second_state[0]) / total_mass).tolist())
+            first.velocity = Vector(((masses[0] * first_state[1] + masses[1] * second_state[1]) / total_mass).tolist())
+        first.mass = total_mass
+    return first, second
+
+class EncounterDetector():
+    # Finds the pairs of objects of a model within encounter_radius of each other after every step of a ModelRunner.
+    # The pairs are found with a spatial hash grid with cells of the encounter radius (a UniformGridIndex refreshed
+    # incrementally every step), so only objects in neighbouring cells are compared and a check costs O(N).
+    # With action 'merge' the pairs are merged (see merge_objects) and removed from model.objects. With 'flag' they
+    # are flagged and while any pair is flagged the steps of the ModelRunner are split into substeps, so close
+    # encounters are integrated with smaller steps. Pairs of kinematic objects are flagged without substeps.
+    # Pairs of test particles are flagged even with 'merge': they do not interact, so merging them would only delete one
+    # on_event(event) is called with an EncounterEvent for every merge and every pair coming within the radius
+    def __init__(self, encounter_radius: float, action: str = 'flag', substeps: int = 16, on_event = None):
+        if not encounter_radius > 0.0:
+            raise ValueError(f"The encounter radius must be positive, not {encounter_radius}")
+        if action not in ENCOUNTER_ACTIONS:
+            raise ValueError(f"Unknown encounter action {action}. Expected one of {ENCOUNTER_ACTIONS}")
+        if substeps < 1:
+            raise ValueError(f"The number of substeps must be at least 1, not {substeps}")
+        self.encounter_radius = encounter_radius
+        self.action = action
+        self.substeps = substeps
+        self.on_event = on_event
+
+        # pairs of objects within the encounter radius at the last update
+        self.flagged_pairs = set()
+        self.index: UniformGridIndex = None
+
+    def close_pairs(self, positions: np.ndarray) -> np.ndarray:
+        # (M, 2) indices of the pairs of positions within the encounter radius
+        if self.index is None:
+            self.index = UniformGridIndex(positions, self.encounter_radius)
+        else:
+            self.index.update(positions)
+        return self.index.pairs_within(self.encounter_radius)
+
+    def update(self, model: GravityModel) -> int:
+        # Checks the objects of the model, returns the number of substeps the next step should be split into
+        positions, velocities, _ = state_arrays(model)
+        pairs = self.close_pairs(positions)
+        distances = np.linalg.norm(positions[pairs[:, 1]] - positions[pairs[:, 0]], axis=1)
+        # the closest pairs are handled first
+        pairs, distances = pairs[np.argsort(distances, kind='stable')].tolist(), np.sort(distances).tolist()
+
+        events = []
+        flagged_pairs = set()
+        merged, absorbed = set(), set()
+        for (i, j), distance in zip(pairs, distances):
+            first, second = model.objects[i], model.objects[j]
+            if self.action == 'merge' and not (is_kinematic(first) and is_kinematic(second)) and \
+                    not (is_test_particle(first) and is_test_particle(second)):
+                if id(first) in merged or id(second) in merged:
+                    # merged with another object in this update, checked again at the next one
+                    continue
+                merged_object, absorbed_object = merge_objects(first, (positions[i].copy(), velocities[i].copy()),
+                    second, (positions[j].copy(), velocities[j].copy()))
+                merged.update((id(first), id(second)))
+                absorbed.add(id(absorbed_object))
+                events.append(EncounterEvent('merge', model.time, (first, second), distance, merged_object))
+            else:
+                flagged_pairs.add((first, second))
+                if (first, second) not in self.flagged_pairs:
+                    events.append(EncounterEvent('encounter', model.time, (first, second), distance))
+
+        if len(absorbed) > 0:
+            # a new list, models that keep their state in arrays rebuild it when their objects change
+            model.objects = [object for object in model.objects if id(object) not in absorbed]
+        self.flagged_pairs = flagged_pairs
+
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        # kinematic objects are not integrated, their encounters need no substeps
+        integrated_encounter = any(not (is_kinematic(first) and is_kinematic(second)) for first, second in flagged_pairs)
+        return self.substeps if integrated_encounter else 1
@@ -0,0 +1,77 @@
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.gravity_model import GravityModel
+from gravity_lab.integrators import Integrator, LeapfrogIntegrator
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, TestParticle, is_test_particle
+from gravity_lab.force_backends import pairwise_accelerations
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+class EnsembleNewtonianMechanicsModel(GravityModel):
+    # M independent systems of the same N objects (e.g. runs of a Monte Carlo study with perturbed initial conditions
+    # or masses) stacked into (M, N, dimension) arrays and advanced by one vectorized step, so the interpreter overhead
+    # of a step is paid once for the whole ensemble. Members are added from lists of objects and can be extracted
+    # back out as regular models with member_model.
+    # Integrators that only use element-wise array operations (leapfrog, Yoshida, adaptive Runge-Kutta) step ensembles
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, members: list[list[PointParticle]] = [], integrator: Integrator = None):
+        super().__init__(coordinate_system, [], integrator if integrator is not None else LeapfrogIntegrator())
+
+        self.positions = None
+        self.velocities = None
+        self.masses = None
+        self.source_masses = None
+        self.test_particles = None
+
+        for member_objects in members:
+            self.add_member(member_objects)
+
+    def num_members(self) -> int:
+        return 0 if self.positions is None else len(self.positions)
+
+    def add_member(self, member_objects: list[PointParticle]):
+        positions = np.array([object.coordinate.components for object in member_objects], dtype=float)
+        velocities = np.array([object.velocity.components for object in member_objects], dtype=float)
+        masses = np.array([object.mass for object in member_objects], dtype=float)
+        test_particles = np.array([is_test_particle(object) for object in member_objects], dtype=bool)
+
+        if self.positions is None:
+            self.positions = positions[np.newaxis]
+            self.velocities = velocities[np.newaxis]
+            self.masses = masses[np.newaxis]
+            self.test_particles = test_particles
+        else:
+            if positions.shape != self.positions.shape[1:]:
+                raise ValueError(f"Ensemble members have {self.positions.shape[1]} objects of dimension {self.positions.shape[2]}")
+            if not np.array_equal(test_particles, self.test_particles):
+                raise ValueError("Ensemble members must have their test particles at the same indices")
+            self.positions = np.concatenate([self.positions, positions[np.newaxis]])
+            self.velocities = np.concatenate([self.velocities, velocities[np.newaxis]])
+            self.masses = np.concatenate([self.masses, masses[np.newaxis]])
+
+        self.source_masses = np.where(self.test_particles, 0.0, self.masses)
+
+    def member_model(self, member_index: int, integrator: Integrator = None) -> VectorizedNewtonianMechanicsModel:
+        # the state of a member as a regular model with its own objects
+        objects = []
+        for i in range(self.positions.shape[1]):
+            coordinate = Vector(list(self.positions[member_index, i]))
+            velocity = Vector(list(self.velocities[member_index, i]))
+            if self.test_particles[i]:
+                objects.append(TestParticle(coordinate, velocity, float(self.masses[member_index, i])))
+            else:
+                objects.append(PointParticle(float(self.masses[member_index, i]), coordinate, velocity))
+
+        model = VectorizedNewtonianMechanicsModel(self.coordinate_system, objects, integrator)
+        model.time = self.time
+        return model
+
+    def accelerations(self, positions: np.ndarray, time: float = None, targets: np.ndarray = None) -> np.ndarray:
+        target_positions = positions if targets is None else positions[:, targets]
+        # test particles are sources without mass
+        return pairwise_accelerations(target_positions, positions, self.source_masses)
+
+    def step(self, delta: float):
+        if self.positions is not None:
+            self.integrator.step(self, delta)
+        self.time += delta
@@ -0,0 +1,237 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+# numba is optional, without it NumbaForceBackend falls back to tiled numpy
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+
+def pairwise_accelerations(target_positions: np.ndarray, source_positions: np.ndarray, source_masses: np.ndarray,
+        softening_length: float = 0.0) -> np.ndarray:
+    # a_i = G * sum_j m_j * (x_j - x_i) / (|x_j - x_i|^2 + eps^2)^(3/2)
+    # eps is the softening length of Plummer softening: the force of a pair at distance r is the force of two Plummer
+    # spheres of scale eps, which stays finite as r goes to 0. The force is Newtonian for r >> eps and eps = 0 is unsoftened.
+    # r_vecs[..., i, j, :] is the vector from target i to source j. Leading axes are independent systems (e.g. of an ensemble)
+    r_vecs = source_positions[..., np.newaxis, :, :] - target_positions[..., :, np.newaxis, :]
+    r_mag_squared = np.einsum('...ijk,...ijk->...ij', r_vecs, r_vecs)
+
+    # an object at the same position as a source (e.g. itself) feels no force from it
+    with np.errstate(divide='ignore'):
+        inv_r_mag_cubed = np.where(r_mag_squared > 0.0, (r_mag_squared + softening_length * softening_length) ** -1.5, 0.0)
+
+    return gravitational_constant * np.einsum('...ij,...ijk->...ik', inv_r_mag_cubed * source_masses[..., np.newaxis, :], r_vecs)
+
+def pairwise_jerks(target_positions: np.ndarray, target_velocities: np.ndarray, source_positions: np.ndarray, source_velocities: np.ndarray, source_masses: np.ndarray,
+        softening_length: float = 0.0) -> np.ndarray:
+    # time derivative of the (softened) accelerations, with s_ij^2 = |r_ij|^2 + eps^2
+    # j_i = G * sum_j m_j * (v_ij / s_ij^3 - 3 * (r_ij . v_ij) * r_ij / s_ij^5)
+    r_vecs = source_positions[np.newaxis, :, :] - target_positions[:, np.newaxis, :]
+    v_vecs = source_velocities[np.newaxis, :, :] - target_velocities[:, np.newaxis, :]
+    r_mag_squared = np.einsum('ijk,ijk->ij', r_vecs, r_vecs)
+    r_dot_v = np.einsum('ijk,ijk->ij', r_vecs, v_vecs)
+    softened_r_mag_squared = r_mag_squared + softening_length * softening_length
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_r_mag_cubed = np.where(r_mag_squared > 0.0, softened_r_mag_squared ** -1.5, 0.0)
+        r_dot_v_over_r_mag_squared = np.where(r_mag_squared > 0.0, r_dot_v / softened_r_mag_squared, 0.0)
+
+    weights = inv_r_mag_cubed * source_masses
+    return gravitational_constant * (np.einsum('ij,ijk->ik', weights, v_vecs) - 3.0 * np.einsum('ij,ijk->ik', weights * r_dot_v_over_r_mag_squared, r_vecs))
+
+def tiled_pairwise_accelerations(target_positions: np.ndarray, source_positions: np.ndarray, source_masses: np.ndarray,
+        tile_size: int = 256, out: np.ndarray = None, softening_length: float = 0.0) -> np.ndarray:
+    # pairwise_accelerations in blocks of tile_size targets and sources, so the temporaries are at most
+    # tile_size x tile_size instead of num_targets x num_sources
+    if out is None:
+        out = np.empty_like(target_positions)
+    for target_start in range(0, len(target_positions), tile_size):
+        target_end = target_start + tile_size
+        tile_accelerations = np.zeros((len(target_positions[target_start:target_end]), target_positions.shape[1]))
+        for source_start in range(0, len(source_positions), tile_size):
+            source_end = source_start + tile_size
+            tile_accelerations += pairwise_accelerations(target_positions[target_start:target_end],
+                source_positions[source_start:source_end], source_masses[source_start:source_end], softening_length)
+        out[target_start:target_end] = tile_accelerations
+    return out
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _numba_pairwise_accelerations(target_positions, source_positions, source_masses, tile_size, softening_squared, out):
+        # Same sum as pairwise_accelerations for 2 or 3 dimensions without temporaries. The sources are walked in
+        # tiles that stay in cache while the targets are split across threads and accumulated in registers
+        num_targets, dimension = target_positions.shape
+        num_sources = source_positions.shape[0]
+        out[:, :] = 0.0
+        for source_start in range(0, num_sources, tile_size):
+            source_end = min(source_start + tile_size, num_sources)
+            for i in numba.prange(num_targets):
+                x = target_positions[i, 0]
+                y = target_positions[i, 1]
+                z = target_positions[i, 2] if dimension == 3 else 0.0
+                ax = 0.0
+                ay = 0.0
+                az = 0.0
+                for j in range(source_start, source_end):
+                    dx = source_positions[j, 0] - x
+                    dy = source_positions[j, 1] - y
+                    dz = source_positions[j, 2] - z if dimension == 3 else 0.0
+                    r_mag_squared = dx * dx + dy * dy + dz * dz
+                    if r_mag_squared > 0.0:
+                        r_mag_squared += softening_squared
+                        weight = source_masses[j] / (r_mag_squared * np.sqrt(r_mag_squared))
+                        ax += weight * dx
+                        ay += weight * dy
+                        az += weight * dz
+                out[i, 0] += gravitational_constant * ax
+                out[i, 1] += gravitational_constant * ay
+                if dimension == 3:
+                    out[i, 2] += gravitational_constant * az
+        return out
+
+# A force backend calculates the pairwise accelerations of VectorizedNewtonianMechanicsModel:
+# backend.accelerations(target_positions, source_positions, source_masses, softening_length) -> (num_targets, dimension)
+class NumpyForceBackend():
+    # all pairs in one batched pass, with O(num_targets * num_sources) temporaries
+    def accelerations(self, target_positions: np.ndarray, source_positions: np.ndarray, source_masses: np.ndarray,
+            softening_length: float = 0.0) -> np.ndarray:
+        return pairwise_accelerations(target_positions, source_positions, source_masses, softening_length)
+
+class NumbaForceBackend():
+    # Compiled tiled kernel with no O(num_targets * num_sources) temporaries. The kernel is compiled on the first call.
+    # Without numba (or for dimensions other than 2 and 3) the accelerations are calculated with tiled numpy,
+    # which also keeps the temporaries at tile_size x tile_size
+    def __init__(self, tile_size: int = 512):
+        self.tile_size = tile_size
+
+    def accelerations(self, target_positions: np.ndarray, source_positions: np.ndarray, source_masses: np.ndarray,
+            softening_length: float = 0.0) -> np.ndarray:
+        if numba is None or target_positions.shape[1] not in (2, 3):
+            return tiled_pairwise_accelerations(target_positions, source_positions, source_masses, self.tile_size, softening_length=softening_length)
+
+        return _numba_pairwise_accelerations(np.ascontiguousarray(target_positions, dtype=np.float64),
+            np.ascontiguousarray(source_positions, dtype=np.float64), np.ascontiguousarray(source_masses, dtype=np.float64),
+            self.tile_size, softening_length * softening_length, np.empty(target_positions.shape))
+
+class SharedArray():
+    # numpy array in a shared memory block, attached to by name from other processes
+    def __init__(self, shape: tuple, name: str = None):
+        self.shape = shape
+        size = max(int(np.prod(shape)) * 8, 8)
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        self.name = self.shared_memory.name
+        self.array = np.ndarray(shape, dtype=np.float64, buffer=self.shared_memory.buf)
+
+    def close(self, unlink: bool = False):
+        self.array = None
+        self.shared_memory.close()
+        if unlink:
+            self.shared_memory.unlink()
+
+# shared arrays attached to by a worker process, kept between tasks
+_worker_shared_arrays = {}
+
+def _worker_shared_array(key: str, name: str, shape: tuple) -> np.ndarray:
+    shared_array = _worker_shared_arrays.get(key)
+    if shared_array is None or shared_array.name != name or shared_array.shape != shape:
+        if shared_array is not None:
+            shared_array.close()
+        shared_array = SharedArray(shape, name)
+        _worker_shared_arrays[key] = shared_array
+    return shared_array.array
+
+def _accelerations_tile(names: dict, shapes: dict, target_start: int, target_end: int, tile_size: int, softening_length: float):
+    # Calculates the accelerations of the targets [target_start, target_end) from all sources. The rows of the
+    # output are only written by this task
+    target_positions = _worker_shared_array('target_positions', names['target_positions'], shapes['target_positions'])
+    source_positions = _worker_shared_array('source_positions', names['source_positions'], shapes['source_positions'])
+    source_masses = _worker_shared_array('source_masses', names['source_masses'], shapes['source_masses'])
+    accelerations = _worker_shared_array('accelerations', names['accelerations'], shapes['accelerations'])
+
+    tiled_pairwise_accelerations(target_positions[target_start:target_end], source_positions, source_masses, tile_size,
+        out=accelerations[target_start:target_end], softening_length=softening_length)
+
+class ProcessPoolForceBackend():
+    # Splits the targets into tiles of tile_size rows calculated by a pool of worker processes. Positions, masses and
+    # accelerations are exchanged through shared memory buffers, so only the names and bounds of the tiles are pickled.
+    # The buffers are only reallocated when the number of objects grows. close stops the workers and frees the buffers,
+    # call it (or use the backend in a with statement) when done, e.g. with VectorizedNewtonianMechanicsModel.close
+    def __init__(self, num_workers: int = None, tile_size: int = 256):
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count()
+        self.tile_size = tile_size
+
+        self._pool = None
+        self._shared_arrays = {}
+
+    def _shared_array(self, key: str, shape: tuple) -> np.ndarray:
+        shared_array = self._shared_arrays.get(key)
+        if shared_array is None or shared_array.shape != shape:
+            if shared_array is not None:
+                shared_array.close(unlink=True)
+            shared_array = SharedArray(shape)
+            self._shared_arrays[key] = shared_array
+        return shared_array.array
+
+    def accelerations(self, target_positions: np.ndarray, source_positions: np.ndarray, source_masses: np.ndarray,
+            softening_length: float = 0.0) -> np.ndarray:
+        if len(target_positions) == 0 or len(source_positions) == 0:
+            return np.zeros_like(target_positions)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.num_workers)
+
+        inputs = {'target_positions': target_positions, 'source_positions': source_positions, 'source_masses': source_masses}
+        for key, array in inputs.items():
+            self._shared_array(key, array.shape)[:] = array
+        accelerations = self._shared_array('accelerations', target_positions.shape)
+
+        names = {key: shared_array.name for key, shared_array in self._shared_arrays.items()}
+        shapes = {key: shared_array.shape for key, shared_array in self._shared_arrays.items()}
+
+        # at least one tile per worker
+        tile_rows = max(1, min(self.tile_size, -(-len(target_positions) // self.num_workers)))
+        tasks = [self._pool.submit(_accelerations_tile, names, shapes, start, min(start + tile_rows, len(target_positions)), self.tile_size,
+            softening_length)
+            for start in range(0, len(target_positions), tile_rows)]
+        for task in tasks:
+            task.result()
+
+        return accelerations.copy()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for shared_array in self._shared_arrays.values():
+            shared_array.close(unlink=True)
+        self._shared_arrays = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # the pool and shared memory belong to the process that created them
+        return {'num_workers': self.num_workers, 'tile_size': self.tile_size, '_pool': None, '_shared_arrays': {}}
+
+FORCE_BACKENDS = {'numpy': NumpyForceBackend, 'numba': NumbaForceBackend, 'process': ProcessPoolForceBackend}
+
+def force_backend(backend) -> object:
+    # backend is a backend object, or the name of one of FORCE_BACKENDS created with its default arguments
+    if backend is None:
+        return NumpyForceBackend()
+    if isinstance(backend, str):
+        if backend not in FORCE_BACKENDS:
+            raise ValueError(f"Unknown force backend {backend}. Expected one of {list(FORCE_BACKENDS)}")
+        return FORCE_BACKENDS[backend]()
+    return backend
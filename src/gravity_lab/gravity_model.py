@@ -1,28 +1,106 @@
 from numbers import Number
 
+import numpy as np
+
+from gravity_lab.spatial_index import UniformGridIndex
+
 class Object():
     def __init__(self, coordinate: list[int]):
         self.coordinate = coordinate
 
+def _coordinate_array(coordinate) -> np.ndarray:
+    # coordinates are Vectors or sequences of numbers
+    return np.asarray(getattr(coordinate, 'components', coordinate), dtype=np.float64)
+
 class CoordinateSystem():
     def __init__(self, dimension: int):
         self.dimension = dimension
+        # the objects placed in the coordinate system by index_objects and the spatial index of their positions
+        self.indexed_objects = []
+        self.object_index: UniformGridIndex = None
 
-    def at_coordinate(coordinate: list[int]) -> Object:
-        pass
+    def index_objects(self, objects: list[Object], positions: np.ndarray = None, cell_size: float = None):
+        # positions are the (N, dimension) positions of the objects, their coordinates by default. Indexing the same
+        # number of objects again with the same cell size updates the index incrementally, e.g. after every step
+        if positions is None:
+            positions = np.array([object.coordinate.components for object in objects], dtype=np.float64).reshape(len(objects), self.dimension)
+        if self.object_index is not None and len(self.object_index) == len(objects) and cell_size in (None, self.object_index.cell_size):
+            self.object_index.update(positions)
+        else:
+            self.object_index = UniformGridIndex(positions, cell_size)
+        self.indexed_objects = list(objects)
+
+    def _indexed(self) -> UniformGridIndex:
+        if self.object_index is None:
+            raise RuntimeError("No objects are indexed, call index_objects first")
+        return self.object_index
+
+    # The object nearest to the coordinate, None if no object is within max_distance of it
+    def at_coordinate(self, coordinate: list[Number], max_distance: float = np.inf) -> Object:
+        nearest = self._indexed().nearest(_coordinate_array(coordinate), 1, max_distance)
+        return self.indexed_objects[nearest[0]] if len(nearest) > 0 else None
+
+    def objects_within(self, coordinate: list[Number], radius: float) -> list[Object]:
+        return [self.indexed_objects[i] for i in self._indexed().within_radius(_coordinate_array(coordinate), radius).tolist()]
+
+    def objects_in_box(self, low: list[Number], high: list[Number]) -> list[Object]:
+        return [self.indexed_objects[i] for i in self._indexed().within_box(_coordinate_array(low), _coordinate_array(high)).tolist()]
 
 class GravityModel():
-    def __init__(self, coordinate_system: CoordinateSystem, objects: list[Object] = []):
+    # integrator is a gravity_lab.integrators.Integrator, used by models that keep their state in arrays
+    def __init__(self, coordinate_system: CoordinateSystem, objects: list[Object] = [], integrator = None):
         self.coordinate_system = coordinate_system
         self.objects = objects
+        self.integrator = integrator
+        # simulation time in seconds, advanced by every step
+        self.time = 0.0
 
     def step(delta: Number):
         pass
 
+    # Indexes the objects at their current coordinates in the coordinate system, for its at_coordinate, objects_within
+    # and objects_in_box queries. Call again after steps to refresh the index, ModelRunner.run does after every step
+    def index_objects(self, cell_size: float = None):
+        positions = None
+        if hasattr(self, 'sync_state'):
+            # models that keep their state in arrays index the arrays
+            self.sync_state()
+            positions = self.positions
+        self.coordinate_system.index_objects(self.objects, positions, cell_size)
+
 class ModelRunner():
-    def __init__(self, model: GravityModel):
+    # checkpointer is a gravity_lab.checkpoint.Checkpointer writing checkpoints of the model while it runs.
+    # encounter_detector is a gravity_lab.encounters.EncounterDetector checking the model before the first step and
+    # after every step, which can merge objects or split the next step into substeps.
+    # If the objects of the model are indexed (see GravityModel.index_objects) the index is refreshed after every
+    # step, incrementally for the objects that changed cell, so the coordinate queries follow the run
+    def __init__(self, model: GravityModel, integrator = None, checkpointer = None, encounter_detector = None):
         self.model = model
+        self.checkpointer = checkpointer
+        self.encounter_detector = encounter_detector
+        if integrator is not None:
+            if not hasattr(model, 'accelerations'):
+                raise ValueError(f"{model.__class__.__name__} does not support integrators")
+            self.model.integrator = integrator
 
-    def run(self, num_steps: int, delta: Number):
-        for _ in range(num_steps):
-            self.model.step(delta)
\ No newline at end of file
+    # on_step(step_index) is called after every step, e.g. to record the state of the model. The run stops after
+    # the step when on_step returns True. Returns the number of steps run
+    def run(self, num_steps: int, delta: Number, on_step = None) -> int:
+        num_substeps = self.encounter_detector.update(self.model) if self.encounter_detector is not None else 1
+        for step_index in range(num_steps):
+            for _ in range(num_substeps):
+                self.model.step(delta / num_substeps)
+            if self.encounter_detector is not None:
+                num_substeps = self.encounter_detector.update(self.model)
+            object_index = self.model.coordinate_system.object_index
+            if object_index is not None:
+                self.model.index_objects(object_index.cell_size)
+            stop = on_step(step_index) if on_step is not None else False
+            if stop:
+                num_steps = step_index + 1
+                break
+            if self.checkpointer is not None:
+                self.checkpointer.update(self.model)
+        if self.checkpointer is not None and num_steps > 0:
+            self.checkpointer.update(self.model, force=True)
+        return num_steps
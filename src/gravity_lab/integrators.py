@@ -0,0 +1,359 @@
+from math import factorial
+
+import numpy as np
+
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+
+# Integrators advance the state of models that keep it in arrays: model.positions and model.velocities of shape
+# (N, dimension) are updated in place (objects may be viewing them) and model.accelerations(positions, time)
+# calculates the acceleration of every object. model.time is the time at the start of the step
+class Integrator():
+    def __init__(self):
+        # number of times the integrator calculated the accelerations of the model, the cost of most models
+        self.force_evaluations = 0
+
+    def accelerations(self, model, positions, time: float, targets: np.ndarray = None) -> np.ndarray:
+        self.force_evaluations += 1
+        if targets is None:
+            return model.accelerations(positions, time)
+        return model.accelerations(positions, time, targets)
+
+    def step(self, model, delta: float):
+        raise NotImplementedError()
+
+    # integrator state that has to be saved to resume a run, e.g. the step size of adaptive integrators
+    def state(self) -> dict:
+        return {}
+
+    def restore_state(self, state: dict):
+        pass
+
+class LeapfrogIntegrator(Integrator):
+    # Second order, symplectic and time reversible: drift half a step, kick a full step with the
+    # accelerations at the midpoint, drift the other half step. One force evaluation per step
+    def step(self, model, delta: float):
+        model.positions += model.velocities * (delta / 2.0)
+        model.velocities += self.accelerations(model, model.positions, model.time + delta / 2.0) * delta
+        model.positions += model.velocities * (delta / 2.0)
+
+# Yoshida (1990) 4th order composition of three leapfrog steps
+YOSHIDA_W1 = 1.0 / (2.0 - 2.0 ** (1.0 / 3.0))
+YOSHIDA_W0 = -(2.0 ** (1.0 / 3.0)) / (2.0 - 2.0 ** (1.0 / 3.0))
+YOSHIDA_DRIFT_COEFFICIENTS = [YOSHIDA_W1 / 2.0, (YOSHIDA_W0 + YOSHIDA_W1) / 2.0, (YOSHIDA_W0 + YOSHIDA_W1) / 2.0, YOSHIDA_W1 / 2.0]
+YOSHIDA_KICK_COEFFICIENTS = [YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1]
+
+class YoshidaIntegrator(Integrator):
+    # Fourth order and symplectic. Three force evaluations per step
+    def step(self, model, delta: float):
+        time = model.time
+        for i, kick_coefficient in enumerate(YOSHIDA_KICK_COEFFICIENTS):
+            model.positions += model.velocities * (YOSHIDA_DRIFT_COEFFICIENTS[i] * delta)
+            time += YOSHIDA_DRIFT_COEFFICIENTS[i] * delta
+            model.velocities += self.accelerations(model, model.positions, time) * (kick_coefficient * delta)
+        model.positions += model.velocities * (YOSHIDA_DRIFT_COEFFICIENTS[-1] * delta)
+
+# Dormand-Prince 5(4) butcher tableau
+DORMAND_PRINCE_C = [0.0, 1.0 / 5.0, 3.0 / 10.0, 4.0 / 5.0, 8.0 / 9.0, 1.0, 1.0]
+DORMAND_PRINCE_A = [
+    [],
+    [1.0 / 5.0],
+    [3.0 / 40.0, 9.0 / 40.0],
+    [44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0],
+    [19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0],
+    [9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0],
+    [35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0]
+]
+DORMAND_PRINCE_B5 = DORMAND_PRINCE_A[6] + [0.0]
+DORMAND_PRINCE_B4 = [5179.0 / 57600.0, 0.0, 7571.0 / 16695.0, 393.0 / 640.0, -92097.0 / 339200.0, 187.0 / 2100.0, 1.0 / 40.0]
+DORMAND_PRINCE_ERROR = [b5 - b4 for b5, b4 in zip(DORMAND_PRINCE_B5, DORMAND_PRINCE_B4)]
+
+class AdaptiveRungeKuttaIntegrator(Integrator):
+    # Embedded Dormand-Prince 5(4) Runge-Kutta. A step of delta is made of as many sub-steps as needed to keep the
+    # estimated error of each sub-step below atol + rtol * (size of the state), measured separately for the positions
+    # and velocities. The sub-step size is kept between steps
+    def __init__(self, rtol: float = 1e-9, atol: float = 0.0, safety: float = 0.9, min_factor: float = 0.2, max_factor: float = 5.0):
+        super().__init__()
+        self.rtol = rtol
+        self.atol = atol
+        self.safety = safety
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+
+        self.substep = None
+        self.rejected_substeps = 0
+
+    def state(self) -> dict:
+        return {'substep': self.substep}
+
+    def restore_state(self, state: dict):
+        self.substep = state['substep']
+
+    def step(self, model, delta: float):
+        time = model.time
+        end_time = model.time + delta
+        positions, velocities = model.positions.copy(), model.velocities.copy()
+        # the last stage of an accepted sub-step is the first stage of the next one
+        first_stage_accelerations = None
+
+        if self.substep is None or self.substep <= 0.0:
+            self.substep = abs(delta)
+
+        # the end time is only reached up to rounding errors of the sub-step sizes
+        while abs(end_time - time) > 1e-12 * abs(delta):
+            substep = min(self.substep, abs(end_time - time)) * np.sign(delta)
+
+            if first_stage_accelerations is None:
+                first_stage_accelerations = self.accelerations(model, positions, time)
+
+            # stages of d(position)/dt = velocity, d(velocity)/dt = acceleration
+            position_stages = [velocities]
+            velocity_stages = [first_stage_accelerations]
+            for stage in range(1, 7):
+                stage_positions = positions + substep * sum(a * k for a, k in zip(DORMAND_PRINCE_A[stage], position_stages) if a != 0.0)
+                stage_velocities = velocities + substep * sum(a * k for a, k in zip(DORMAND_PRINCE_A[stage], velocity_stages) if a != 0.0)
+                position_stages.append(stage_velocities)
+                velocity_stages.append(self.accelerations(model, stage_positions, time + DORMAND_PRINCE_C[stage] * substep))
+
+            # the 7th stage is evaluated at the 5th order solution
+            new_positions, new_velocities = stage_positions, stage_velocities
+            position_error = substep * sum(e * k for e, k in zip(DORMAND_PRINCE_ERROR, position_stages) if e != 0.0)
+            velocity_error = substep * sum(e * k for e, k in zip(DORMAND_PRINCE_ERROR, velocity_stages) if e != 0.0)
+
+            error_ratio = max(
+                self._error_ratio(position_error, positions, new_positions),
+                self._error_ratio(velocity_error, velocities, new_velocities))
+
+            if error_ratio <= 1.0:
+                time += substep
+                positions, velocities = new_positions, new_velocities
+                first_stage_accelerations = velocity_stages[-1]
+            else:
+                self.rejected_substeps += 1
+
+            if error_ratio == 0.0:
+                factor = self.max_factor
+            else:
+                factor = min(self.max_factor, max(self.min_factor, self.safety * error_ratio ** -0.2))
+            # a sub-step shortened to end exactly at end_time does not shrink the next one
+            if error_ratio > 1.0 or abs(substep) >= self.substep:
+                self.substep = abs(substep) * factor
+
+        model.positions[:] = positions
+        model.velocities[:] = velocities
+
+    def _error_ratio(self, error: np.ndarray, state: np.ndarray, new_state: np.ndarray) -> float:
+        if len(state) == 0:
+            return 0.0
+        scale = self.atol + self.rtol * max(np.max(np.abs(state)), np.max(np.abs(new_state)))
+        if scale == 0.0:
+            return 0.0 if not np.any(error) else float('inf')
+        return float(np.max(np.abs(error))) / scale
+
+class BlockTimestepIntegrator(Integrator):
+    # Leapfrog (kick-drift-kick) with individual time steps. Every object steps with delta / 2^level, where the level is
+    # chosen from its acceleration and jerk: the time step of an object is at most eta * |acceleration| / |jerk|, up to
+    # max_level. The time steps of the objects are nested powers of two so at every sub-step only the objects whose
+    # step ends (the active objects) have their forces calculated, and the objects are all in sync again at the end of a step.
+    # Objects in wide orbits only pay for their own steps instead of the steps of the closest orbits.
+    # The model has to calculate the accelerations of a subset of its objects (targets) and jerks
+    def __init__(self, max_level: int = 8, eta: float = 0.02):
+        super().__init__()
+        self.max_level = max_level
+        self.eta = eta
+
+        # number of force evaluations of single objects, the cost of the step
+        self.object_force_evaluations = 0
+
+        # the accelerations at the end of a step are the accelerations at the start of the next one
+        self._last_positions = None
+        self._last_accelerations = None
+
+    def step(self, model, delta: float):
+        num_objects = len(model.positions)
+        num_substeps = 2 ** self.max_level
+        substep = delta / num_substeps
+
+        if self._last_positions is not None and np.array_equal(self._last_positions, model.positions):
+            accelerations = self._last_accelerations
+        else:
+            accelerations = self.accelerations(model, model.positions, model.time)
+            self.object_force_evaluations += num_objects
+
+        all_objects = np.arange(num_objects)
+        levels = self._levels(model, accelerations, all_objects, delta, 0)
+        model.velocities += accelerations * (delta / 2.0 ** levels / 2.0)[:, np.newaxis]
+
+        for i in range(1, num_substeps + 1):
+            model.positions += model.velocities * substep
+
+            # an object is active when its step ends at this sub-step. All objects are active at the last sub-step
+            active = all_objects[i % (2 ** (self.max_level - levels)) == 0]
+            if len(active) == 0:
+                continue
+
+            active_accelerations = self.accelerations(model, model.positions, model.time + i * substep, active)
+            self.object_force_evaluations += len(active)
+            accelerations[active] = active_accelerations
+
+            # closing half kick of the step that ended and opening half kick of the next one
+            model.velocities[active] += active_accelerations * (delta / 2.0 ** levels[active] / 2.0)[:, np.newaxis]
+            if i < num_substeps:
+                levels[active] = self._levels(model, active_accelerations, active, delta, i)
+                model.velocities[active] += active_accelerations * (delta / 2.0 ** levels[active] / 2.0)[:, np.newaxis]
+
+        self._last_positions = model.positions.copy()
+        self._last_accelerations = accelerations
+
+    def _levels(self, model, accelerations: np.ndarray, targets: np.ndarray, delta: float, substep_index: int) -> np.ndarray:
+        # time step of the targets from eta * |a| / |j|, rounded down to a power of two fraction of delta
+        jerks = model.jerks(model.positions, model.velocities, targets)
+        acceleration_mag = np.sqrt(np.einsum('ij,ij->i', accelerations, accelerations))
+        jerk_mag = np.sqrt(np.einsum('ij,ij->i', jerks, jerks))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            timesteps = np.where(jerk_mag > 0.0, self.eta * acceleration_mag / jerk_mag, np.inf)
+            levels = np.ceil(np.log2(delta / timesteps))
+        levels = np.clip(np.nan_to_num(levels, nan=0.0, posinf=self.max_level, neginf=0.0), 0, self.max_level).astype(np.int64)
+
+        # a step can only start at a sub-step that is a multiple of its length. Objects can always
+        # move to a smaller step, and to a larger one when the current sub-step is aligned with it
+        if substep_index > 0:
+            lowest_level = self.max_level - (substep_index & -substep_index).bit_length() + 1
+            levels = np.maximum(levels, lowest_level)
+        return levels
+
+# coefficients of the series of the stumpff functions c2 and c3, highest power first for horner's method
+STUMPFF_C2_SERIES = [(-1) ** n / factorial(2 * n + 2) for n in reversed(range(8))]
+STUMPFF_C3_SERIES = [(-1) ** n / factorial(2 * n + 3) for n in reversed(range(8))]
+
+def stumpff_functions(z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # c_k(z) = sum_n (-z)^n / (2n + k)!. The series is used close to 0, where the closed forms lose precision
+    c2 = np.empty_like(z)
+    c3 = np.empty_like(z)
+
+    small = np.abs(z) < 0.1
+    if np.any(small):
+        z_small = z[small]
+        c2_small, c3_small = np.zeros_like(z_small), np.zeros_like(z_small)
+        for c2_coefficient, c3_coefficient in zip(STUMPFF_C2_SERIES, STUMPFF_C3_SERIES):
+            c2_small = c2_small * z_small + c2_coefficient
+            c3_small = c3_small * z_small + c3_coefficient
+        c2[small] = c2_small
+        c3[small] = c3_small
+
+    large = ~small
+    if np.any(large):
+        z_large = z[large]
+        root = np.sqrt(np.abs(z_large))
+        elliptic = z_large > 0.0
+        c0_large = np.where(elliptic, np.cos(root), np.cosh(root))
+        c1_large = np.where(elliptic, np.sin(root), np.sinh(root)) / root
+        c2[large] = (1.0 - c0_large) / z_large
+        c3[large] = (1.0 - c1_large) / z_large
+
+    c0 = 1.0 - z * c2
+    c1 = 1.0 - z * c3
+    return c0, c1, c2, c3
+
+def kepler_drift(positions: np.ndarray, velocities: np.ndarray, mu: float, delta: float, tolerance: float = 1e-15, max_iterations: int = 50) -> tuple[np.ndarray, np.ndarray]:
+    # Advances every (position, velocity) pair by delta on its Kepler orbit around a fixed mass with mu = G * mass.
+    # Solves Kepler's equation in universal variables with the f and g functions, so elliptic, parabolic and
+    # hyperbolic orbits are handled the same way
+    r0 = np.sqrt(np.einsum('ij,ij->i', positions, positions))
+    eta = np.einsum('ij,ij->i', positions, velocities)
+    beta = 2.0 * mu / r0 - np.einsum('ij,ij->i', velocities, velocities)
+
+    # bound orbits only have to be advanced by the part of delta that is not a whole number of periods
+    bound = beta > 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        period = np.where(bound, 2.0 * np.pi * mu / np.abs(beta) ** 1.5, np.inf)
+    time = np.where(bound, np.fmod(delta, period), delta)
+
+    # the universal anomaly s grows with dt / r, initially guessed from the mean of 1 / r over the orbit
+    s = np.where(bound, time * beta / mu, time / r0)
+    for _ in range(max_iterations):
+        c0, c1, c2, c3 = stumpff_functions(beta * s * s)
+        g1, g2, g3 = s * c1, s * s * c2, s * s * s * c3
+        r = r0 * c0 + eta * g1 + mu * g2
+        correction = (r0 * g1 + eta * g2 + mu * g3 - time) / r
+        s = s - correction
+        if np.all(np.abs(correction) <= tolerance * np.maximum(np.abs(s), tolerance)):
+            break
+
+    c0, c1, c2, c3 = stumpff_functions(beta * s * s)
+    g1, g2, g3 = s * c1, s * s * c2, s * s * s * c3
+    r = r0 * c0 + eta * g1 + mu * g2
+
+    f = 1.0 - mu * g2 / r0
+    g = time - mu * g3
+    f_dot = -mu * g1 / (r * r0)
+    g_dot = 1.0 - mu * g2 / r
+    new_positions = f[:, np.newaxis] * positions + g[:, np.newaxis] * velocities
+    new_velocities = f_dot[:, np.newaxis] * positions + g_dot[:, np.newaxis] * velocities
+    return new_positions, new_velocities
+
+class WisdomHolmanIntegrator(Integrator):
+    # Mapping integrator for systems dominated by one central mass (e.g. the Sun of the solar system), in democratic
+    # heliocentric coordinates (Duncan, Levison & Lee 1998). The orbit of every object around the central object is
+    # solved analytically (kepler_drift) and only the forces between the other objects are applied as kicks, so steps
+    # can be a fraction of the shortest orbital period instead of a fraction of its closest approach time.
+    # By default the central object is the most massive one
+    def __init__(self, central_object_index: int = None):
+        super().__init__()
+        self.central_object_index = central_object_index
+
+        # the accelerations at the end of a step are the accelerations at the start of the next one
+        self._last_positions = None
+        self._last_accelerations = None
+
+    def step(self, model, delta: float):
+        if len(model.positions) < 2:
+            model.positions += model.velocities * delta
+            return
+
+        masses = model.masses
+        central = self.central_object_index if self.central_object_index is not None else int(np.argmax(masses))
+        others = np.arange(len(masses)) != central
+        other_masses = masses[others]
+        central_mass = masses[central]
+        total_mass = masses.sum()
+        mu = gravitational_constant * central_mass
+
+        # heliocentric positions and barycentric velocities of the other objects
+        center_of_mass = masses @ model.positions / total_mass
+        center_of_mass_velocity = masses @ model.velocities / total_mass
+        positions = model.positions[others] - model.positions[central]
+        velocities = model.velocities[others] - center_of_mass_velocity
+
+        if self._last_positions is not None and np.array_equal(self._last_positions, model.positions):
+            accelerations = self._last_accelerations
+        else:
+            accelerations = self._interaction_accelerations(model, model.positions.copy(), model.time, others, mu)
+
+        # kick, jump, kepler drift, jump, kick
+        velocities = velocities + accelerations * (delta / 2.0)
+        positions = positions + (other_masses @ velocities) / central_mass * (delta / 2.0)
+        positions, velocities = kepler_drift(positions, velocities, mu, delta)
+        positions = positions + (other_masses @ velocities) / central_mass * (delta / 2.0)
+
+        center_of_mass = center_of_mass + center_of_mass_velocity * delta
+        central_position = center_of_mass - other_masses @ positions / total_mass
+        model.positions[central] = central_position
+        model.positions[others] = positions + central_position
+
+        accelerations = self._interaction_accelerations(model, model.positions.copy(), model.time + delta, others, mu)
+        velocities = velocities + accelerations * (delta / 2.0)
+
+        model.velocities[others] = velocities + center_of_mass_velocity
+        model.velocities[central] = center_of_mass_velocity - other_masses @ velocities / central_mass
+
+        self._last_positions = model.positions.copy()
+        self._last_accelerations = accelerations
+
+    def _interaction_accelerations(self, model, positions, time, others, mu):
+        # the accelerations of the model without the force of the central object. The model softens the central force
+        # like all others, the same softened force is removed, so with softening only the forces between the other
+        # objects are softened and the central force is the exact one of the kepler drift
+        heliocentric_positions = positions[others] - positions[~others]
+        softened_r_mag_squared = np.einsum('ij,ij->i', heliocentric_positions, heliocentric_positions) + model.softening_length ** 2
+        central_accelerations = -mu * heliocentric_positions / (softened_r_mag_squared * np.sqrt(softened_r_mag_squared))[:, np.newaxis]
+        return self.accelerations(model, positions, time)[others] - central_accelerations
@@ -1,37 +1,145 @@
+from array import array
 from math import sqrt
 from numbers import Number
 
 class Vector():
-    def __init__(self, components: list[Number] = []):
+    # Components are stored in a compact array of doubles. Any other buffer of doubles (e.g. a row of a numpy
+    # array) is viewed instead of copied, so writing to the vector writes to the buffer. The in-place operators
+    # (+=, -=, *=, /=) update the components without allocating a new vector.
+    # Operators are unrolled for 2 and 3 dimensions, the dimensions of CartesianCoordinateSystem used by the models
+    __slots__ = ('components', 'dimension')
+
+    def __init__(self, components: list[Number] = ()):
         if type(components) == str:
             components = [float(cmp_str) for cmp_str in components.split(',')]
-        self.components = components
-        self.dimension = len(components)
+
+        view = None
+        if not isinstance(components, array):
+            try:
+                view = memoryview(components)
+            except TypeError:
+                pass
+        if view is not None and view.format == 'd' and view.ndim == 1:
+            self.components = view
+        else:
+            self.components = array('d', components)
+        self.dimension = len(self.components)
+
+    @staticmethod
+    def _from_components(components: array) -> 'Vector':
+        # skips the parsing of __init__ for components that are already an array of doubles
+        vector = Vector.__new__(Vector)
+        vector.components = components
+        vector.dimension = len(components)
+        return vector
 
     def magnitude(self):
-        return sqrt(sum(i*i for i in self.components))
+        c = self.components
+        if self.dimension == 3:
+            return sqrt(c[0]*c[0] + c[1]*c[1] + c[2]*c[2])
+        if self.dimension == 2:
+            return sqrt(c[0]*c[0] + c[1]*c[1])
+        return sqrt(sum(i*i for i in c))
 
     def __add__(self, other_vector):
         if self.dimension != other_vector.dimension:
             raise ValueError("Dimensions of vectors do not match")
-        return Vector([self.components[i] + other_vector.components[i] for i in range(self.dimension)])
+        a, b = self.components, other_vector.components
+        if self.dimension == 3:
+            return Vector._from_components(array('d', (a[0] + b[0], a[1] + b[1], a[2] + b[2])))
+        if self.dimension == 2:
+            return Vector._from_components(array('d', (a[0] + b[0], a[1] + b[1])))
+        return Vector._from_components(array('d', [a[i] + b[i] for i in range(self.dimension)]))
 
     def __sub__(self, other_vector):
         if self.dimension != other_vector.dimension:
             raise ValueError("Dimensions of vectors do not match")
-        return Vector([self.components[i] - other_vector.components[i] for i in range(self.dimension)])
+        a, b = self.components, other_vector.components
+        if self.dimension == 3:
+            return Vector._from_components(array('d', (a[0] - b[0], a[1] - b[1], a[2] - b[2])))
+        if self.dimension == 2:
+            return Vector._from_components(array('d', (a[0] - b[0], a[1] - b[1])))
+        return Vector._from_components(array('d', [a[i] - b[i] for i in range(self.dimension)]))
 
     def __mul__(self, scalar: Number):
-        return Vector([self.components[i] * scalar for i in range(self.dimension)])
+        a = self.components
+        if self.dimension == 3:
+            return Vector._from_components(array('d', (a[0] * scalar, a[1] * scalar, a[2] * scalar)))
+        if self.dimension == 2:
+            return Vector._from_components(array('d', (a[0] * scalar, a[1] * scalar)))
+        return Vector._from_components(array('d', [a[i] * scalar for i in range(self.dimension)]))
 
     def __truediv__(self, scalar: Number):
-        return Vector([self.components[i] / scalar for i in range(self.dimension)])
+        a = self.components
+        if self.dimension == 3:
+            return Vector._from_components(array('d', (a[0] / scalar, a[1] / scalar, a[2] / scalar)))
+        if self.dimension == 2:
+            return Vector._from_components(array('d', (a[0] / scalar, a[1] / scalar)))
+        return Vector._from_components(array('d', [a[i] / scalar for i in range(self.dimension)]))
 
     def __neg__(self):
         return self.__mul__(-1)
 
+    def __iadd__(self, other_vector):
+        if self.dimension != other_vector.dimension:
+            raise ValueError("Dimensions of vectors do not match")
+        a, b = self.components, other_vector.components
+        if self.dimension == 3:
+            a[0] += b[0]; a[1] += b[1]; a[2] += b[2]
+        elif self.dimension == 2:
+            a[0] += b[0]; a[1] += b[1]
+        else:
+            for i in range(self.dimension):
+                a[i] += b[i]
+        return self
+
+    def __isub__(self, other_vector):
+        if self.dimension != other_vector.dimension:
+            raise ValueError("Dimensions of vectors do not match")
+        a, b = self.components, other_vector.components
+        if self.dimension == 3:
+            a[0] -= b[0]; a[1] -= b[1]; a[2] -= b[2]
+        elif self.dimension == 2:
+            a[0] -= b[0]; a[1] -= b[1]
+        else:
+            for i in range(self.dimension):
+                a[i] -= b[i]
+        return self
+
+    def __imul__(self, scalar: Number):
+        a = self.components
+        if self.dimension == 3:
+            a[0] *= scalar; a[1] *= scalar; a[2] *= scalar
+        elif self.dimension == 2:
+            a[0] *= scalar; a[1] *= scalar
+        else:
+            for i in range(self.dimension):
+                a[i] *= scalar
+        return self
+
+    def __itruediv__(self, scalar: Number):
+        a = self.components
+        if self.dimension == 3:
+            a[0] /= scalar; a[1] /= scalar; a[2] /= scalar
+        elif self.dimension == 2:
+            a[0] /= scalar; a[1] /= scalar
+        else:
+            for i in range(self.dimension):
+                a[i] /= scalar
+        return self
+
+    def __reduce__(self):
+        # a copy owns its components, views of buffers are not shared with the copy
+        return (Vector, (array('d', self.components),))
+
     def __str__(self) -> str:
         return "<" + ", ".join([str(cmp) for cmp in self.components]) + ">"
 
     def __getitem__(self, i: int):
-        return self.components[i]
\ No newline at end of file
+        return self.components[i]
+
+def row_vectors(buffer, dimension: int) -> list[Vector]:
+    # Vectors viewing the consecutive rows of dimension doubles of a C contiguous buffer (e.g. an (N, dimension) numpy array).
+    # The buffer is cast once and sliced, which is much faster than a Vector per row of a numpy array
+    flat = memoryview(buffer).cast('B').cast('d')
+    return [Vector._from_components(flat[i:i + dimension]) for i in range(0, len(flat), dimension)]
@@ -0,0 +1,147 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+import copy
+import multiprocessing
+from time import perf_counter
+from typing import Any, Mapping, Tuple, Union
+
+import numpy as np
+
+from gravity_lab.gravity_model import GravityModel, ModelRunner
+from gravity_lab.integrators import Integrator
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.trajectory_store import Trajectory, hermite_interpolation, open_trajectory_file
+
+class ValidationResult():
+    # Errors of a model run against trajectory data. times are the epochs of the trajectory data (seconds since J2000)
+    # and coordinate_errors and velocity_errors are (len(times), len(object_names)) arrays of the distance between the
+    # model and the data at every epoch. The cost of the run is its number of steps, the number of force evaluations
+    # of the integrator (None for models without one) and its wall time
+    def __init__(self, model_name: str, integrator_name: str, delta_step: float, object_names: list, times: np.ndarray,
+            coordinate_errors: np.ndarray, velocity_errors: np.ndarray, num_steps: int, force_evaluations: int, wall_seconds: float):
+        self.model_name = model_name
+        self.integrator_name = integrator_name
+        self.delta_step = delta_step
+        self.object_names = object_names
+        self.times = times
+        self.coordinate_errors = coordinate_errors
+        self.velocity_errors = velocity_errors
+        self.num_steps = num_steps
+        self.force_evaluations = force_evaluations
+        self.wall_seconds = wall_seconds
+
+    def final_errors(self) -> dict:
+        return {object_name: {'coordinate_error': float(self.coordinate_errors[-1, i]), 'velocity_error': float(self.velocity_errors[-1, i])}
+            for i, object_name in enumerate(self.object_names)}
+
+    def max_errors(self) -> dict:
+        max_coordinate_errors = self.coordinate_errors.max(axis=0)
+        max_velocity_errors = self.velocity_errors.max(axis=0)
+        return {object_name: {'coordinate_error': float(max_coordinate_errors[i]), 'velocity_error': float(max_velocity_errors[i])}
+            for i, object_name in enumerate(self.object_names)}
+
+    def summary(self) -> str:
+        lines = [f"{self.model_name} with {self.integrator_name}, step {self.delta_step} s: {self.num_steps} steps, "
+            f"{self.force_evaluations} force evaluations, {self.wall_seconds:.3f} s"]
+        max_errors = self.max_errors()
+        for object_name, errors in self.final_errors().items():
+            lines.append(f"  {object_name}: final error {errors['coordinate_error']:.6e} m {errors['velocity_error']:.6e} m/s, "
+                f"max error {max_errors[object_name]['coordinate_error']:.6e} m {max_errors[object_name]['velocity_error']:.6e} m/s")
+        return "\n".join(lines)
+
+def trajectories_time_span(object_trajectories: Mapping[Union[int, str], Tuple[Any, Trajectory]]) -> tuple[float, float]:
+    # (start, stop) of the time span covered by the trajectories of all objects, in seconds since J2000
+    start_time = max(float(trajectory.times[0]) for _, trajectory in object_trajectories.values())
+    stop_time = min(float(trajectory.times[-1]) for _, trajectory in object_trajectories.values())
+    if start_time > stop_time:
+        raise ValueError("The trajectories of the objects do not share a time span")
+    return start_time, stop_time
+
+def fresh_model(model: GravityModel) -> GravityModel:
+    # A copy of the model without its objects and at time 0, so a model can be validated while it is used (e.g. by the UI)
+    model = copy.deepcopy(model, {id(model.objects): []})
+    model.time = 0.0
+    return model
+
+def _object_states(objects: list[PointParticle]) -> tuple[np.ndarray, np.ndarray]:
+    return np.array([object.coordinate.components for object in objects]), np.array([object.velocity.components for object in objects])
+
+def validate_model(object_trajectories: Mapping[Union[int, str], Tuple[Any, Trajectory]], model: GravityModel, delta_step: float,
+        integrator: Integrator = None) -> ValidationResult:
+    # Runs a fresh copy of the model (see fresh_model) with steps of delta_step over the time span of the trajectories,
+    # from the states of the objects at its start. The model is compared to the trajectories at every epoch of the
+    # data: the state of the model at the epochs within a step is interpolated between its states before and after the
+    # step, so the errors are measured at the epochs for any step size. integrator replaces the integrator of the model
+    start_time, stop_time = trajectories_time_span(object_trajectories)
+    object_names = list(object_trajectories)
+    trajectories = [object_trajectories[object_name][1] for object_name in object_names]
+
+    # every epoch of the data in the time span, and the state of every object at every epoch as (epochs, objects, 3) arrays
+    times = np.unique(np.concatenate([trajectory.between(start_time, stop_time).times for trajectory in trajectories]))
+    reference_states = [trajectory.states_at(times) for trajectory in trajectories]
+    reference_positions = np.stack([positions for positions, _ in reference_states], axis=1)
+    reference_velocities = np.stack([velocities for _, velocities in reference_states], axis=1)
+
+    model = fresh_model(model)
+    objects = []
+    for i, object_name in enumerate(object_names):
+        object_data = object_trajectories[object_name][0]
+        objects.append(PointParticle(object_data['mass_kg'], Vector(reference_positions[0, i].tolist()), Vector(reference_velocities[0, i].tolist())))
+    model.objects.extend(objects)
+
+    model_runner = ModelRunner(model, copy.deepcopy(integrator) if integrator is not None else None)
+    integrator = getattr(model, 'integrator', None)
+    initial_force_evaluations = integrator.force_evaluations if integrator is not None else 0
+
+    coordinate_errors = np.zeros((len(times), len(objects)))
+    velocity_errors = np.zeros((len(times), len(objects)))
+
+    wall_start = perf_counter()
+    num_steps = 0
+    time = start_time
+    positions, velocities = _object_states(objects)
+    epoch_index = 1
+    while epoch_index < len(times):
+        # the last step is shortened to end on stop_time
+        delta = min(delta_step, stop_time - time)
+        model_runner.run(1, delta)
+        num_steps += 1
+        step_end_time = time + delta if delta < stop_time - time else stop_time
+        step_positions, step_velocities = _object_states(objects)
+
+        end_index = int(np.searchsorted(times, step_end_time, side='right'))
+        if end_index > epoch_index:
+            s = ((times[epoch_index:end_index] - time) / delta)[:, np.newaxis, np.newaxis]
+            model_positions, model_velocities = hermite_interpolation(s, delta, positions, velocities, step_positions, step_velocities)
+            coordinate_errors[epoch_index:end_index] = np.linalg.norm(model_positions - reference_positions[epoch_index:end_index], axis=2)
+            velocity_errors[epoch_index:end_index] = np.linalg.norm(model_velocities - reference_velocities[epoch_index:end_index], axis=2)
+            epoch_index = end_index
+
+        time = step_end_time
+        positions, velocities = step_positions, step_velocities
+    wall_seconds = perf_counter() - wall_start
+
+    return ValidationResult(model.__class__.__name__, integrator.__class__.__name__ if integrator is not None else None, delta_step,
+        object_names, times, coordinate_errors, velocity_errors, num_steps,
+        integrator.force_evaluations - initial_force_evaluations if integrator is not None else None, wall_seconds)
+
+def _validation_task(trajectory_source, model: GravityModel, delta_step: float, integrator: Integrator) -> ValidationResult:
+    object_trajectories = open_trajectory_file(trajectory_source)[1] if isinstance(trajectory_source, str) else trajectory_source
+    return validate_model(object_trajectories, model, delta_step, integrator)
+
+def submit_validation_sweep(executor: Executor, trajectory_source, model: GravityModel, delta_steps: list[float],
+        integrators: list[Integrator] = [None]) -> list[Future]:
+    # Submits a validation of the model for every combination of step size and integrator (None for the integrator of
+    # the model) to executor. trajectory_source is the object trajectories, or the path of a trajectory file that every
+    # task memory maps instead of receiving the trajectories pickled
+    model = fresh_model(model)
+    return [executor.submit(_validation_task, trajectory_source, model, delta_step, integrator)
+        for integrator in integrators for delta_step in delta_steps]
+
+def validation_sweep(trajectory_source, model: GravityModel, delta_steps: list[float], integrators: list[Integrator] = [None],
+        max_workers: int = None) -> list[ValidationResult]:
+    # The results of submit_validation_sweep run by a pool of processes, e.g. to plot the error against the cost of a
+    # model for decreasing step sizes. The processes are spawned rather than forked, so a sweep started from the UI
+    # does not inherit the threads and connections of Tk
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return [future.result() for future in submit_validation_sweep(executor, trajectory_source, model, delta_steps, integrators)]
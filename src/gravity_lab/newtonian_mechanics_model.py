@@ -1,36 +1,59 @@
+from math import sqrt
+
 from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
 from gravity_lab.gravity_model import GravityModel
 from gravity_lab.math import Vector
-from gravity_lab.point_particle import PointParticle
+from gravity_lab.point_particle import PointParticle, is_kinematic, is_test_particle
 
 gravitational_constant =  6.67430E-11
 
 class NewtonianMechanicsModel(GravityModel):
-    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = []):
+    # softening_length is the length eps of Plummer softening: |r|^2 is replaced by |r|^2 + eps^2 in the force, so
+    # the force between close objects stays finite and steps through close encounters do not blow up. Forces
+    # between objects much further apart than eps are unchanged. 0 is unsoftened gravity
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = [], softening_length: float = 0.0):
         super().__init__(coordinate_system, objects)
+        self.softening_length = softening_length
 
     def step(self, delta: float):
         # F = -G * (m1 * m2) / |r|^2 * r>
         # The equation above is the force of gravity between two objects
         # where r is the vector from the object exerting the force to the object experiencing the force,
         # v> is the unit vector of v, |v| is the magnitude of a vector, and m1 and m2 are the masses of the objects
+
+        # test particles only experience forces, so only massive objects are looped over as the objects exerting the force
+        massive_objects = [object for object in self.objects if not is_test_particle(object)]
         for object in self.objects:
+            # kinematic objects follow their trajectories and are moved after the other objects
+            if is_kinematic(object):
+                continue
 
             # translate object with velocity
             object.coordinate += object.velocity * delta
 
+            # F = ma
+            # a = F / m = -G * m2 / |r|^2 * r>
+            # the acceleration is calculated directly so objects without mass can be stepped.
+            # The vectors are updated in place so a pair of objects only allocates the vector between them
             G = gravitational_constant
-            gravity_force = Vector([0.0] * self.coordinate_system.dimension)
-            for other_object in self.objects:
+            softening_squared = self.softening_length * self.softening_length
+            gravity_acceleration = Vector([0.0] * self.coordinate_system.dimension)
+            for other_object in massive_objects:
                 if object != other_object:
-                    r_vec: Vector = object.coordinate - other_object.coordinate
+                    # -r> * (G * m2 / (|r|^2 + eps^2)) with -r the vector from object to other_object
+                    r_vec: Vector = other_object.coordinate - object.coordinate
                     r_mag = r_vec.magnitude()
-                    r_unit_vec = r_vec / r_mag
-                    force = -r_unit_vec * (G * other_object.mass * object.mass / (r_mag*r_mag))
+                    if softening_squared > 0.0:
+                        r_mag = sqrt(r_mag*r_mag + softening_squared)
+                    r_vec *= G * other_object.mass / (r_mag*r_mag*r_mag)
 
-                    gravity_force += force
+                    gravity_acceleration += r_vec
 
-            # F = ma
-            # a = F / m
-            # update the velocity of object by the acceleration that is calculated from the force of gravity            
-            object.velocity += gravity_force / object.mass * delta
\ No newline at end of file
+            # update the velocity of object by the acceleration from the force of gravity
+            gravity_acceleration *= delta
+            object.velocity += gravity_acceleration
+
+        self.time += delta
+        for object in self.objects:
+            if is_kinematic(object):
+                object.coordinate, object.velocity = object.state_at(self.time)
@@ -0,0 +1,155 @@
+from itertools import product
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import Integrator
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+MASS_ASSIGNMENT_SCHEMES = ['cic', 'tsc']
+
+def mass_assignment_stencil(cell_positions: np.ndarray, scheme: str) -> list[tuple[np.ndarray, np.ndarray]]:
+    # cell_positions are positions in units of cells, where cell i covers [i, i + 1).
+    # Returns a (cell indices (N, dimension), weights (N,)) pair for every cell of the stencil
+    # cloud-in-cell (cic) spreads a particle over 2 cells per axis, triangular-shaped cloud (tsc) over 3
+    offsets_from_center = cell_positions - 0.5
+    if scheme == 'cic':
+        base_cells = np.floor(offsets_from_center).astype(np.int64)
+        fraction = offsets_from_center - base_cells
+        axis_offsets = [0, 1]
+        axis_weights = [1.0 - fraction, fraction]
+    elif scheme == 'tsc':
+        base_cells = np.rint(offsets_from_center).astype(np.int64)
+        fraction = offsets_from_center - base_cells
+        axis_offsets = [-1, 0, 1]
+        axis_weights = [0.5 * (0.5 - fraction) ** 2, 0.75 - fraction ** 2, 0.5 * (0.5 + fraction) ** 2]
+    else:
+        raise ValueError(f"Unknown mass assignment scheme {scheme}. Expected one of {MASS_ASSIGNMENT_SCHEMES}")
+
+    dimension = cell_positions.shape[1]
+    stencil = []
+    for offset_choice in product(range(len(axis_offsets)), repeat=dimension):
+        cells = base_cells + np.array([axis_offsets[i] for i in offset_choice])
+        weights = np.prod([axis_weights[i][:, axis] for axis, i in enumerate(offset_choice)], axis=0)
+        stencil.append((cells, weights))
+    return stencil
+
+class ParticleMeshModel(VectorizedNewtonianMechanicsModel):
+    # Calculates the force of gravity on a grid instead of between every pair of objects. The mass of the objects
+    # is deposited onto a grid, the potential of the grid is solved for with FFTs and the forces are interpolated
+    # back to the objects with the same mass assignment scheme, so a step costs O(N + G log G) for G grid cells.
+    # Forces are smoothed on the scale of a grid cell, so the model is meant for many roughly uniformly spread objects.
+    #
+    # With periodic boundaries the grid covers the box [box_origin, box_origin + box_size) in every axis and objects
+    # leaving the box re-enter on the other side. Otherwise the grid covers the bounding box of the objects and is
+    # zero padded so the objects do not feel periodic images
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = [], grid_size: int = 64,
+            mass_assignment: str = 'cic', periodic: bool = False, box_origin: float = 0.0, box_size: float = None,
+            integrator: Integrator = None):
+        super().__init__(coordinate_system, objects, integrator)
+
+        if mass_assignment not in MASS_ASSIGNMENT_SCHEMES:
+            raise ValueError(f"Unknown mass assignment scheme {mass_assignment}. Expected one of {MASS_ASSIGNMENT_SCHEMES}")
+        if periodic and box_size is None:
+            raise ValueError("A box_size is required for periodic boundaries")
+
+        self.grid_size = grid_size
+        self.mass_assignment = mass_assignment
+        self.periodic = periodic
+        self.box_origin = box_origin
+        self.box_size = box_size
+
+        self._isolated_green_function_cache = {}
+
+    def accelerations(self, positions: np.ndarray, time: float = None, targets: np.ndarray = None) -> np.ndarray:
+        if len(positions) == 0:
+            return np.zeros_like(positions)
+        if targets is not None:
+            # the potential of the grid is solved from all objects either way
+            return self.accelerations(positions, time)[targets]
+        positions = self._with_kinematic_positions(positions, time)
+
+        dimension = self.coordinate_system.dimension
+        if self.periodic:
+            grid_origin = np.full(dimension, self.box_origin, dtype=float)
+            cell_width = self.box_size / self.grid_size
+        else:
+            # leave a margin of 2 cells on every side for the mass assignment stencil
+            lower, upper = positions.min(axis=0), positions.max(axis=0)
+            extent = float(np.max(upper - lower))
+            # a single object or coincident objects have no extent, any finite grid puts them in one cell without force
+            cell_width = (extent if extent > 0.0 else 1.0) / (self.grid_size - 4)
+            grid_origin = (lower + upper) / 2.0 - cell_width * self.grid_size / 2.0
+
+        grid_shape = (self.grid_size,) * dimension
+        stencil = mass_assignment_stencil((positions - grid_origin) / cell_width, self.mass_assignment)
+        flat_stencil = [(np.ravel_multi_index(tuple(cells.T), grid_shape, mode='wrap'), weights) for cells, weights in stencil]
+
+        # deposit the mass of the objects onto the grid
+        grid_mass = np.zeros(self.grid_size ** dimension)
+        for flat_cells, weights in flat_stencil:
+            grid_mass += np.bincount(flat_cells, weights=weights * self.source_masses, minlength=len(grid_mass))
+        grid_mass = grid_mass.reshape(grid_shape)
+
+        if self.periodic:
+            potential = self._periodic_potential(grid_mass, cell_width)
+        else:
+            potential = self._isolated_potential(grid_mass, cell_width)
+
+        # a = -grad(potential), with central differences on the grid
+        accelerations = np.zeros_like(positions)
+        for axis in range(dimension):
+            if self.periodic:
+                grid_acceleration = -(np.roll(potential, -1, axis=axis) - np.roll(potential, 1, axis=axis)) / (2.0 * cell_width)
+            else:
+                grid_acceleration = -np.gradient(potential, cell_width, axis=axis)
+            grid_acceleration = grid_acceleration.ravel()
+
+            # interpolate back to the objects with the mass assignment weights so there is no self force
+            for flat_cells, weights in flat_stencil:
+                accelerations[:, axis] += weights * grid_acceleration[flat_cells]
+
+        return accelerations
+
+    def _periodic_potential(self, grid_mass: np.ndarray, cell_width: float) -> np.ndarray:
+        # Solve Poisson's equation in fourier space. The green's function is the fourier transform of -G/r
+        # in the dimension of the grid: -4 pi G / k^2 in 3D and -2 pi G / |k| in 2D (the force is inverse-square in both)
+        dimension = grid_mass.ndim
+        density = grid_mass / cell_width ** dimension
+        wave_numbers = [2.0 * np.pi * np.fft.fftfreq(self.grid_size, d=cell_width)] * (dimension - 1)
+        wave_numbers.append(2.0 * np.pi * np.fft.rfftfreq(self.grid_size, d=cell_width))
+        k_squared = sum(k ** 2 for k in np.meshgrid(*wave_numbers, indexing='ij', sparse=True))
+
+        with np.errstate(divide='ignore'):
+            if dimension == 3:
+                green_function = -4.0 * np.pi * gravitational_constant / k_squared
+            else:
+                green_function = -2.0 * np.pi * gravitational_constant / np.sqrt(k_squared)
+        # the mean density does not contribute to the forces
+        green_function.flat[0] = 0.0
+
+        return np.fft.irfftn(np.fft.rfftn(density) * green_function, s=grid_mass.shape, axes=range(grid_mass.ndim))
+
+    def _isolated_potential(self, grid_mass: np.ndarray, cell_width: float) -> np.ndarray:
+        # Convolve the grid mass with -G/r on a grid padded to twice the size, so the periodic convolution
+        # of the FFT does not wrap around. r is softened by half a cell so the center cell is finite
+        dimension = grid_mass.ndim
+        padded_shape = (2 * self.grid_size,) * dimension
+        if padded_shape not in self._isolated_green_function_cache:
+            # green's function in units of cells. It scales with 1 / cell_width, so it only has to be computed once per grid
+            cell_distances = np.minimum(np.arange(padded_shape[0]), padded_shape[0] - np.arange(padded_shape[0]))
+            r_squared = sum(d ** 2 for d in np.meshgrid(*[cell_distances] * dimension, indexing='ij', sparse=True))
+            self._isolated_green_function_cache[padded_shape] = np.fft.rfftn(-gravitational_constant / np.sqrt(r_squared + 0.25))
+
+        green_function = self._isolated_green_function_cache[padded_shape] / cell_width
+        padded_potential = np.fft.irfftn(np.fft.rfftn(grid_mass, s=padded_shape, axes=range(dimension)) * green_function, s=padded_shape,
+            axes=range(dimension))
+        return padded_potential[(slice(0, self.grid_size),) * dimension]
+
+    def step(self, delta: float):
+        super().step(delta)
+
+        if self.periodic:
+            self.positions[:] = self.box_origin + np.mod(self.positions - self.box_origin, self.box_size)
@@ -9,4 +9,31 @@ class PointParticle(Object):
         self.velocity = velocity
 
     def __str__(self) -> str:
-        return f"<mass_kg={self.mass}, coordinate={self.coordinate}, velocity={self.velocity}>"
\ No newline at end of file
+        return f"<mass_kg={self.mass}, coordinate={self.coordinate}, velocity={self.velocity}>"
+
+class TestParticle(PointParticle):
+    # A particle that feels the force of gravity of the other objects but exerts none, e.g. a spacecraft
+    # or an asteroid tracer. Its mass (if any) is only informational
+    def __init__(self, coordinate: Vector, velocity: Vector, mass: float = 0.0):
+        super().__init__(mass, coordinate, velocity)
+
+def is_test_particle(object: PointParticle) -> bool:
+    # objects without mass exert no force either
+    return isinstance(object, TestParticle) or object.mass == 0.0
+
+class KinematicParticle(PointParticle):
+    # A particle that follows a recorded trajectory (a gravity_lab.trajectory_store.Trajectory) instead of being
+    # integrated, e.g. a planet following the JPL Horizons ephemeris. It still exerts the force of gravity of its mass.
+    # epoch is the time of the trajectory (seconds since J2000) at the time 0 of the model, the start of the trajectory by default
+    def __init__(self, mass: float, trajectory, epoch: float = None):
+        self.trajectory = trajectory
+        self.epoch = epoch if epoch is not None else float(trajectory.times[0])
+        coordinate, velocity = trajectory.state_at(self.epoch)
+        super().__init__(mass, coordinate, velocity)
+
+    # interpolated coordinate and velocity at the time of the model
+    def state_at(self, time: float) -> tuple[Vector, Vector]:
+        return self.trajectory.state_at(self.epoch + time)
+
+def is_kinematic(object: PointParticle) -> bool:
+    return isinstance(object, KinematicParticle)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+from threading import get_ident
+from time import time
+from typing import Iterator
+
+# Cache configuration from the environment, e.g. for CI replaying recorded responses with GRAVITY_LAB_CACHE_OFFLINE=1
+CACHE_DIR_ENV = 'GRAVITY_LAB_CACHE_DIR'
+CACHE_TTL_ENV = 'GRAVITY_LAB_CACHE_TTL_SECONDS'
+CACHE_MAX_BYTES_ENV = 'GRAVITY_LAB_CACHE_MAX_BYTES'
+CACHE_OFFLINE_ENV = 'GRAVITY_LAB_CACHE_OFFLINE'
+
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'gravity_lab')
+
+class ResponseCache():
+    # Disk cache of text responses. An entry is stored in a file named by the sha256 of the url and request params,
+    # so the same request always maps to the same file and recorded responses can be copied between machines.
+    # Entries older than ttl_seconds (None for no expiry) are fetched again. When the total size of the entries exceeds
+    # max_bytes the least recently used entries are removed. In offline mode entries never expire and a request
+    # missing from the cache raises a RuntimeError instead of being fetched
+    def __init__(self, directory: str = None, ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+            offline: bool = False):
+        self.directory = directory if directory is not None else default_cache_dir()
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+    @classmethod
+    def from_environment(cls) -> 'ResponseCache':
+        ttl_seconds = os.environ.get(CACHE_TTL_ENV)
+        max_bytes = os.environ.get(CACHE_MAX_BYTES_ENV)
+        return cls(os.environ.get(CACHE_DIR_ENV),
+            float(ttl_seconds) if ttl_seconds else DEFAULT_CACHE_TTL_SECONDS,
+            int(max_bytes) if max_bytes else DEFAULT_CACHE_MAX_BYTES,
+            os.environ.get(CACHE_OFFLINE_ENV, '').lower() in ('1', 'true', 'yes'))
+
+    @staticmethod
+    def key(url: str, params: dict) -> str:
+        # params are serialized in sorted order so the key does not depend on the order they were given in
+        request = json.dumps({'url': url, 'params': {str(name): str(value) for name, value in params.items()}}, sort_keys=True)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.txt')
+
+    def _cached_path(self, url: str, params: dict) -> str:
+        # the path of the cached response marked as used, None if the response is not cached or expired
+        path = self._path(ResponseCache.key(url, params))
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        # the modification time is when the response was stored, the access time when it was last used
+        if not self.offline and self.ttl_seconds is not None and time() - stat.st_mtime > self.ttl_seconds:
+            return None
+        os.utime(path, (time(), stat.st_mtime))
+        return path
+
+    def _temporary_path(self, url: str, params: dict) -> str:
+        # responses are written to a temporary file and renamed so readers never see a partial response
+        os.makedirs(self.directory, exist_ok=True)
+        return f"{self._path(ResponseCache.key(url, params))}.{os.getpid()}.{get_ident()}.tmp"
+
+    def get(self, url: str, params: dict) -> str:
+        # returns None if the response is not cached or expired
+        path = self._cached_path(url, params)
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
+
+    def put(self, url: str, params: dict, text: str):
+        temporary_path = self._temporary_path(url, params)
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temporary_path, self._path(ResponseCache.key(url, params)))
+        self.evict()
+
+    def fetch(self, url: str, params: dict, request) -> str:
+        # the cached response, or the response of request(url, params) which is then cached
+        text = self.get(url, params)
+        if text is not None:
+            return text
+        if self.offline:
+            raise RuntimeError(f"Response for {url} with params {params} is not cached and the cache is offline")
+
+        text = request(url, params)
+        self.put(url, params, text)
+        return text
+
+    def fetch_lines(self, url: str, params: dict, request) -> Iterator[str]:
+        # fetch for responses read one line at a time, so a long response is never held in memory. Yields the lines
+        # of the cached response, or the lines of request(url, params) (an iterable of lines with their line endings)
+        # as they are received while they are written to the cache. The response is only cached when all its lines
+        # were read: closing the generator early or an exception raised by request drops it
+        path = self._cached_path(url, params)
+        if path is not None:
+            with open(path, 'r', encoding='utf-8') as file:
+                yield from file
+            return
+        if self.offline:
+            raise RuntimeError(f"Response for {url} with params {params} is not cached and the cache is offline")
+
+        temporary_path = self._temporary_path(url, params)
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                for line in request(url, params):
+                    file.write(line)
+                    yield line
+            os.replace(temporary_path, self._path(ResponseCache.key(url, params)))
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        self.evict()
+
+    def evict(self):
+        # remove the least recently used entries until the cache fits in max_bytes
+        if self.max_bytes is None or not os.path.isdir(self.directory):
+            return
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.txt'):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.txt'):
+                os.remove(entry.path)
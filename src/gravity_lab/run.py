@@ -0,0 +1,261 @@
+import argparse
+from datetime import datetime, timedelta
+import signal
+import sys
+from time import monotonic, sleep
+
+import numpy as np
+
+from gravity_lab.barnes_hut_model import BarnesHutModel
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.checkpoint import Checkpointer, read_checkpoint, restore_checkpoint, state_arrays
+from gravity_lab.data import TrajectoryData
+from gravity_lab.encounters import ENCOUNTER_ACTIONS, EncounterDetector, EncounterEvent
+from gravity_lab.force_backends import FORCE_BACKENDS, force_backend
+from gravity_lab.gravity_model import GravityModel, ModelRunner
+from gravity_lab.integrators import AdaptiveRungeKuttaIntegrator, BlockTimestepIntegrator, LeapfrogIntegrator, WisdomHolmanIntegrator, YoshidaIntegrator
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.particle_mesh_model import ParticleMeshModel
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.trajectory_store import TRAJECTORY_COLUMNS, Trajectory
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+from gravity_lab.wisdom_holman_model import WisdomHolmanModel
+
+# Headless simulation runner, e.g.
+#   python -m gravity_lab.run --horizons --start 2024-01-01 --model wisdom-holman --delta 86400 --duration 3.15e9 --output-every 30 --output out.gltraj
+# The initial objects come from a checkpoint, a trajectory file or the JPL Horizons System. The model is stepped as
+# fast as possible, or at --speed-up simulated seconds per wall second, and every --output-every steps the states of
+# the objects are recorded and written to a trajectory file at the end of the run (also when it is interrupted)
+
+MODELS = {
+    'newtonian': NewtonianMechanicsModel,
+    'vectorized': VectorizedNewtonianMechanicsModel,
+    'barnes-hut': BarnesHutModel,
+    'particle-mesh': ParticleMeshModel,
+    'wisdom-holman': WisdomHolmanModel
+}
+
+INTEGRATORS = {
+    'leapfrog': LeapfrogIntegrator,
+    'yoshida': YoshidaIntegrator,
+    'block-timestep': BlockTimestepIntegrator,
+    'adaptive-rk': AdaptiveRungeKuttaIntegrator,
+    'wisdom-holman': WisdomHolmanIntegrator
+}
+
+class StateRecorder():
+    # Records the time and the positions and velocities of the objects of a model in arrays allocated for max_records records
+    def __init__(self, num_objects: int, dimension: int, max_records: int):
+        self.times = np.empty(max_records)
+        self.positions = np.empty((max_records, num_objects, dimension))
+        self.velocities = np.empty((max_records, num_objects, dimension))
+        self.num_records = 0
+
+    def record(self, model: GravityModel, time: float):
+        positions, velocities, _ = state_arrays(model)
+        self.times[self.num_records] = time
+        self.positions[self.num_records] = positions
+        self.velocities[self.num_records] = velocities
+        self.num_records += 1
+
+    def trajectory_data(self, name: str, object_names: list, masses: np.ndarray) -> TrajectoryData:
+        # trajectories are 3D, the missing axes of 2D models are 0
+        times = self.times[:self.num_records]
+        object_trajectories = {}
+        for i, object_name in enumerate(object_names):
+            columns = {'time': times}
+            for axis_index, column in enumerate(TRAJECTORY_COLUMNS[1:]):
+                axis = axis_index % 3
+                states = self.positions if axis_index < 3 else self.velocities
+                columns[column] = states[:self.num_records, i, axis] if axis < states.shape[2] else np.zeros(self.num_records)
+            object_trajectories[object_name] = ({'mass_kg': float(masses[i])}, Trajectory(columns, is_sorted=True))
+        return TrajectoryData(name, object_trajectories)
+
+def parse_datetime(date_time: str) -> datetime:
+    return datetime.fromisoformat(date_time)
+
+def argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m gravity_lab.run', description='Runs a Gravity Lab model without the UI')
+
+    initial_objects = parser.add_mutually_exclusive_group(required=True)
+    initial_objects.add_argument('--checkpoint-in', metavar='PATH', help='resume from a checkpoint')
+    initial_objects.add_argument('--trajectory-file', metavar='PATH', help='start from the states at the start of a trajectory file')
+    initial_objects.add_argument('--horizons', action='store_true', help='start from the solar system of the JPL Horizons System')
+    parser.add_argument('--start', type=parse_datetime, help='start date (TDB) of the --horizons data, e.g. 2024-01-01')
+    parser.add_argument('--horizons-step', type=float, default=86400.0, help='step in seconds of the --horizons data (whole minutes)')
+    parser.add_argument('--kinematic', action='store_true', help='the objects of the trajectory data follow their trajectories instead of being integrated')
+
+    parser.add_argument('--model', choices=list(MODELS), default='vectorized')
+    parser.add_argument('--dimension', type=int, choices=[2, 3], default=3)
+    parser.add_argument('--integrator', choices=list(INTEGRATORS), help="the model's own integrator by default")
+    parser.add_argument('--backend', choices=list(FORCE_BACKENDS), help='force backend of the vectorized models')
+    parser.add_argument('--softening', type=float, default=0.0, help='Plummer softening length in meters')
+
+    parser.add_argument('--encounter-radius', type=float, help='report the pairs of objects closer than this many meters')
+    parser.add_argument('--encounter-action', choices=ENCOUNTER_ACTIONS, default='flag',
+        help='flag the pairs and split steps into --substeps while any pair is flagged, or merge the pairs (pairs of test particles are only flagged)')
+    parser.add_argument('--substeps', type=int, default=16, help='substeps per step during flagged encounters')
+
+    parser.add_argument('--delta', type=float, required=True, help='step size in simulated seconds')
+    duration = parser.add_mutually_exclusive_group(required=True)
+    duration.add_argument('--steps', type=int, help='number of steps')
+    duration.add_argument('--duration', type=float, help='simulated seconds, rounded up to whole steps')
+    parser.add_argument('--speed-up', type=float, help='simulated seconds per wall second, as fast as possible by default')
+
+    parser.add_argument('--output', metavar='PATH', help='trajectory file of the recorded states')
+    parser.add_argument('--output-every', type=int, default=1, help='steps between recorded states')
+    parser.add_argument('--checkpoint-out', metavar='PATH', help='checkpoint written while running and at the end')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, help='wall seconds between checkpoints')
+    parser.add_argument('--progress-interval', type=float, default=10.0, help='wall seconds between progress reports')
+    return parser
+
+def initial_model(args, num_steps: int) -> tuple[GravityModel, list, float]:
+    # (model, object names, epoch) for the arguments. epoch is the time (seconds since J2000) of the time 0 of the
+    # model for data with dates, otherwise 0
+    model = MODELS[args.model](CartesianCoordinateSystem(args.dimension), [])
+    if args.backend is not None:
+        if not hasattr(model, 'backend'):
+            raise ValueError(f"The {args.model} model has no force backend")
+        model.backend = force_backend(args.backend)
+    if args.softening != 0.0:
+        # the particle mesh model's forces are smoothed by its grid instead
+        if not hasattr(model, 'softening_length') or isinstance(model, ParticleMeshModel):
+            raise ValueError(f"The {args.model} model has no softening")
+        model.softening_length = args.softening
+
+    if args.checkpoint_in is not None:
+        metadata = read_checkpoint(args.checkpoint_in)[0]['metadata'] or {}
+        restore_checkpoint(args.checkpoint_in, model)
+        object_names = metadata.get('object_names') or list(range(len(model.objects)))
+        return model, object_names, metadata.get('epoch', 0.0)
+
+    if args.dimension != 3:
+        raise ValueError("Trajectory data is 3D, it can only be run with --dimension 3")
+    if args.trajectory_file is not None:
+        trajectory_data = TrajectoryData.open(args.trajectory_file)
+    else:
+        start, stop, step = None, None, None
+        if args.start is not None:
+            # the data covers the run, so kinematic objects can follow it to the end
+            step = timedelta(seconds=args.horizons_step)
+            start = args.start
+            stop = start + max(timedelta(seconds=num_steps * args.delta), step)
+        trajectory_data = TrajectoryData.load_solar_system_from_jpl_horizons_system(start, stop, step)
+
+    start_time, stop_time = trajectory_data.time_span()
+    if args.kinematic and start_time + num_steps * args.delta > stop_time:
+        raise ValueError(f"Kinematic objects can only be run for the {stop_time - start_time} s of their trajectories")
+
+    if args.kinematic:
+        model.objects.extend(trajectory_data.kinematic_objects(start_time).values())
+    else:
+        for object_data, trajectory in trajectory_data.object_trajectories.values():
+            coordinate, velocity = trajectory.state_at(start_time)
+            model.objects.append(PointParticle(object_data['mass_kg'], coordinate, velocity))
+    return model, list(trajectory_data.object_trajectories), start_time
+
+def main(argv: list[str] = None):
+    parser = argument_parser()
+    args = parser.parse_args(argv)
+    if args.delta <= 0.0 or args.output_every < 1:
+        parser.error("--delta must be positive and --output-every at least 1")
+    if args.kinematic and args.checkpoint_out is not None:
+        parser.error("runs with --kinematic objects cannot be checkpointed")
+    if args.backend is not None and MODELS[args.model] is ParticleMeshModel:
+        # the particle mesh model computes its forces on its grid, not with a force backend
+        parser.error(f"--backend cannot be used with the {args.model} model")
+    if args.encounter_radius is not None and args.encounter_action == 'merge' and args.output is not None:
+        parser.error("the objects of a run with merges change, its states cannot be recorded with --output")
+    num_steps = args.steps if args.steps is not None else int(np.ceil(args.duration / args.delta))
+
+    checkpointer = None
+    encounter_detector = None
+    try:
+        model, object_names, epoch = initial_model(args, num_steps)
+        if args.checkpoint_out is not None:
+            checkpointer = Checkpointer(args.checkpoint_out, args.checkpoint_interval, metadata={'object_names': object_names, 'epoch': epoch})
+        if args.encounter_radius is not None:
+            encounter_detector = EncounterDetector(args.encounter_radius, args.encounter_action, args.substeps)
+        model_runner = ModelRunner(model, INTEGRATORS[args.integrator]() if args.integrator is not None else None, checkpointer, encounter_detector)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if encounter_detector is not None:
+        object_name = {id(object): name for object, name in zip(model.objects, object_names)}
+
+        def on_event(event: EncounterEvent):
+            first, second = (object_name[id(object)] for object in event.objects)
+            print(f"{event.kind} of {first} and {second} at {epoch + event.time:.6g} s, distance {event.distance:.6g} m", file=sys.stderr)
+            if event.kind == 'merge':
+                # the names of the checkpoint metadata follow the objects left in the model
+                object_name[id(event.merged_object)] = f"{first}+{second}"
+                object_names[:] = [object_name[id(object)] for object in model.objects]
+
+        encounter_detector.on_event = on_event
+
+    recorder = None
+    if args.output is not None:
+        recorder = StateRecorder(len(model.objects), args.dimension, num_steps // args.output_every + 1)
+        recorder.record(model, epoch + model.time)
+
+    start_model_time = model.time
+    wall_start = monotonic()
+    last_progress = wall_start
+
+    # ctrl-c (SIGINT) and SIGTERM, which batch schedulers stop jobs with, stop the run after the current step so the
+    # output and checkpoint are written from the state at the end of a step. A second ctrl-c interrupts the step
+    # right away and leaves the checkpoint of the last complete one
+    stop_signal = None
+
+    def request_stop(signal_number, frame):
+        nonlocal stop_signal
+        if stop_signal == signal.SIGINT and signal_number == signal.SIGINT:
+            raise KeyboardInterrupt
+        if stop_signal is None:
+            stop_signal = signal_number
+
+    def on_step(step_index: int) -> bool:
+        nonlocal last_progress
+        if recorder is not None and (step_index + 1) % args.output_every == 0:
+            recorder.record(model, epoch + model.time)
+
+        now = monotonic()
+        if args.speed_up is not None:
+            # ahead of the target speed up, wait for the wall clock to catch up
+            wait = wall_start + (model.time - start_model_time) / args.speed_up - now
+            if wait > 0.0:
+                sleep(wait)
+        if now - last_progress >= args.progress_interval:
+            last_progress = now
+            print(f"step {step_index + 1}/{num_steps}, simulated {model.time - start_model_time:.6g} s, "
+                f"speed up {(model.time - start_model_time) / (now - wall_start):.6g}", file=sys.stderr)
+        return stop_signal is not None
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    keyboard_interrupted = False
+    try:
+        model_runner.run(num_steps, args.delta, on_step)
+    except KeyboardInterrupt:
+        keyboard_interrupted = True
+    finally:
+        if hasattr(model, 'close'):
+            # stops the workers of a process pool force backend
+            model.close()
+    interrupted = keyboard_interrupted or stop_signal is not None
+    wall_seconds = monotonic() - wall_start
+
+    if recorder is not None:
+        # the recorded states are all from complete steps
+        masses = state_arrays(model)[2]
+        recorder.trajectory_data(f"{args.model} run", object_names, masses).save(args.output)
+
+    simulated_seconds = model.time - start_model_time
+    print(f"{'interrupted after' if interrupted else 'ran'} {simulated_seconds:.6g} simulated seconds in {wall_seconds:.3f} s "
+        f"(speed up {simulated_seconds / wall_seconds if wall_seconds > 0.0 else float('inf'):.6g})", file=sys.stderr)
+    if interrupted:
+        # 128 + the number of the signal, like a shell reports a process stopped by it
+        sys.exit(128 + (signal.SIGTERM if stop_signal == signal.SIGTERM else signal.SIGINT))
+
+if __name__ == "__main__":
+    main()
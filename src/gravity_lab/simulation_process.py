@@ -0,0 +1,204 @@
+import multiprocessing
+from queue import Empty
+import sys
+from time import monotonic, sleep
+import traceback
+
+import numpy as np
+
+from gravity_lab.checkpoint import state_arrays
+from gravity_lab.force_backends import SharedArray
+from gravity_lab.gravity_model import GravityModel, Object
+
+# A frame buffer slot is the sequence counter, frame number, time and number of objects of the frame,
+# followed by the positions and velocities of max_objects objects
+FRAME_HEADER_SIZE = 4
+FRAME_SEQUENCE, FRAME_NUMBER, FRAME_TIME, FRAME_NUM_OBJECTS = range(FRAME_HEADER_SIZE)
+
+class Frame():
+    # The positions and velocities of the objects of a model at time, copied from a FrameBuffer. number counts the
+    # frames written to the buffer, so a reader can tell whether a frame is new
+    def __init__(self, number: int, time: float, positions: np.ndarray, velocities: np.ndarray):
+        self.number = number
+        self.time = time
+        self.positions = positions
+        self.velocities = velocities
+
+class FrameBuffer():
+    # Frames of the state of a model shared between the process stepping the model (the only writer) and readers in
+    # other processes. The two slots of the buffer are written in turn, so a reader copies the latest complete frame
+    # while the next one is written to the other slot. Every slot has a sequence counter (a seqlock) that is odd while
+    # the slot is written, so a reader detects a slot that was written while it was copied and retries instead of
+    # returning a torn frame. The counters are doubles, exact for 2^53 frames
+    def __init__(self, max_objects: int, dimension: int, name: str = None):
+        self.max_objects = max_objects
+        self.dimension = dimension
+        self.shared_array = SharedArray((2, FRAME_HEADER_SIZE + 2 * max_objects * dimension), name)
+        self.name = self.shared_array.name
+
+        slots = self.shared_array.array
+        self._headers = slots[:, :FRAME_HEADER_SIZE]
+        self._positions = slots[:, FRAME_HEADER_SIZE:FRAME_HEADER_SIZE + max_objects * dimension].reshape(2, max_objects, dimension)
+        self._velocities = slots[:, FRAME_HEADER_SIZE + max_objects * dimension:].reshape(2, max_objects, dimension)
+        self._frame_number = int(self._headers[:, FRAME_NUMBER].max())
+
+    def write(self, time: float, positions: np.ndarray, velocities: np.ndarray):
+        num_objects = len(positions)
+        if num_objects > self.max_objects:
+            raise ValueError(f"A frame holds at most {self.max_objects} objects, not {num_objects}")
+
+        self._frame_number += 1
+        slot = self._frame_number % 2
+        header = self._headers[slot]
+        header[FRAME_SEQUENCE] += 1
+        header[FRAME_NUMBER] = self._frame_number
+        header[FRAME_TIME] = time
+        header[FRAME_NUM_OBJECTS] = num_objects
+        self._positions[slot, :num_objects] = positions
+        self._velocities[slot, :num_objects] = velocities
+        header[FRAME_SEQUENCE] += 1
+
+    def read(self, max_attempts: int = 100) -> Frame:
+        # A copy of the latest complete frame, None if no frame has been written yet
+        for _ in range(max_attempts):
+            latest_slot = int(np.argmax(self._headers[:, FRAME_NUMBER]))
+            for slot in (latest_slot, 1 - latest_slot):
+                header = self._headers[slot]
+                sequence = header[FRAME_SEQUENCE]
+                # an odd sequence is a slot in the middle of a write, the other slot holds the frame before it
+                if sequence % 2 == 0:
+                    break
+            else:
+                # the writer moved on to the other slot while they were checked
+                continue
+            if sequence == 0:
+                return None
+
+            number, time, num_objects = int(header[FRAME_NUMBER]), float(header[FRAME_TIME]), int(header[FRAME_NUM_OBJECTS])
+            positions = self._positions[slot, :num_objects].copy()
+            velocities = self._velocities[slot, :num_objects].copy()
+            if header[FRAME_SEQUENCE] == sequence:
+                return Frame(number, time, positions, velocities)
+        return None
+
+    def close(self, unlink: bool = False):
+        self._headers = self._positions = self._velocities = None
+        self.shared_array.close(unlink)
+
+def _simulation_worker(model: GravityModel, frame_buffer_name: str, max_objects: int, commands, errors, delta: float, speed_up: float,
+        frame_interval: float):
+    # errors is the sending end of a pipe, the traceback of an exception ending the worker is sent on it before the
+    # process exits. The traceback is sent as text as the exception itself may not be picklable
+    frame_buffer = None
+    try:
+        frame_buffer = FrameBuffer(max_objects, model.coordinate_system.dimension, frame_buffer_name)
+        wall_start, start_time = monotonic(), model.time
+        last_frame = None
+        while True:
+            model.step(delta)
+
+            now = monotonic()
+            if last_frame is None or now - last_frame >= frame_interval:
+                positions, velocities, _ = state_arrays(model)
+                frame_buffer.write(model.time, positions, velocities)
+                last_frame = now
+
+                # commands are read once per frame, reading the queue every step would slow down fast models
+                try:
+                    while True:
+                        command, argument = commands.get_nowait()
+                        if command == 'stop':
+                            return
+                        if command == 'add_object':
+                            model.objects.append(argument)
+                except Empty:
+                    pass
+            if speed_up is not None:
+                # ahead of the speed up, wait for the wall clock to catch up
+                wait = wall_start + (model.time - start_time) / speed_up - now
+                if wait > 0.0:
+                    sleep(wait)
+    except Exception:
+        # reported by the parent, the process only exits with an error code
+        errors.send(traceback.format_exc())
+        sys.exit(1)
+    finally:
+        if frame_buffer is not None:
+            frame_buffer.close()
+        errors.close()
+
+class SimulationProcess():
+    # Steps a model by delta in a separate process, at speed_up simulated seconds per wall second (None for as fast as
+    # possible), and writes its state to a FrameBuffer at most every frame_interval wall seconds. The process works on
+    # a copy of the model: objects are added to it with add_object and its state is read with latest_frame.
+    # The process is spawned rather than forked, so it does not inherit the state of a GUI. A process ending on an
+    # exception sends its traceback back, a caller polling is_alive finds it with error
+    def __init__(self, model: GravityModel, delta: float, speed_up: float = 1.0, frame_interval: float = 1.0 / 120.0,
+            max_objects: int = 4096):
+        self.model = model
+        self.delta = delta
+        self.speed_up = speed_up
+        self.frame_interval = frame_interval
+        self.max_objects = max(max_objects, len(model.objects))
+        self.num_objects = len(model.objects)
+
+        self.frame_buffer = None
+        self._process = None
+        self._commands = None
+        self._errors = None
+        self._error = None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        self.frame_buffer = FrameBuffer(self.max_objects, self.model.coordinate_system.dimension)
+        self._commands = context.Queue()
+        self._errors, worker_errors = context.Pipe(duplex=False)
+        self._error = None
+        self._process = context.Process(target=_simulation_worker, args=(self.model, self.frame_buffer.name, self.max_objects,
+            self._commands, worker_errors, self.delta, self.speed_up, self.frame_interval), daemon=True)
+        self._process.start()
+        # only the process holds the sending end, so the pipe reaches its end when the process exits
+        worker_errors.close()
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def exitcode(self) -> int:
+        # None while the process runs or before it is started
+        return self._process.exitcode if self._process is not None else None
+
+    def error(self) -> str:
+        # The traceback of the exception that ended the process, or a message with the exit code of a process that
+        # exited without sending one (e.g. killed by a signal). None while the process runs or after a clean stop
+        if self._error is None and self._errors is not None:
+            try:
+                if self._errors.poll():
+                    self._error = self._errors.recv()
+            except EOFError:
+                pass
+            exitcode = self.exitcode()
+            if self._error is None and exitcode is not None and exitcode != 0:
+                self._error = f"The simulation process exited with code {exitcode}"
+        return self._error
+
+    def add_object(self, object: Object):
+        if self.num_objects >= self.max_objects:
+            raise ValueError(f"The simulation holds at most {self.max_objects} objects")
+        self._commands.put(('add_object', object))
+        self.num_objects += 1
+
+    def latest_frame(self) -> Frame:
+        return self.frame_buffer.read() if self.frame_buffer is not None else None
+
+    def stop(self, timeout: float = 5.0):
+        if self._process is not None:
+            self._commands.put(('stop', None))
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+            self._errors.close()
+            self._errors = None
+        if self.frame_buffer is not None:
+            self.frame_buffer.close(unlink=True)
+            self.frame_buffer = None
@@ -0,0 +1,169 @@
+import numpy as np
+
+# Multipliers hashing the integer coordinates of a cell (up to 3 dimensions) to one int64 key, the large primes of
+# spatial hashing. Different cells can share a key, queries check the positions of the points of a key so a shared
+# key only costs extra candidates
+CELL_HASH_MULTIPLIERS = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+# cell coordinates are clipped to this magnitude, so positions far from the origin do not overflow int64
+MAX_CELL_COORDINATE = 2.0 ** 52
+# updates moving more than this fraction of the points to other cells sort all the points again
+MAX_INCREMENTAL_UPDATE_FRACTION = 0.125
+
+def default_cell_size(positions: np.ndarray) -> float:
+    # a cell size giving about one point per cell if the points filled their bounding box evenly
+    if len(positions) == 0:
+        return 1.0
+    extents = np.ptp(positions, axis=0)
+    extents = extents[extents > 0.0]
+    if len(extents) == 0:
+        return 1.0
+    return float((np.prod(extents) / len(positions)) ** (1.0 / len(extents)))
+
+class UniformGridIndex():
+    # Spatial index of (N, dimension) positions in a uniform grid of cells with sides of cell_size, stored as a
+    # spatial hash: the indices of the points sorted by the key of their cell, so the points of a cell are found with a
+    # binary search and the grid takes O(N) memory however far apart the points are. update only moves the points that
+    # changed cell, so refreshing the index after a step is cheap when most points stay in their cell.
+    # Queries return indices of the positions
+    def __init__(self, positions: np.ndarray, cell_size: float = None):
+        positions = np.array(positions, dtype=np.float64)
+        if positions.ndim != 2 or positions.shape[1] > len(CELL_HASH_MULTIPLIERS):
+            raise ValueError(f"Positions must be (N, dimension) with a dimension of at most {len(CELL_HASH_MULTIPLIERS)}, not {positions.shape}")
+        self.cell_size = float(cell_size) if cell_size is not None else default_cell_size(positions)
+        if not self.cell_size > 0.0:
+            raise ValueError(f"The cell size must be positive, not {self.cell_size}")
+        self._build(positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _build(self, positions: np.ndarray):
+        self.positions = positions
+        self.keys = self.cell_keys(self.cells(positions))
+        self.order = np.argsort(self.keys, kind='stable')
+        self.sorted_keys = self.keys[self.order]
+
+    def cells(self, positions: np.ndarray) -> np.ndarray:
+        # integer coordinates of the cells of the positions
+        return np.clip(np.floor(positions / self.cell_size), -MAX_CELL_COORDINATE, MAX_CELL_COORDINATE).astype(np.int64)
+
+    def cell_keys(self, cells: np.ndarray) -> np.ndarray:
+        # int64 products wrap around, which is fine for a hash
+        return np.bitwise_xor.reduce(cells * CELL_HASH_MULTIPLIERS[:cells.shape[1]], axis=1)
+
+    def update(self, positions: np.ndarray):
+        # Refreshes the index with the new positions of the points. Points that stayed in their cell are not moved,
+        # the ones that changed cell are removed and inserted at their new key
+        positions = np.array(positions, dtype=np.float64)
+        if positions.shape != self.positions.shape:
+            self._build(positions)
+            return
+
+        keys = self.cell_keys(self.cells(positions))
+        moved = np.flatnonzero(keys != self.keys)
+        self.positions = positions
+        if len(moved) == 0:
+            return
+        if len(moved) > MAX_INCREMENTAL_UPDATE_FRACTION * len(keys):
+            self._build(positions)
+            return
+
+        moved_mask = np.zeros(len(keys), dtype=bool)
+        moved_mask[moved] = True
+        kept = ~moved_mask[self.order]
+        order, sorted_keys = self.order[kept], self.sorted_keys[kept]
+
+        moved_keys = keys[moved]
+        moved_order = np.argsort(moved_keys, kind='stable')
+        moved, moved_keys = moved[moved_order], moved_keys[moved_order]
+        insert_at = np.searchsorted(sorted_keys, moved_keys)
+        self.order = np.insert(order, insert_at, moved)
+        self.sorted_keys = np.insert(sorted_keys, insert_at, moved_keys)
+        self.keys = keys
+
+    def _cell_ranges(self, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # (positions in self.order, number of points) of the points of every key
+        starts = np.searchsorted(self.sorted_keys, keys, side='left')
+        return starts, np.searchsorted(self.sorted_keys, keys, side='right') - starts
+
+    def _expand_ranges(self, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        # the indices of the points of the ranges of self.order, one range after another
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.order[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)]
+
+    def points_in_cells(self, keys: np.ndarray) -> np.ndarray:
+        # indices of the points in the cells with the keys, keys must be unique
+        return self._expand_ranges(*self._cell_ranges(keys))
+
+    def _candidates(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        # indices of the points in the cells overlapping the box [low, high], all the points when there are more
+        # cells than points
+        low_cell, high_cell = self.cells(np.reshape(low, (1, -1)))[0], self.cells(np.reshape(high, (1, -1)))[0]
+        num_cells = np.prod((high_cell - low_cell + 1).astype(np.float64))
+        if num_cells > len(self.positions):
+            return np.arange(len(self.positions))
+        axes = [np.arange(low_axis, high_axis + 1) for low_axis, high_axis in zip(low_cell, high_cell)]
+        cells = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+        return self.points_in_cells(np.unique(self.cell_keys(cells)))
+
+    def within_radius(self, center: np.ndarray, radius: float) -> np.ndarray:
+        # indices of the points at most radius from center, in increasing order
+        center = np.asarray(center, dtype=np.float64)
+        candidates = self._candidates(center - radius, center + radius)
+        distances = np.linalg.norm(self.positions[candidates] - center, axis=1)
+        return np.sort(candidates[distances <= radius])
+
+    def within_box(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        # indices of the points in the box [low, high], in increasing order
+        low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+        candidates = self._candidates(low, high)
+        points = self.positions[candidates]
+        return np.sort(candidates[np.all((points >= low) & (points <= high), axis=1)])
+
+    def nearest(self, point: np.ndarray, k: int = 1, max_distance: float = np.inf) -> np.ndarray:
+        # indices of the k points nearest to point and at most max_distance from it, nearest first. The search
+        # starts with the cells around the point and doubles its radius until it holds k points
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, len(self.positions))
+        radius = self.cell_size
+        while k > 0:
+            search_radius = min(radius, max_distance)
+            candidates = self._candidates(point - search_radius, point + search_radius)
+            distances = np.linalg.norm(self.positions[candidates] - point, axis=1)
+            # every point within the search radius is a candidate, so the nearest of them are the nearest points
+            searched_all = len(candidates) == len(self.positions)
+            if searched_all or radius >= max_distance or np.count_nonzero(distances <= search_radius) >= k:
+                within = distances <= (max_distance if searched_all else search_radius)
+                candidates, distances = candidates[within], distances[within]
+                return candidates[np.argsort(distances, kind='stable')[:k]]
+            radius *= 2.0
+        return np.zeros(0, dtype=np.int64)
+
+    def pairs_within(self, radius: float) -> np.ndarray:
+        # (M, 2) array of the index pairs (i, j), i < j, of the points at most radius apart, in increasing order.
+        # Every point is only compared with the points of its own and the neighbouring cells, so radius can be at
+        # most the cell size, and the cost is O(N) while the cells hold a bounded number of points
+        if radius > self.cell_size:
+            raise ValueError(f"Pairs can only be found within the cell size {self.cell_size}, not within {radius}")
+        num_points, dimension = self.positions.shape
+        if num_points == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        cells = self.cells(self.positions)
+        neighbour_offsets = np.indices((3,) * dimension).reshape(dimension, -1).T - 1
+
+        pair_codes = []
+        for neighbour_offset in neighbour_offsets:
+            starts, counts = self._cell_ranges(self.cell_keys(cells + neighbour_offset))
+            first = np.repeat(np.arange(num_points), counts)
+            second = self._expand_ranges(starts, counts)
+            candidates = first < second
+            first, second = first[candidates], second[candidates]
+            r_vecs = self.positions[second] - self.positions[first]
+            within = np.einsum('ij,ij->i', r_vecs, r_vecs) <= radius * radius
+            pair_codes.append(first[within] * num_points + second[within])
+
+        # cells sharing a key are found from several neighbours, np.unique drops the repeated pairs
+        pair_codes = np.unique(np.concatenate(pair_codes))
+        return np.stack([pair_codes // num_points, pair_codes % num_points], axis=1)
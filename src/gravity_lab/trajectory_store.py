@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+from typing import Any, Union
+
+import numpy as np
+
+from gravity_lab.array_file import open_array_file, write_array_file
+from gravity_lab.math import Vector
+
+# times are in seconds since J2000 (2000-01-01 12:00 TDB), positions in m and velocities in m/s
+TRAJECTORY_COLUMNS = ['time', 'x', 'y', 'z', 'vx', 'vy', 'vz']
+
+JULIAN_DAY_J2000 = 2451545.0
+J2000 = datetime(2000, 1, 1, 12)
+
+def seconds_to_datetime(seconds: float) -> datetime:
+    # rounded to 0.1 ms, the resolution of the calendar dates of the JPL Horizons System
+    return J2000 + timedelta(microseconds=round(seconds * 1e4) * 100)
+
+def datetime_to_seconds(date_time: datetime) -> float:
+    return (date_time - J2000) / timedelta(seconds=1)
+
+def hermite_interpolation(s: np.ndarray, h: np.ndarray, p0: np.ndarray, v0: np.ndarray, p1: np.ndarray, v1: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Cubic Hermite interpolation between the states (p0, v0) and (p1, v1) h seconds apart, at the fractions s of h.
+    # The velocities are the derivative of the interpolated positions so the two stay consistent. s and h broadcast
+    # against the states, e.g. (N, 1) for N pairs of (N, 3) states
+    s2 = s * s
+    s3 = s2 * s
+    v0 = v0 * h
+    v1 = v1 * h
+    positions = (2.0*s3 - 3.0*s2 + 1.0) * p0 + (s3 - 2.0*s2 + s) * v0 + (3.0*s2 - 2.0*s3) * p1 + (s3 - s2) * v1
+    velocities = ((6.0*s2 - 6.0*s) * (p0 - p1) + (3.0*s2 - 4.0*s + 1.0) * v0 + (3.0*s2 - 2.0*s) * v1) / h
+    return positions, velocities
+
+class Trajectory():
+    # Samples of the state of one object, one float64 array per column of TRAJECTORY_COLUMNS, sorted by time.
+    # The columns may be memory mapped from a trajectory file, so reading a sample only reads that sample from disk.
+    # Columns that are known to be sorted (e.g. read from a trajectory file) are not checked
+    def __init__(self, columns: dict[str, np.ndarray], is_sorted: bool = False):
+        lengths = set(len(columns[column]) for column in TRAJECTORY_COLUMNS)
+        if len(lengths) != 1:
+            raise ValueError(f"The columns of a trajectory must have the same length, not {lengths}")
+
+        time = columns['time']
+        if not is_sorted and len(time) > 1 and np.any(time[1:] < time[:-1]):
+            order = np.argsort(time, kind='stable')
+            columns = {column: np.asarray(columns[column])[order] for column in TRAJECTORY_COLUMNS}
+        self.columns = {column: columns[column] for column in TRAJECTORY_COLUMNS}
+
+    @classmethod
+    def from_vector_table(cls, vector_table: dict[str, np.ndarray]) -> 'Trajectory':
+        # vector_table has the columns of parse_jpl_horizons_vector_table with epochs in julian days
+        columns = {column: vector_table[column] for column in TRAJECTORY_COLUMNS[1:]}
+        columns['time'] = (vector_table['epoch'] - JULIAN_DAY_J2000) * 86400.0
+        return cls(columns)
+
+    @classmethod
+    def concatenate(cls, trajectories: list['Trajectory']) -> 'Trajectory':
+        return cls({column: np.concatenate([trajectory.columns[column] for trajectory in trajectories]) for column in TRAJECTORY_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.columns['time'])
+
+    @property
+    def times(self) -> np.ndarray:
+        return self.columns['time']
+
+    def positions(self) -> np.ndarray:
+        # (N, 3) copy of the positions
+        return np.column_stack([self.columns['x'], self.columns['y'], self.columns['z']])
+
+    def velocities(self) -> np.ndarray:
+        return np.column_stack([self.columns['vx'], self.columns['vy'], self.columns['vz']])
+
+    def position(self, i: int) -> Vector:
+        return Vector([float(self.columns['x'][i]), float(self.columns['y'][i]), float(self.columns['z'][i])])
+
+    def velocity(self, i: int) -> Vector:
+        return Vector([float(self.columns['vx'][i]), float(self.columns['vy'][i]), float(self.columns['vz'][i])])
+
+    def datetime(self, i: int) -> datetime:
+        return seconds_to_datetime(float(self.columns['time'][i]))
+
+    def index(self, time: float) -> int:
+        # index of the first sample at or after time, by binary search of the sorted times
+        return int(np.searchsorted(self.columns['time'], time, side='left'))
+
+    def interval(self, times: np.ndarray) -> np.ndarray:
+        # index i of the samples around every time, times[i] <= time <= times[i + 1], by binary search of the sorted times
+        sample_times = self.columns['time']
+        times = np.asarray(times, dtype=float)
+        if len(sample_times) < 2:
+            raise ValueError("Interpolating a trajectory needs at least 2 samples")
+        if np.any(times < sample_times[0]) or np.any(times > sample_times[-1]):
+            raise ValueError(f"Times must be within the trajectory, from {float(sample_times[0])} to {float(sample_times[-1])} s")
+        return np.clip(np.searchsorted(sample_times, times, side='right') - 1, 0, len(sample_times) - 2)
+
+    def states_at(self, times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # (len(times), 3) positions and velocities at any times within the trajectory, by cubic Hermite interpolation
+        # of the positions and velocities of the samples around each time
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        i = self.interval(times)
+        sample_times = self.columns['time']
+        h = (sample_times[i + 1] - sample_times[i])[:, np.newaxis]
+        s = (times[:, np.newaxis] - sample_times[i][:, np.newaxis]) / h
+
+        p0 = np.column_stack([self.columns[column][i] for column in ('x', 'y', 'z')])
+        p1 = np.column_stack([self.columns[column][i + 1] for column in ('x', 'y', 'z')])
+        v0 = np.column_stack([self.columns[column][i] for column in ('vx', 'vy', 'vz')])
+        v1 = np.column_stack([self.columns[column][i + 1] for column in ('vx', 'vy', 'vz')])
+        return hermite_interpolation(s, h, p0, v0, p1, v1)
+
+    def state_at(self, time: float) -> tuple[Vector, Vector]:
+        # states_at for one time, with hermite_interpolation on python floats as numpy is slow for a single time
+        sample_times = self.columns['time']
+        if len(sample_times) < 2 or not sample_times[0] <= time <= sample_times[-1]:
+            self.interval(time)  # raises the ValueError for times outside the trajectory
+        i = min(int(np.searchsorted(sample_times, time, side='right')) - 1, len(sample_times) - 2)
+        t0, t1 = float(sample_times[i]), float(sample_times[i + 1])
+        h = t1 - t0
+        s = (time - t0) / h
+        s2 = s * s
+        s3 = s2 * s
+        h00, h10, h01, h11 = 2.0*s3 - 3.0*s2 + 1.0, (s3 - 2.0*s2 + s) * h, 3.0*s2 - 2.0*s3, (s3 - s2) * h
+        d00, d10, d11 = (6.0*s2 - 6.0*s) / h, 3.0*s2 - 4.0*s + 1.0, 3.0*s2 - 2.0*s
+
+        position, velocity = [], []
+        for axis in ('x', 'y', 'z'):
+            p0, p1 = float(self.columns[axis][i]), float(self.columns[axis][i + 1])
+            v0, v1 = float(self.columns['v' + axis][i]), float(self.columns['v' + axis][i + 1])
+            position.append(h00*p0 + h10*v0 + h01*p1 + h11*v1)
+            velocity.append(d00*(p0 - p1) + d10*v0 + d11*v1)
+        return Vector(position), Vector(velocity)
+
+    def between(self, start_time: float, stop_time: float) -> 'Trajectory':
+        # the samples in [start_time, stop_time], as views of the columns
+        start, stop = self.index(start_time), int(np.searchsorted(self.columns['time'], stop_time, side='right'))
+        return Trajectory({column: values[start:stop] for column, values in self.columns.items()}, is_sorted=True)
+
+# A trajectory file is an array file (see array_file.py) with the columns of every object. The header holds the
+# name of the data and the name and object data of every object, the columns of the i-th object are the arrays 'i/column'
+TRAJECTORY_FILE_MAGIC = b'GLTRAJ01'
+
+def write_trajectory_file(path: str, name: str, object_trajectories: dict[Union[int, str], tuple[Any, Trajectory]]):
+    # object_data must be JSON serializable
+    objects = []
+    arrays = {}
+    for i, (object_name, (object_data, trajectory)) in enumerate(object_trajectories.items()):
+        objects.append({'name': object_name, 'object_data': object_data})
+        for column in TRAJECTORY_COLUMNS:
+            arrays[f"{i}/{column}"] = np.asarray(trajectory.columns[column], dtype=np.float64)
+    write_array_file(path, TRAJECTORY_FILE_MAGIC, {'name': name, 'objects': objects}, arrays)
+
+def open_trajectory_file(path: str) -> tuple[str, dict[Union[int, str], tuple[Any, Trajectory]]]:
+    # Returns (name, object_trajectories) with the columns memory mapped read only
+    header, arrays = open_array_file(path, TRAJECTORY_FILE_MAGIC)
+    object_trajectories = {}
+    for i, object in enumerate(header['objects']):
+        columns = {column: arrays[f"{i}/{column}"] for column in TRAJECTORY_COLUMNS}
+        object_trajectories[object['name']] = (object['object_data'], Trajectory(columns, is_sorted=True))
+    return header['name'], object_trajectories
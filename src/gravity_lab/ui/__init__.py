@@ -1,10 +1,25 @@
-from threading import Event, Thread
-from time import sleep
 import tkinter as tk
 
+import numpy as np
+
 from gravity_lab.data import TrajectoryData
 from gravity_lab.gravity_model import Object
 from gravity_lab.math import Vector
+from gravity_lab.simulation_process import Frame
+from gravity_lab.spatial_index import UniformGridIndex
+from gravity_lab.ui.rendering import polyline_pieces, screen_coordinates, view_transform_key
+
+# milliseconds between canvas updates on the Tk main loop
+CANVAS_UPDATE_INTERVAL_MS = 16
+OBJECT_RADIUS = 1.5
+# clicks at most this many pixels from an object pick it
+PICK_RADIUS_PIXELS = 10.0
+# trajectories are colored from red at their first point to green at their last in this many steps
+TRAJECTORY_COLOR_BANDS = 16
+
+def rgb_to_hex(r, g, b):
+    r, g, b = int(r), int(g), int(b)
+    return f'#{r:02x}{g:02x}{b:02x}'
 
 
 class Display2DCanvas(tk.Canvas):
@@ -14,12 +29,14 @@ class Display2DCanvas(tk.Canvas):
         self.model_object_to_canvas_object = {}
         self.canvas_object_to_model_object = {}
 
+        # the model objects in the order they were added, the order of the objects of the model and of its frames
+        self.model_objects = []
+
         self.trajectory_data_objects = {}
 
-        suspend_thread_event = Event()
-        self.update_canvas_thread = Thread(target=self.update_canvas, args=(suspend_thread_event,), daemon=True)
-        self.update_canvas_thread.suspend_event = suspend_thread_event
-        self.update_canvas_thread.start()
+        # returns the latest Frame of the simulation, or None while the objects are not simulated
+        self.frame_source = None
+        self.frame: Frame = None
 
         self.zoom = 1.0
 
@@ -27,57 +44,111 @@ class Display2DCanvas(tk.Canvas):
         self.display_translation = [50.0, 50.0]
         self.display_2d_coord_index = [0, 1]
 
+        # the view transform the trajectories are drawn with and what the objects were last drawn from, the canvas
+        # items are only changed when these change
+        self.view = None
+        self.objects_drawn = None
+        # index of the displayed coordinates of the objects as drawn, with cells of the pick radius
+        self.object_index: UniformGridIndex = None
+        self.after(CANVAS_UPDATE_INTERVAL_MS, self.update_canvas)
 
     def add_object(self, model_object: Object):
-        canvas_object = self.create_oval(0, 0, 3, 3, fill='#000000')
+        canvas_object = self.create_oval(0, 0, 2 * OBJECT_RADIUS, 2 * OBJECT_RADIUS, fill='#000000')
         self.model_object_to_canvas_object[model_object] = canvas_object
         self.canvas_object_to_model_object[canvas_object] = model_object
-
+        self.model_objects.append(model_object)
+
+    def object_state(self, model_object: Object) -> tuple[Vector, Vector]:
+        # (coordinate, velocity) of the object in the frame shown, its initial state before the simulation's first frame
+        index = self.model_objects.index(model_object)
+        if self.frame is not None and index < len(self.frame.positions):
+            return Vector(self.frame.positions[index]), Vector(self.frame.velocities[index])
+        return model_object.coordinate, model_object.velocity
+
+    def view_transform_key(self) -> tuple:
+        width, height = self.winfo_width(), self.winfo_height()
+        if width <= 1 or height <= 1:
+            # not mapped yet, use the requested size
+            width, height = self.winfo_reqwidth(), self.winfo_reqheight()
+        return view_transform_key(self.zoom, self.display_translation, self.display_2d_coord_index, width, height)
+
+    # Each trajectory is drawn as polylines, one per color band of its visible part, at most one point per pixel.
+    # The points are only transformed to the canvas when the view changes
     def add_trajectory(self, trajectory_data: TrajectoryData):
-        def rgb_to_hex(r, g, b):
-            r, g, b = int(r), int(g), int(b)
-            return f'#{r:02x}{g:02x}{b:02x}'
         for object_name in trajectory_data.object_trajectories:
-            object_data, object_trajectory_data = trajectory_data.object_trajectories[object_name]
-            canvas_objects = []
-
-            def parse_vector(vector):
-                return Vector([vector['x'], vector['y'], vector['z']])
-            num_trajectory_points = len(object_trajectory_data)
-            for point_idx, trajectory_point in enumerate(object_trajectory_data):
-                trajectory_trace_ratio = point_idx/num_trajectory_points
-                position = parse_vector(trajectory_point['position'])
-                canvas_object = self.create_oval(0, 0, 3, 3,
-                    fill=f'{rgb_to_hex(trajectory_trace_ratio*255, 255 - trajectory_trace_ratio*255, 0)}')
-
-                self.moveto(canvas_object,
-                    (position[self.display_2d_coord_index[0]] * self.zoom) + self.display_translation[0],
-                    (position[self.display_2d_coord_index[1]] * self.zoom) + self.display_translation[1])
-
-                canvas_objects.append(canvas_object)
+            object_data, trajectory = trajectory_data.object_trajectories[object_name]
             self.trajectory_data_objects[object_name] = {
-                "data": object_trajectory_data,
-                "canvas_objects": canvas_objects
+                "data": trajectory,
+                "positions": trajectory.positions(),
+                "canvas_objects": []
             }
-
-    def update_canvas(self, suspend_event: Event):
-        while not suspend_event.is_set():
-            sleep(1.0/60.0)
-            try:
-                for model_object in self.model_object_to_canvas_object:
-                    canvas_object = self.model_object_to_canvas_object[model_object]
-                    if hasattr(model_object, 'coordinate'):
-                        self.moveto(canvas_object, (model_object.coordinate[self.display_2d_coord_index[0]] * self.zoom) + self.display_translation[0],
-                                            (model_object.coordinate[self.display_2d_coord_index[1]] * self.zoom) + self.display_translation[1])
-
+            if self.view is not None:
+                self.draw_trajectory(object_name, self.view)
+
+    def draw_trajectory(self, object_name, view: tuple):
+        zoom, translation, coordinate_indices, width, height = view
+        trajectory_objects = self.trajectory_data_objects[object_name]
+        canvas_objects = trajectory_objects["canvas_objects"]
+
+        screen = screen_coordinates(trajectory_objects["positions"], list(coordinate_indices), zoom, translation)
+        pieces = polyline_pieces(screen, width, height, TRAJECTORY_COLOR_BANDS) if len(screen) > 0 else []
+        # the line items are reused, only the missing ones are created
+        while len(canvas_objects) < len(pieces):
+            canvas_objects.append(self.create_line(0, 0, 0, 0))
+        while len(canvas_objects) > len(pieces):
+            self.delete(canvas_objects.pop())
+        for canvas_object, (band, coordinates) in zip(canvas_objects, pieces):
+            ratio = (band + 0.5) / TRAJECTORY_COLOR_BANDS
+            self.coords(canvas_object, coordinates)
+            self.itemconfigure(canvas_object, fill=rgb_to_hex(ratio*255, 255 - ratio*255, 0))
+
+    def draw_objects(self, view: tuple):
+        zoom, translation, coordinate_indices, _, _ = view
+        num_frame_objects = len(self.frame.positions) if self.frame is not None else 0
+        positions = [self.frame.positions] if num_frame_objects > 0 else []
+        # objects added since the latest frame are drawn at their initial coordinate
+        positions += [np.reshape(model_object.coordinate.components, (1, -1)) for model_object in self.model_objects[num_frame_objects:]]
+        if len(positions) == 0:
+            return
+
+        positions = np.concatenate(positions)
+        screen = screen_coordinates(positions, list(coordinate_indices), zoom, translation) - OBJECT_RADIUS
+        for model_object, (x, y) in zip(self.model_objects, screen.tolist()):
+            self.moveto(self.model_object_to_canvas_object[model_object], x, y)
+
+        displayed_positions = positions[:, list(coordinate_indices)]
+        cell_size = PICK_RADIUS_PIXELS / zoom
+        if self.object_index is not None and self.object_index.cell_size == cell_size:
+            self.object_index.update(displayed_positions)
+        else:
+            self.object_index = UniformGridIndex(displayed_positions, cell_size)
+
+    def object_at(self, x: float, y: float) -> Object:
+        # the object drawn nearest to the canvas coordinate (x, y), None if none is within PICK_RADIUS_PIXELS of it
+        if self.object_index is None or len(self.object_index) == 0:
+            return None
+        coordinate = (np.array([x, y]) - self.display_translation) / self.zoom
+        nearest = self.object_index.nearest(coordinate, 1, PICK_RADIUS_PIXELS / self.zoom)
+        return self.model_objects[nearest[0]] if len(nearest) > 0 else None
+
+    # Runs on the Tk main loop, never in another thread. The objects are moved to the latest complete frame of the
+    # simulation, so all of them are shown at the same time of the model
+    def update_canvas(self):
+        try:
+            if self.frame_source is not None:
+                frame = self.frame_source()
+                if frame is not None:
+                    self.frame = frame
+
+            view = self.view_transform_key()
+            objects_drawn = (view, self.frame.number if self.frame is not None else None, len(self.model_objects))
+            if objects_drawn != self.objects_drawn:
+                self.draw_objects(view)
+                self.objects_drawn = objects_drawn
+            if view != self.view:
                 for object_name in self.trajectory_data_objects:
-                    for i, trajectory_point in enumerate(self.trajectory_data_objects[object_name]["data"]):
-                        canvas_object = self.trajectory_data_objects[object_name]["canvas_objects"][i]
-                        def parse_vector(vector):
-                            return Vector([vector['x'], vector['y'], vector['z']])
-                        position = parse_vector(trajectory_point['position'])
-                        self.moveto(canvas_object,
-                            (position[self.display_2d_coord_index[0]] * self.zoom) + self.display_translation[0],
-                            (position[self.display_2d_coord_index[1]] * self.zoom) + self.display_translation[1])
-            except Exception as e:
-                print(e) # TODO react to errors
\ No newline at end of file
+                    self.draw_trajectory(object_name, view)
+                self.view = view
+        except Exception as e:
+            print(e) # TODO react to errors
+        self.after(CANVAS_UPDATE_INTERVAL_MS, self.update_canvas)
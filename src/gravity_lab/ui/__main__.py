@@ -1,21 +1,31 @@
-from threading import Event, Thread
-from time import sleep
+from queue import Empty, Queue
+from threading import Thread
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 from typing import get_type_hints
 
+from gravity_lab.barnes_hut_model import BarnesHutModel
 from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
-from gravity_lab.data import Data, TrajectoryData, jpl_horizons_body_mass_kg, jpl_horizons_search_major_body_id, jpl_horizons_ephemeris_vector
-from gravity_lab.gravity_model import GravityModel, ModelRunner
+from gravity_lab.data import SOLAR_SYSTEM_BODY_NAMES, Data, TrajectoryData, jpl_horizons_fetch_bodies
+from gravity_lab.gravity_model import GravityModel, ModelRunner, Object
 from gravity_lab.math import Vector
 from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import KinematicParticle
+from gravity_lab.simulation_process import Frame, SimulationProcess
 from gravity_lab.ui import Display2DCanvas
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+from gravity_lab.wisdom_holman_model import WisdomHolmanModel
 
 
 class SimulationManager():
     gravity_lab_models = [
         NewtonianMechanicsModel(CartesianCoordinateSystem(2)),
-        NewtonianMechanicsModel(CartesianCoordinateSystem(3))
+        NewtonianMechanicsModel(CartesianCoordinateSystem(3)),
+        VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(2)),
+        VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3)),
+        BarnesHutModel(CartesianCoordinateSystem(2)),
+        BarnesHutModel(CartesianCoordinateSystem(3)),
+        WisdomHolmanModel(CartesianCoordinateSystem(3))
     ]
 
     def __init__(self, models: list[ModelRunner] = []):
@@ -26,20 +36,36 @@ class SimulationManager():
             self.model_name_to_model_map[f"{model.__class__.__name__}:{model.coordinate_system.dimension}D"] = model
 
         self.current_model: GravityModel = None
-        self.simulation_thread: Thread = Thread(target=self.run_model, daemon=True)
-        suspect_thread_event: Event = Event()
-        self.simulation_thread.suspend_event = suspect_thread_event
-
-    def run_model(self):
-        while not self.simulation_thread.suspend_event.is_set():
-            sleep(1.0/120.0)
-            self.current_model.step(1.0/120.0)
+        self.simulation_process: SimulationProcess = None
 
+    # The model is stepped in real time by a separate process, on a copy of the model made when the simulation starts.
+    # Objects added afterwards are sent to it and its state is read back as frames
     def simulate(self):
-        self.simulation_thread.start()
+        if self.simulation_process is None:
+            self.simulation_process = SimulationProcess(self.current_model, 1.0/120.0)
+            self.simulation_process.start()
+
+    def add_object(self, model_object: Object):
+        self.current_model.objects.append(model_object)
+        if self.simulation_process is not None:
+            self.simulation_process.add_object(model_object)
+
+    def latest_frame(self) -> Frame:
+        return self.simulation_process.latest_frame() if self.simulation_process is not None else None
+
+    # Returns the error of a simulation process that ended by itself, e.g. on an exception in the model, and stops it
+    # so a new simulation can be started. None while the simulation runs or when there is none
+    def check_simulation(self) -> str:
+        if self.simulation_process is None or self.simulation_process.is_alive():
+            return None
+        error = self.simulation_process.error()
+        self.stop_simulation()
+        return error if error is not None else "The simulation process exited"
 
     def stop_simulation(self):
-        self.simulation_thread.suspend_event.set()
+        if self.simulation_process is not None:
+            self.simulation_process.stop()
+            self.simulation_process = None
     
     def model_names(self):
         return list(self.model_name_to_model_map.keys())
@@ -54,25 +80,36 @@ class GravityLab():
         # [data_name: str] -> Data()
         self.loaded_data = {}
 
+        # messages from background threads, printed on the Tk main loop
+        self.messages = Queue()
+
         self.simulation_manager = SimulationManager()
         self.build_ui()
+        self.window.after(100, self.print_messages)
+
+    def print_messages(self):
+        try:
+            while True:
+                print(self.messages.get_nowait())
+        except Empty:
+            pass
+        # the simulation runs in another process, the UI would otherwise keep showing its last frame after a crash
+        error = self.simulation_manager.check_simulation()
+        if error is not None:
+            print(error)
+            messagebox.showerror("Simulation stopped", error.strip().splitlines()[-1], detail=error, parent=self.window)
+        self.window.after(100, self.print_messages)
 
     def interact_on_canvas(self, event):
-        closest_objects = self.canvas.find_closest(event.x, event.y)
-        if len(closest_objects) == 0:
+        model_object = self.canvas.object_at(event.x, event.y)
+        if model_object is None:
             self.add_object(event)
         else:
-            closest_object = closest_objects[0]
-            closest_object_position = self.canvas.coords(closest_object)
-            x1, y1, _, _ = closest_object_position
-            if (Vector([event.x, event.y]) - Vector([x1, y1])).magnitude() < 10.0:
-                model_object = self.canvas.canvas_object_to_model_object[closest_object]
-                print(f"Distance from coordinate center: {model_object.coordinate.magnitude()} m")
-                print(f"Velocity: {model_object.velocity.magnitude() / 1000.0} km/s")
-                print(model_object)
-                pass # TODO: open menu to see object details and interact with object
-            else:
-                self.add_object(event)
+            coordinate, velocity = self.canvas.object_state(model_object)
+            print(f"Distance from coordinate center: {coordinate.magnitude()} m")
+            print(f"Velocity: {velocity.magnitude() / 1000.0} km/s")
+            print(model_object)
+            pass # TODO: open menu to see object details and interact with object
 
     def add_object(self, event):
         # get the type of objects used by the model
@@ -122,19 +159,22 @@ class GravityLab():
             arguments[parameter_name] = parameter_name_to_type_map[parameter_name](parameter_value)
 
         model_object = model_object_type(**arguments)
-        self.simulation_manager.current_model.objects.append(model_object)
+        self.simulation_manager.add_object(model_object)
 
         self.canvas.add_object(model_object)
 
         if to_destory != None:
             to_destory.destroy()
 
-    def create_object(self, model_object_init_params):
-        # get the type of objects used by the model
-        model_object_type: type = get_type_hints(self.simulation_manager.current_model.__init__)["objects"].__args__[0]
+    # model_object_type defaults to the type of objects used by the model. Passing TestParticle adds
+    # a tracer that feels the gravity of the other objects but exerts none
+    def create_object(self, model_object_init_params, model_object_type: type = None):
+        if model_object_type is None:
+            # get the type of objects used by the model
+            model_object_type = get_type_hints(self.simulation_manager.current_model.__init__)["objects"].__args__[0]
 
         model_object = model_object_type(**model_object_init_params)
-        self.simulation_manager.current_model.objects.append(model_object)
+        self.simulation_manager.add_object(model_object)
 
         self.canvas.add_object(model_object)
 
@@ -152,23 +192,33 @@ class GravityLab():
     def load_jpl_horizons_solar_system_objects(self):
         self.model_var.set("NewtonianMechanicsModel:3D")
 
-        for body_name in ["Sun", "Mercury", "Venus", "Earth", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]:
-            body_jpl_horizons_id = jpl_horizons_search_major_body_id(body_name)
-            sleep(0.1)
-            vector_data = jpl_horizons_ephemeris_vector(body_jpl_horizons_id)
-            sleep(0.1)
-            mass_kg = jpl_horizons_body_mass_kg(body_jpl_horizons_id)
-            sleep(0.1)
-
+        for mass_kg, trajectory in jpl_horizons_fetch_bodies(SOLAR_SYSTEM_BODY_NAMES).values():
             self.create_object({
                 "mass": mass_kg,
-                "coordinate": Vector([vector_data[0]["position"]["x"], vector_data[0]["position"]["y"], vector_data[0]["position"]["z"]]),
-                "velocity": Vector([vector_data[0]["velocity"]["x"], vector_data[0]["velocity"]["y"], vector_data[0]["velocity"]["z"]])
+                "coordinate": trajectory.position(0),
+                "velocity": trajectory.velocity(0)
             })
 
         self.zoom_string_var.set('5e-10')
         self.canvas.display_translation = [100.0, 100.0]
 
+    # The bodies follow the JPL Horizons ephemeris instead of being integrated, so objects added to the
+    # solar system move in the gravity of the recorded planets
+    def load_jpl_horizons_solar_system_kinematic_objects(self):
+        self.model_var.set("VectorizedNewtonianMechanicsModel:3D")
+
+        trajectory_data = TrajectoryData.load_solar_system_from_jpl_horizons_system()
+        epoch = trajectory_data.time_span()[0]
+        for object_data, trajectory in trajectory_data.object_trajectories.values():
+            self.create_object({
+                "mass": object_data['mass_kg'],
+                "trajectory": trajectory,
+                "epoch": epoch
+            }, KinematicParticle)
+
+        self.zoom_string_var.set('5e-10')
+        self.canvas.display_translation = [100.0, 100.0]
+
     def open_data_popup(self, data: Data):
         top = tk.Toplevel(self.window)
         top.title(data.name)
@@ -197,14 +247,39 @@ class GravityLab():
         model_validation_button.config(text='Run Model Validation')
         model_validation_button.pack()
 
-        model_validation_button.bind("<Button-1>", lambda _ : data.validate_model(self.simulation_manager.current_model, self.model_validation_step_size_val))
+        model_validation_button.bind("<Button-1>", lambda _ : self.run_model_validation(data))
+
+        model_validation_sweep_button = tk.Button(top)
+        model_validation_sweep_button.config(text='Run Step Size Sweep')
+        model_validation_sweep_button.pack()
+
+        model_validation_sweep_button.bind("<Button-1>", lambda _ : self.run_model_validation_sweep(data))
 
         separator = ttk.Separator(top, orient='horizontal')
         separator.pack(fill='x')
 
+    # Validations run in a background thread (the sweep in a pool of processes) so the UI keeps responding.
+    # The results are put in self.messages and printed from the Tk main loop
+    def run_model_validation(self, data: TrajectoryData):
+        model, delta_step = self.simulation_manager.current_model, self.model_validation_step_size_val
+
+        def validate():
+            result = data.validate_model(model, delta_step)
+            self.messages.put(result.summary())
+
+        Thread(target=validate, daemon=True).start()
+
+    # validates the model with the step size and 1/2, 1/4 and 1/8 of it, for the convergence of the error with the step size
+    def run_model_validation_sweep(self, data: TrajectoryData):
+        model, delta_step = self.simulation_manager.current_model, self.model_validation_step_size_val
+
+        def validate():
+            results = data.validation_sweep(model, [delta_step / 2 ** i for i in range(4)])
+            self.messages.put("\n".join(result.summary() for result in results))
+
+        Thread(target=validate, daemon=True).start()
+
     def load_jpl_horizons_solar_system_trajectory_data(self):
-        # BUG: When zoom is set after calling self.canvas.add_trajectory then some trajectory points
-        # don't appear on the canvas for some reason
         self.zoom_string_var.set('5e-10')
         self.canvas.display_translation = [100.0, 100.0]
         trajectory_data: TrajectoryData = TrajectoryData.load_solar_system_from_jpl_horizons_system()
@@ -218,6 +293,7 @@ class GravityLab():
 
         initial_objects_menu = tk.Menu(menu_bar)
         initial_objects_menu.add_command(label="Solar System (Data from JPL Horizons System)", command=self.load_jpl_horizons_solar_system_objects)
+        initial_objects_menu.add_command(label="Solar System Following JPL Horizons Ephemeris", command=self.load_jpl_horizons_solar_system_kinematic_objects)
         menu_bar.add_cascade(label="Load Initial Object Values", menu=initial_objects_menu)
 
         data_menu = tk.Menu(menu_bar)
@@ -232,6 +308,7 @@ class GravityLab():
 
         canvas = Display2DCanvas(left_frame)
         canvas.pack()
+        canvas.frame_source = self.simulation_manager.latest_frame
         self.canvas = canvas
         self.canvas_objects = []
 
@@ -295,7 +372,6 @@ class GravityLab():
         self.window.protocol("WM_DELETE_WINDOW", self.window_close)
 
     def window_close(self):
-        self.canvas.update_canvas_thread.suspend_event.set()
         self.simulation_manager.stop_simulation()
         self.window.destroy()
 
@@ -0,0 +1,60 @@
+import numpy as np
+
+# The steps that turn positions in model coordinates into the points of the canvas items drawing them. Every step is
+# vectorized over all the points, so redrawing long trajectories does not loop over their points in Python
+
+# pixels around the canvas in which points are still drawn, so lines do not end at the edge of the view
+RENDER_MARGIN = 16.0
+
+def view_transform_key(zoom: float, translation: list[float], coordinate_indices: list[int], width: int, height: int) -> tuple:
+    # equal keys give equal screen coordinates, so screen coordinates are only computed again when the key changes
+    return (zoom, tuple(translation), tuple(coordinate_indices), width, height)
+
+def screen_coordinates(positions: np.ndarray, coordinate_indices: list[int], zoom: float, translation: list[float]) -> np.ndarray:
+    # (N, 2) canvas coordinates of (N, dimension) positions
+    return positions[:, coordinate_indices] * zoom + np.asarray(translation, dtype=np.float64)
+
+def visible_runs(screen: np.ndarray, width: float, height: float, margin: float = RENDER_MARGIN) -> list[tuple[int, int]]:
+    # [start, stop) ranges of the points of a polyline that draw its segments crossing the view. A segment is kept
+    # when its bounding box overlaps the view, so long segments between two points outside of the view are kept too
+    if len(screen) == 1:
+        x, y = screen[0]
+        return [(0, 1)] if -margin <= x <= width + margin and -margin <= y <= height + margin else []
+
+    start_points, end_points = screen[:-1], screen[1:]
+    low, high = np.minimum(start_points, end_points), np.maximum(start_points, end_points)
+    segment_visible = (high[:, 0] >= -margin) & (low[:, 0] <= width + margin) & (high[:, 1] >= -margin) & (low[:, 1] <= height + margin)
+
+    drawn = np.zeros(len(screen), dtype=np.int8)
+    drawn[:-1] |= segment_visible
+    drawn[1:] |= segment_visible
+    edges = np.diff(drawn, prepend=0, append=0)
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+def pixel_level_of_detail(screen: np.ndarray, start: int, stop: int) -> np.ndarray:
+    # indices of the points in [start, stop) to draw: of consecutive points in the same pixel only the first is
+    # drawn, the last point of the range is always drawn. A dense trajectory keeps about one point per pixel of its length
+    pixels = np.floor(screen[start:stop]).astype(np.int64)
+    keep = np.ones(stop - start, dtype=bool)
+    keep[1:] = np.any(pixels[1:] != pixels[:-1], axis=1)
+    keep[-1] = True
+    return np.flatnonzero(keep) + start
+
+def polyline_pieces(screen: np.ndarray, width: float, height: float, num_bands: int = 1) -> list[tuple[int, list[float]]]:
+    # (band, flat coordinates) of the polylines drawing the visible part of a trajectory at the pixel level of detail.
+    # A trajectory in view is one polyline per band, the points of band b are those with index i where
+    # i * num_bands // len(screen) == b, e.g. to color the trajectory from its oldest to its latest point.
+    # Consecutive pieces share their boundary point so the line is not broken
+    pieces = []
+    for start, stop in visible_runs(screen, width, height):
+        indices = pixel_level_of_detail(screen, start, stop)
+        bands = indices * num_bands // len(screen)
+        band_starts = np.flatnonzero(np.diff(bands, prepend=-1))
+        band_stops = np.append(band_starts[1:] + 1, len(indices))
+        for band_start, band_stop in zip(band_starts.tolist(), band_stops.tolist()):
+            piece = indices[band_start:band_stop]
+            if len(piece) == 1:
+                # a line needs two points, a single point is drawn as a line of zero length
+                piece = np.repeat(piece, 2)
+            pieces.append((int(bands[band_start]), screen[piece].ravel().tolist()))
+    return pieces
@@ -0,0 +1,170 @@
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import Integrator, LeapfrogIntegrator
+from gravity_lab.force_backends import force_backend, pairwise_jerks
+from gravity_lab.math import row_vectors
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import PointParticle, is_kinematic, is_test_particle
+
+class VectorizedNewtonianMechanicsModel(NewtonianMechanicsModel):
+    # Keeps the state of all objects in contiguous (N, dimension) arrays. The coordinate and velocity
+    # of every PointParticle in self.objects are replaced by Vectors that view a row of those arrays,
+    # so code reading the objects (UI, TrajectoryData.validate_model) sees the state as it is stepped.
+    # The state is advanced by the integrator, leapfrog by default. The pairwise forces are calculated by the
+    # backend, a backend object or one of the names in FORCE_BACKENDS ('numpy' by default).
+    # KinematicParticles are not integrated: their state is interpolated from their trajectories at every step and
+    # they only act as sources, so only the forces on the other (dynamic) objects are calculated. The integrators
+    # that take all forces from the model (all but the WisdomHolmanIntegrator, which drifts every object on its
+    # Kepler orbit) see the kinematic objects exactly on their trajectories.
+    # softening_length is the Plummer softening of the forces (see NewtonianMechanicsModel)
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = [], integrator: Integrator = None,
+            backend=None, softening_length: float = 0.0):
+        super().__init__(coordinate_system, objects, softening_length)
+        self.integrator = integrator if integrator is not None else LeapfrogIntegrator()
+        self.backend = force_backend(backend)
+
+        self.positions = np.zeros((0, coordinate_system.dimension))
+        self.velocities = np.zeros((0, coordinate_system.dimension))
+        self.masses = np.zeros(0)
+        # indices of the objects that exert a force, every object that is not a test particle. source_masses are
+        # the masses of the objects with the masses of the test particles set to 0
+        self.sources = np.zeros(0, dtype=np.int64)
+        self.source_masses = np.zeros(0)
+        # indices of the kinematic objects
+        self.kinematic = np.zeros(0, dtype=np.int64)
+        self._kinematic_mask = np.zeros(0, dtype=bool)
+
+        self._synced_objects = []
+        self._coordinate_views = []
+        self._velocity_views = []
+
+    def __setstate__(self, state: dict):
+        # a copied or unpickled model has copies of the objects that own their vectors, the views of the
+        # state arrays are recreated on the next step
+        self.__dict__.update(state)
+        self._synced_objects = []
+
+    def close(self):
+        # releases the resources of the force backend, e.g. the worker processes of a ProcessPoolForceBackend
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
+
+    def sync_state(self):
+        # objects may be appended to or removed from self.objects at any time (e.g. by the UI)
+        if self._synced_objects != self.objects:
+            self._rebuild_state()
+            return
+
+        masses_changed = False
+        for i, object in enumerate(self.objects):
+            # a Vector assigned to an object replaces the view, copy it into the state arrays
+            if object.coordinate is not self._coordinate_views[i]:
+                self.positions[i] = object.coordinate.components
+                object.coordinate = self._coordinate_views[i]
+            if object.velocity is not self._velocity_views[i]:
+                self.velocities[i] = object.velocity.components
+                object.velocity = self._velocity_views[i]
+            if object.mass != self.masses[i]:
+                self.masses[i] = object.mass
+                masses_changed = True
+
+        if masses_changed:
+            self._update_sources()
+
+    def _rebuild_state(self):
+        num_objects = len(self.objects)
+        dimension = self.coordinate_system.dimension
+
+        positions = np.empty((num_objects, dimension))
+        velocities = np.empty((num_objects, dimension))
+        masses = np.empty(num_objects)
+
+        for i, object in enumerate(self.objects):
+            positions[i] = object.coordinate.components
+            velocities[i] = object.velocity.components
+            masses[i] = object.mass
+
+        self.set_state(self.objects, positions, velocities, masses)
+
+    # Makes the arrays the state of the objects without copying them (unless they are not C contiguous float64), e.g.
+    # arrays memory mapped from a checkpoint. The coordinates and velocities of the objects are replaced by views of the rows of the arrays
+    def set_state(self, objects: list[PointParticle], positions: np.ndarray, velocities: np.ndarray, masses: np.ndarray):
+        dimension = self.coordinate_system.dimension
+        self.objects = objects
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64).reshape(len(objects), dimension)
+        self.velocities = np.ascontiguousarray(velocities, dtype=np.float64).reshape(len(objects), dimension)
+        self.masses = masses
+
+        self._synced_objects = list(objects)
+        self._coordinate_views = row_vectors(self.positions, dimension)
+        self._velocity_views = row_vectors(self.velocities, dimension)
+
+        for i, object in enumerate(objects):
+            object.coordinate = self._coordinate_views[i]
+            object.velocity = self._velocity_views[i]
+
+        self._update_sources()
+
+    def _update_sources(self):
+        test_particles = np.array([is_test_particle(object) for object in self.objects], dtype=bool)
+        self.sources = np.flatnonzero(~test_particles)
+        self.source_masses = np.where(test_particles, 0.0, self.masses)
+        self._kinematic_mask = np.array([is_kinematic(object) for object in self.objects], dtype=bool)
+        self.kinematic = np.flatnonzero(self._kinematic_mask)
+
+    # positions and velocities of the kinematic objects at the time of the model
+    def kinematic_states(self, time: float) -> tuple[np.ndarray, np.ndarray]:
+        dimension = self.coordinate_system.dimension
+        positions = np.empty((len(self.kinematic), dimension))
+        velocities = np.empty((len(self.kinematic), dimension))
+        for i, object_index in enumerate(self.kinematic):
+            position, velocity = self.objects[object_index].state_at(time)
+            positions[i] = position.components
+            velocities[i] = velocity.components
+        return positions, velocities
+
+    def _with_kinematic_positions(self, positions: np.ndarray, time: float) -> np.ndarray:
+        # the integrators move every row of the positions, so the rows of the kinematic objects are replaced
+        # by their trajectories at time before the forces are calculated
+        if len(self.kinematic) == 0 or time is None:
+            return positions
+        positions = positions.copy()
+        positions[self.kinematic] = self.kinematic_states(time)[0]
+        return positions
+
+    # accelerations of the objects at positions, or only of the objects with the indices in targets.
+    # Only the sources exert forces, so the cost is O(N_targets * N_sources)
+    def accelerations(self, positions: np.ndarray, time: float = None, targets: np.ndarray = None) -> np.ndarray:
+        positions = self._with_kinematic_positions(positions, time)
+        if len(self.kinematic) == 0:
+            target_positions = positions if targets is None else positions[targets]
+            return self.backend.accelerations(target_positions, positions[self.sources], self.source_masses[self.sources], self.softening_length)
+
+        # the kinematic objects are not integrated, so they are left without acceleration
+        targets = np.arange(len(positions)) if targets is None else targets
+        dynamic_targets = targets[~self._kinematic_mask[targets]]
+        accelerations = np.zeros((len(targets), positions.shape[1]))
+        accelerations[~self._kinematic_mask[targets]] = self.backend.accelerations(positions[dynamic_targets], positions[self.sources], self.source_masses[self.sources],
+            self.softening_length)
+        return accelerations
+
+    def jerks(self, positions: np.ndarray, velocities: np.ndarray, targets: np.ndarray = None) -> np.ndarray:
+        target_positions = positions if targets is None else positions[targets]
+        target_velocities = velocities if targets is None else velocities[targets]
+        jerks = pairwise_jerks(target_positions, target_velocities, positions[self.sources], velocities[self.sources], self.source_masses[self.sources],
+            self.softening_length)
+        if len(self.kinematic) > 0:
+            jerks[self._kinematic_mask if targets is None else self._kinematic_mask[targets]] = 0.0
+        return jerks
+
+    def step(self, delta: float):
+        self.sync_state()
+
+        # Unlike NewtonianMechanicsModel.step every object sees the same positions so the result does not
+        # depend on the order of self.objects. The integrator updates the state arrays in place so the object views stay valid
+        self.integrator.step(self, delta)
+        self.time += delta
+
+        if len(self.kinematic) > 0:
+            self.positions[self.kinematic], self.velocities[self.kinematic] = self.kinematic_states(self.time)
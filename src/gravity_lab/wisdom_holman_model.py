@@ -0,0 +1,12 @@
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import WisdomHolmanIntegrator
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+class WisdomHolmanModel(VectorizedNewtonianMechanicsModel):
+    # Model for hierarchical systems with a dominant central mass, like the solar system loaded from JPL Horizons.
+    # Steps with the WisdomHolmanIntegrator so steps of days instead of seconds keep the orbits accurate.
+    # softening_length softens the forces between the objects orbiting the central object, the central force is exact
+    def __init__(self, coordinate_system: CartesianCoordinateSystem, objects: list[PointParticle] = [], central_object_index: int = None,
+            backend=None, softening_length: float = 0.0):
+        super().__init__(coordinate_system, objects, WisdomHolmanIntegrator(central_object_index), backend, softening_length)
@@ -3,10 +3,13 @@ import sys
 import unittest
 
 def import_src():
-    project_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src/gravity_lab')
-    sys.path.insert(0, project_dir)
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+    sys.path.insert(0, src_dir)
 
 import_src()
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    # runs the test_*.py modules of this directory
+    tests = unittest.defaultTestLoader.discover(os.path.dirname(os.path.abspath(__file__)))
+    result = unittest.TextTestRunner().run(tests)
+    sys.exit(0 if result.wasSuccessful() else 1)
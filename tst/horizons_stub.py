@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import tempfile
+import threading
+from time import sleep
+from urllib.parse import parse_qsl, urlparse
+
+import gravity_lab.data
+from gravity_lab.data import JPL_HORIZONS_DATETIME_FORMAT, datetime_to_julian_day
+from gravity_lab.response_cache import ResponseCache
+
+# Local stub of the JPL Horizons System API serving the major body listing and VECTORS responses in the text
+# format of Horizons, with response_delay seconds of latency per request
+STUB_BODIES = {10: ('Sun', 1988500.0), 199: ('Mercury', 0.330103), 299: ('Venus', 4.86731), 399: ('Earth', 5.97219),
+    499: ('Mars', 0.641691), 599: ('Jupiter', 1898.187), 699: ('Saturn', 568.34), 799: ('Uranus', 86.813),
+    899: ('Neptune', 102.409), 999: ('Pluto', 0.01307)}
+
+def stub_major_body_listing() -> str:
+    lines = ["  ID#      Name                               Designation  IAU/aliases/other",
+        "  -------  ---------------------------------- -----------  -------------------",
+        "        0  Solar System Barycenter                         SSB",
+        "        1  Mercury Barycenter"]
+    lines += [f"{body_id:>9}  {name}" for body_id, (name, _) in STUB_BODIES.items()]
+    return "\n".join(lines) + "\n"
+
+def stub_vectors(body_id: int, num_epochs: int = 3, csv: bool = False, start: datetime = datetime(2023, 3, 1),
+        step: timedelta = timedelta(hours=1)) -> str:
+    # epochs on a circle around the origin, in the text or CSV (CSV_FORMAT=YES) output of Horizons
+    name, mass = STUB_BODIES[body_id]
+    lines = [f" Revised: stub                 {name} / ({body_id})", f" Mass x10^24 (kg)= {mass}"]
+    if csv:
+        lines.append("            JDTDB,            Calendar Date (TDB),                      X,                      Y,                      Z,                     VX,                     VY,                     VZ,                     LT,                     RG,                     RR,")
+    lines.append("$$SOE")
+    radius = 1.5e8 + 1e5 * body_id
+    speed = 2.0 * math.pi * radius / (365.25 * 86400.0)
+    for epoch in range(num_epochs):
+        epoch_datetime = start + epoch * step
+        julian_day = datetime_to_julian_day(epoch_datetime)
+        calendar_date = epoch_datetime.strftime('%Y-%b-%d %H:%M:%S.0000')
+        angle = 2.0 * math.pi * (julian_day - 2460004.5) / 365.25
+        x, y, z = radius * math.cos(angle), radius * math.sin(angle), 1e3 * math.sin(angle)
+        vx, vy, vz = -speed * math.sin(angle), speed * math.cos(angle), 0.0
+        if csv:
+            lines.append(f"{julian_day:.9f}, A.D. {calendar_date}, {x:22.15E}, {y:22.15E}, {z:22.15E}, {vx:22.15E}, {vy:22.15E}, {vz:22.15E}, {493.2:22.15E}, {radius:22.15E}, {0.0:22.15E},")
+        else:
+            lines.append(f"{julian_day:.9f} = A.D. {calendar_date} TDB ")
+            lines.append(f" X ={x:22.15E} Y ={y:22.15E} Z ={z:22.15E}")
+            lines.append(f" VX={vx:22.15E} VY={vy:22.15E} VZ={vz:22.15E}")
+            lines.append(f" LT={493.2:22.15E} RG={radius:22.15E} RR={0.0:22.15E}")
+    lines.append("$$EOE")
+    return "\n".join(lines) + "\n"
+
+def stub_error(body_id: int) -> str:
+    return (f"API VERSION: 1.2\nAPI SOURCE: NASA/JPL Horizons API\n\n"
+        f"No ephemeris for target \"{STUB_BODIES[body_id][0]}\" prior to A.D. 2023-MAR-01 00:00:00.0000 TDB\n")
+
+class StubHorizonsHandler(BaseHTTPRequestHandler):
+    response_delay = 0.2
+    # ids of bodies answered with an error message in place of the ephemeris, as Horizons does with status 200
+    error_body_ids = set()
+    requests = []
+    active_requests = 0
+    max_active_requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlparse(self.path).query))
+        with StubHorizonsHandler.lock:
+            StubHorizonsHandler.requests.append(params)
+            StubHorizonsHandler.active_requests += 1
+            StubHorizonsHandler.max_active_requests = max(StubHorizonsHandler.max_active_requests, StubHorizonsHandler.active_requests)
+
+        sleep(StubHorizonsHandler.response_delay)
+        if params.get('COMMAND') == 'MB':
+            body = stub_major_body_listing()
+        elif int(params['COMMAND']) in StubHorizonsHandler.error_body_ids:
+            body = stub_error(int(params['COMMAND']))
+        else:
+            time_range = {}
+            if 'START_TIME' in params:
+                start = datetime.strptime(params['START_TIME'].strip("'"), JPL_HORIZONS_DATETIME_FORMAT)
+                stop = datetime.strptime(params['STOP_TIME'].strip("'"), JPL_HORIZONS_DATETIME_FORMAT)
+                step = timedelta(minutes=int(params['STEP_SIZE'].strip("'").split()[0]))
+                time_range = {'num_epochs': (stop - start) // step + 1, 'start': start, 'step': step}
+            body = stub_vectors(int(params['COMMAND']), csv=params.get('CSV_FORMAT') == 'YES', **time_range)
+
+        with StubHorizonsHandler.lock:
+            StubHorizonsHandler.active_requests -= 1
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+    @classmethod
+    def reset(cls, response_delay: float = 0.2):
+        with cls.lock:
+            cls.response_delay = response_delay
+            cls.error_body_ids = set()
+            cls.requests = []
+            cls.active_requests = 0
+            cls.max_active_requests = 0
+
+# the settings of gravity_lab.data replaced while a stub server runs
+_replaced_settings = {}
+
+def start_stub_server(cache_directory: str = None) -> ThreadingHTTPServer:
+    # The Horizons requests of gravity_lab.data are sent to the stub server and cached in cache_directory (a new
+    # directory by default) until stop_stub_server
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHorizonsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _replaced_settings.setdefault(server, (gravity_lab.data.JPL_HORIZONS_SYSTEM_API_URL, gravity_lab.data.jpl_horizons_cache))
+    gravity_lab.data.JPL_HORIZONS_SYSTEM_API_URL = f"http://127.0.0.1:{server.server_port}/api/horizons.api"
+    gravity_lab.data.jpl_horizons_cache = ResponseCache(cache_directory if cache_directory is not None else tempfile.mkdtemp())
+    return server
+
+def stop_stub_server(server: ThreadingHTTPServer):
+    server.shutdown()
+    server.server_close()
+    gravity_lab.data.JPL_HORIZONS_SYSTEM_API_URL, gravity_lab.data.jpl_horizons_cache = _replaced_settings.pop(server)
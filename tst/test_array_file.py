@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gravity_lab.array_file import ARRAY_FILE_ALIGNMENT, open_array_file, write_array_file
+
+MAGIC = b'GLTEST01'
+
+class ArrayFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'arrays')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip(self):
+        arrays = {
+            # sizes that are not multiples of the alignment, a big endian and a non contiguous array
+            'positions': np.random.default_rng(0).normal(size=(7, 3)),
+            'ids': np.arange(5, dtype='>i4'),
+            'flags': np.array([True, False, True]),
+            'columns': np.arange(24, dtype=np.float32).reshape(4, 6)[:, ::2],
+            'empty': np.zeros((0, 3)),
+        }
+        write_array_file(self.path, MAGIC, {'name': 'test', 'time': 1.5}, arrays)
+        header, opened_arrays = open_array_file(self.path, MAGIC)
+
+        self.assertEqual(header, {'name': 'test', 'time': 1.5})
+        self.assertEqual(list(opened_arrays), list(arrays))
+        for name, array in arrays.items():
+            with self.subTest(name=name):
+                np.testing.assert_array_equal(opened_arrays[name], array)
+                self.assertEqual(opened_arrays[name].shape, array.shape)
+                self.assertEqual(opened_arrays[name].dtype, array.dtype.newbyteorder('<'))
+
+    def test_arrays_are_aligned(self):
+        arrays = {f'array{i}': np.arange(i + 1, dtype=np.float64) for i in range(4)}
+        # header lengths on either side of an alignment boundary
+        for name_length in (1, 30, 60, 100):
+            write_array_file(self.path, MAGIC, {'name': 'x' * name_length}, arrays)
+            header, opened_arrays = open_array_file(self.path, MAGIC)
+            file_map = opened_arrays['array0'].base
+            while not isinstance(file_map, np.memmap):
+                file_map = file_map.base
+            for name, array in opened_arrays.items():
+                with self.subTest(name_length=name_length, name=name):
+                    offset = array.__array_interface__['data'][0] - file_map.__array_interface__['data'][0]
+                    self.assertEqual(offset % ARRAY_FILE_ALIGNMENT, 0)
+                    # memory mapped pages are aligned, so are the addresses
+                    self.assertEqual(array.__array_interface__['data'][0] % ARRAY_FILE_ALIGNMENT, 0)
+                    np.testing.assert_array_equal(array, arrays[name])
+
+    def test_read_only_and_copy_on_write(self):
+        write_array_file(self.path, MAGIC, {}, {'values': np.arange(4.0)})
+        header, arrays = open_array_file(self.path, MAGIC)
+        with self.assertRaises(ValueError):
+            arrays['values'][0] = 10.0
+
+        header, arrays = open_array_file(self.path, MAGIC, mode='c')
+        arrays['values'][0] = 10.0
+        header, arrays = open_array_file(self.path, MAGIC)
+        self.assertEqual(arrays['values'][0], 0.0)
+
+    def test_wrong_magic(self):
+        write_array_file(self.path, MAGIC, {}, {'values': np.arange(4.0)})
+        with self.assertRaises(ValueError):
+            open_array_file(self.path, b'GLOTHER1')
+        with self.assertRaises(ValueError):
+            write_array_file(self.path, b'SHORT', {}, {})
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.barnes_hut_model import BarnesHutModel
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+def random_objects(num_objects: int, dimension: int, seed: int = 0) -> list[PointParticle]:
+    # a cloud of objects with a few test particles, so the tree holds objects without mass too
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(scale=1e11, size=(num_objects, dimension))
+    velocities = rng.normal(scale=1e4, size=(num_objects, dimension))
+    masses = rng.uniform(1e22, 1e26, size=num_objects)
+    return [TestParticle(Vector(position.tolist()), Vector(velocity.tolist())) if i % 10 == 0 else
+        PointParticle(float(mass), Vector(position.tolist()), Vector(velocity.tolist()))
+        for i, (position, velocity, mass) in enumerate(zip(positions, velocities, masses))]
+
+class BarnesHutModelTest(unittest.TestCase):
+    def assert_direct_sum_accelerations(self, dimension: int, softening_length: float = 0.0):
+        direct_model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(dimension), random_objects(300, dimension),
+            softening_length=softening_length)
+        tree_model = BarnesHutModel(CartesianCoordinateSystem(dimension), random_objects(300, dimension), opening_angle=0.0,
+            leaf_size=4, softening_length=softening_length)
+        direct_model.sync_state()
+        tree_model.sync_state()
+
+        expected = direct_model.accelerations(direct_model.positions)
+        actual = tree_model.accelerations(tree_model.positions)
+        np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-12 * np.abs(expected).max())
+
+    def test_opening_angle_0_is_the_direct_sum_3d(self):
+        self.assert_direct_sum_accelerations(3)
+
+    def test_opening_angle_0_is_the_direct_sum_2d(self):
+        self.assert_direct_sum_accelerations(2)
+
+    def test_opening_angle_0_is_the_softened_direct_sum(self):
+        self.assert_direct_sum_accelerations(3, softening_length=1e10)
+
+    def test_coincident_objects_feel_no_force_from_each_other(self):
+        objects = [PointParticle(1e24, Vector([1.0, 2.0, 3.0]), Vector([0.0, 0.0, 0.0])) for _ in range(20)]
+        model = BarnesHutModel(CartesianCoordinateSystem(3), objects, opening_angle=0.0)
+        model.step(1.0)
+        np.testing.assert_array_equal(model.positions, np.tile([1.0, 2.0, 3.0], (20, 1)))
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.checkpoint import restore_checkpoint, state_arrays, write_checkpoint
+from gravity_lab.integrators import AdaptiveRungeKuttaIntegrator
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+def random_objects(num_objects: int, seed: int = 0) -> list[PointParticle]:
+    rng = np.random.default_rng(seed)
+    objects = [PointParticle(float(mass), Vector(position.tolist()), Vector(velocity.tolist())) for mass, position, velocity in
+        zip(rng.uniform(1e22, 1e26, num_objects), rng.normal(scale=1e11, size=(num_objects, 3)), rng.normal(scale=1e4, size=(num_objects, 3)))]
+    objects.append(TestParticle(Vector([1e11, 0.0, 0.0]), Vector([0.0, 3e4, 0.0]), 1000.0))
+    return objects
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'checkpoint')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_same_state(self, model, restored_model):
+        for array, restored_array in zip(state_arrays(model), state_arrays(restored_model)):
+            # bitwise, not approximately equal
+            self.assertEqual(array.tobytes(), restored_array.tobytes())
+        self.assertEqual(model.time, restored_model.time)
+        self.assertEqual([type(object) for object in model.objects], [type(object) for object in restored_model.objects])
+
+    def test_restored_vectorized_model_continues_bitwise(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), random_objects(50), AdaptiveRungeKuttaIntegrator())
+        for _ in range(3):
+            model.step(86400.0)
+        write_checkpoint(self.path, model)
+
+        restored_model = restore_checkpoint(self.path,
+            VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), [], AdaptiveRungeKuttaIntegrator()))
+        self.assert_same_state(model, restored_model)
+        self.assertEqual(model.integrator.substep, restored_model.integrator.substep)
+
+        # the sub-step size of the integrator is restored too, so the runs do not diverge
+        for _ in range(3):
+            model.step(86400.0)
+            restored_model.step(86400.0)
+        self.assert_same_state(model, restored_model)
+
+    def test_restored_object_model_is_bitwise_equal(self):
+        model = NewtonianMechanicsModel(CartesianCoordinateSystem(3), random_objects(10))
+        model.step(3600.0)
+        write_checkpoint(self.path, model)
+
+        restored_model = restore_checkpoint(self.path, NewtonianMechanicsModel(CartesianCoordinateSystem(3), []))
+        self.assert_same_state(model, restored_model)
+
+    def test_dimension_mismatch_is_rejected(self):
+        write_checkpoint(self.path, VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), random_objects(5)))
+        with self.assertRaises(ValueError):
+            restore_checkpoint(self.path, VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(2), []))
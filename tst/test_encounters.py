@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.encounters import EncounterDetector, merge_objects
+from gravity_lab.gravity_model import ModelRunner
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+def state(object: PointParticle) -> tuple[np.ndarray, np.ndarray]:
+    return np.array(object.coordinate.components), np.array(object.velocity.components)
+
+def total_mass_and_momentum(objects: list[PointParticle]) -> tuple[float, np.ndarray]:
+    massive_objects = [object for object in objects if not isinstance(object, TestParticle)]
+    return (sum(object.mass for object in massive_objects),
+        sum(object.mass * np.array(object.velocity.components) for object in massive_objects))
+
+class MergeTest(unittest.TestCase):
+    def test_merge_conserves_mass_momentum_and_center_of_mass(self):
+        first = PointParticle(1e24, Vector([1e7, 2e7, 0.0]), Vector([1e3, 0.0, -5e2]))
+        second = PointParticle(3e24, Vector([1.1e7, 2e7, 1e5]), Vector([-2e3, 4e3, 0.0]))
+        mass, momentum = total_mass_and_momentum([first, second])
+        center_of_mass = (first.mass * state(first)[0] + second.mass * state(second)[0]) / mass
+
+        merged, absorbed = merge_objects(first, state(first), second, state(second))
+        # the heavier object takes the merged state
+        self.assertIs(merged, second)
+        self.assertIs(absorbed, first)
+        self.assertEqual(merged.mass, mass)
+        np.testing.assert_allclose(merged.mass * state(merged)[1], momentum, rtol=1e-15)
+        np.testing.assert_allclose(state(merged)[0], center_of_mass, rtol=1e-15)
+
+    def test_test_particle_is_absorbed_without_changing_the_object(self):
+        planet = PointParticle(6e24, Vector([0.0, 0.0, 0.0]), Vector([0.0, 3e4, 0.0]))
+        test_particle = TestParticle(Vector([1e3, 0.0, 0.0]), Vector([-1e4, 0.0, 0.0]), 1e3)
+        merged, absorbed = merge_objects(test_particle, state(test_particle), planet, state(planet))
+        self.assertIs(merged, planet)
+        self.assertIs(absorbed, test_particle)
+        self.assertEqual(planet.mass, 6e24)
+        self.assertEqual(list(planet.velocity.components), [0.0, 3e4, 0.0])
+
+class EncounterDetectorTest(unittest.TestCase):
+    def colliding_objects(self) -> list[PointParticle]:
+        # two pairs on head-on collision courses and an object far away from both. The pairs close in by less than
+        # 3e7 m per step of 600 s, so they cannot pass through an encounter radius of 3e7 m between two checks
+        return [PointParticle(1e24, Vector([-1e8, 0.0, 0.0]), Vector([1e4, 1e3, 0.0])),
+            PointParticle(2e24, Vector([1e8, 0.0, 0.0]), Vector([-1e4, 0.0, 0.0])),
+            PointParticle(5e23, Vector([0.0, 1e11, -1e8]), Vector([0.0, 0.0, 2e4])),
+            PointParticle(5e23, Vector([0.0, 1e11, 1e8]), Vector([0.0, 0.0, -2e4])),
+            PointParticle(1e26, Vector([1e12, 0.0, 0.0]), Vector([0.0, 0.0, 0.0]))]
+
+    def test_merges_conserve_mass_and_momentum(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), self.colliding_objects())
+        mass, momentum = total_mass_and_momentum(model.objects)
+        events = []
+        detector = EncounterDetector(3e7, action='merge', on_event=events.append)
+        ModelRunner(model, encounter_detector=detector).run(20, 600.0)
+
+        self.assertEqual(len(model.objects), 3)
+        self.assertEqual([event.kind for event in events], ['merge', 'merge'])
+        self.assertEqual(sorted(object.mass for object in model.objects), [1e24, 3e24, 1e26])
+        merged_mass, merged_momentum = total_mass_and_momentum(model.objects)
+        self.assertEqual(merged_mass, mass)
+        np.testing.assert_allclose(merged_momentum, momentum, rtol=0.0, atol=1e-9 * np.abs(momentum).max())
+        # the model state follows the merged objects
+        np.testing.assert_array_equal(model.masses, [object.mass for object in model.objects])
+
+    def test_flagged_encounters_are_substepped(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), self.colliding_objects())
+        events = []
+        detector = EncounterDetector(3e7, action='flag', substeps=8, on_event=events.append)
+        self.assertEqual(detector.update(model), 1)
+        ModelRunner(model, encounter_detector=detector).run(20, 600.0)
+        self.assertEqual(len(model.objects), 5)
+        # every pair is reported once when it comes within the radius
+        self.assertEqual([event.kind for event in events], ['encounter', 'encounter'])
+
+    def test_test_particles_are_not_merged_with_each_other(self):
+        # test particles crossing each other, and a test particle hitting a planet
+        objects = [TestParticle(Vector([-1e8, 0.0, 0.0]), Vector([1e4, 0.0, 0.0])),
+            TestParticle(Vector([1e8, 0.0, 0.0]), Vector([-1e4, 0.0, 0.0]), 1e3),
+            PointParticle(6e24, Vector([0.0, 1e11, -1e8]), Vector([0.0, 0.0, 2e4])),
+            TestParticle(Vector([0.0, 1e11, 1e8]), Vector([0.0, 0.0, -2e4]))]
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), objects)
+        events = []
+        detector = EncounterDetector(3e7, action='merge', substeps=4, on_event=events.append)
+        ModelRunner(model, encounter_detector=detector).run(20, 600.0)
+
+        self.assertEqual(model.objects, objects[:3])
+        self.assertEqual(sorted(event.kind for event in events), ['encounter', 'merge'])
+        encounter, = [event for event in events if event.kind == 'encounter']
+        self.assertEqual(set(encounter.objects), set(objects[:2]))
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.ensemble_newtonian_mechanics_model import EnsembleNewtonianMechanicsModel
+from gravity_lab.integrators import LeapfrogIntegrator, YoshidaIntegrator
+from gravity_lab.math import Vector
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+NUM_MEMBERS = 4
+
+def member_objects(seed: int) -> list[PointParticle]:
+    # the same system with perturbed masses, positions and velocities per seed
+    rng = np.random.default_rng(seed)
+    objects = [PointParticle(float(mass), Vector(position.tolist()), Vector(velocity.tolist())) for mass, position, velocity in
+        zip(rng.uniform(1e29, 1e30, 4), rng.normal(scale=1e11, size=(4, 3)), rng.normal(scale=1e4, size=(4, 3)))]
+    objects.append(TestParticle(Vector(rng.normal(scale=1e11, size=3).tolist()), Vector([0.0, 1e4, 0.0])))
+    return objects
+
+class EnsembleModelTest(unittest.TestCase):
+    def assert_same_as_separate_runs(self, integrator_type: type):
+        ensemble = EnsembleNewtonianMechanicsModel(CartesianCoordinateSystem(3), [member_objects(seed) for seed in range(NUM_MEMBERS)],
+            integrator_type())
+        separate_models = [VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), member_objects(seed), integrator_type())
+            for seed in range(NUM_MEMBERS)]
+        for _ in range(50):
+            ensemble.step(3600.0)
+            for model in separate_models:
+                model.step(3600.0)
+
+        for member_index, model in enumerate(separate_models):
+            with self.subTest(integrator=integrator_type.__name__, member=member_index):
+                # the members only differ from separate runs by the order of the summation
+                np.testing.assert_allclose(ensemble.positions[member_index], model.positions, rtol=1e-12)
+                np.testing.assert_allclose(ensemble.velocities[member_index], model.velocities, rtol=1e-12)
+                member_model = ensemble.member_model(member_index)
+                self.assertEqual(member_model.time, model.time)
+                np.testing.assert_array_equal([object.coordinate.components for object in member_model.objects], ensemble.positions[member_index])
+
+    def test_leapfrog_members_equal_separate_runs(self):
+        self.assert_same_as_separate_runs(LeapfrogIntegrator)
+
+    def test_yoshida_members_equal_separate_runs(self):
+        self.assert_same_as_separate_runs(YoshidaIntegrator)
+
+    def test_members_must_have_the_same_objects(self):
+        ensemble = EnsembleNewtonianMechanicsModel(CartesianCoordinateSystem(3), [member_objects(0)])
+        with self.assertRaises(ValueError):
+            ensemble.add_member(member_objects(1)[:-1])
+        swapped = member_objects(1)
+        swapped[0], swapped[-1] = swapped[-1], swapped[0]
+        with self.assertRaises(ValueError):
+            ensemble.add_member(swapped)
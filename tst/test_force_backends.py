@@ -0,0 +1,59 @@
+from multiprocessing import shared_memory
+import unittest
+
+import numpy as np
+
+from gravity_lab import force_backends
+from gravity_lab.force_backends import NumbaForceBackend, NumpyForceBackend, ProcessPoolForceBackend, tiled_pairwise_accelerations
+
+def random_system(num_objects: int, dimension: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return rng.normal(scale=1e11, size=(num_objects, dimension)), rng.uniform(1e20, 1e24, num_objects)
+
+class ForceBackendTest(unittest.TestCase):
+    # every backend calculates the same accelerations as NumpyForceBackend, up to rounding
+    def assert_same_accelerations(self, backend):
+        for dimension in (2, 3):
+            for softening_length in (0.0, 1e10):
+                with self.subTest(backend=type(backend).__name__, dimension=dimension, softening_length=softening_length):
+                    positions, masses = random_system(300, dimension)
+                    # fewer targets than sources, and a target at the position of a source
+                    target_positions = np.concatenate([positions[:40], positions[:1] + 1e9])
+                    expected = NumpyForceBackend().accelerations(target_positions, positions, masses, softening_length)
+                    actual = backend.accelerations(target_positions, positions, masses, softening_length)
+                    np.testing.assert_allclose(actual, expected, rtol=1e-12, atol=1e-12 * np.abs(expected).max())
+
+    def test_tiled_numpy(self):
+        positions, masses = random_system(300, 3)
+        np.testing.assert_allclose(tiled_pairwise_accelerations(positions, positions, masses, 64),
+            NumpyForceBackend().accelerations(positions, positions, masses), rtol=1e-12)
+
+    def test_numba_backend(self):
+        # without numba this is the tiled numpy fallback
+        self.assert_same_accelerations(NumbaForceBackend(tile_size=64))
+
+    @unittest.skipIf(force_backends.numba is None, "numba is not installed")
+    def test_compiled_numba_kernel(self):
+        self.assertIsNotNone(force_backends._numba_pairwise_accelerations)
+        self.assert_same_accelerations(NumbaForceBackend(tile_size=64))
+
+    def test_process_pool_backend(self):
+        with ProcessPoolForceBackend(num_workers=2, tile_size=64) as backend:
+            self.assert_same_accelerations(backend)
+
+    def test_process_pool_backend_close_releases_shared_memory(self):
+        backend = ProcessPoolForceBackend(num_workers=2)
+        positions, masses = random_system(100, 3)
+        backend.accelerations(positions, positions, masses)
+        names = [shared_array.name for shared_array in backend._shared_arrays.values()]
+        self.assertGreater(len(names), 0)
+
+        backend.close()
+        self.assertIsNone(backend._pool)
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+        # a closed backend starts again on the next call
+        np.testing.assert_allclose(backend.accelerations(positions, positions, masses),
+            NumpyForceBackend().accelerations(positions, positions, masses), rtol=1e-12)
+        backend.close()
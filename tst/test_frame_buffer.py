@@ -0,0 +1,91 @@
+from time import monotonic, sleep
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.simulation_process import FRAME_NUMBER, FRAME_SEQUENCE, FrameBuffer, SimulationProcess
+
+class FrameBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.frame_buffer = FrameBuffer(4, 3)
+        self.reader = FrameBuffer(4, 3, self.frame_buffer.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.frame_buffer.close(unlink=True)
+
+    def write_frame(self, time: float):
+        self.frame_buffer.write(time, np.full((2, 3), time), np.full((2, 3), -time))
+
+    def test_no_frame_before_the_first_write(self):
+        self.assertIsNone(self.reader.read())
+
+    def test_latest_frame(self):
+        for time in (1.0, 2.0, 3.0):
+            self.write_frame(time)
+        frame = self.reader.read()
+        self.assertEqual((frame.number, frame.time), (3, 3.0))
+        np.testing.assert_array_equal(frame.positions, np.full((2, 3), 3.0))
+        np.testing.assert_array_equal(frame.velocities, np.full((2, 3), -3.0))
+
+    def test_frame_before_a_write_in_progress(self):
+        self.write_frame(1.0)
+        self.write_frame(2.0)
+        # the writer has started frame 3 in the slot of frame 1
+        header = self.frame_buffer._headers[1]
+        header[FRAME_SEQUENCE] += 1
+        header[FRAME_NUMBER] = 3
+        frame = self.reader.read(max_attempts=1)
+        self.assertEqual((frame.number, frame.time), (2, 2.0))
+
+    def test_no_frame_while_the_first_is_written(self):
+        self.frame_buffer._headers[1, FRAME_SEQUENCE] += 1
+        self.frame_buffer._headers[1, FRAME_NUMBER] = 1
+        self.assertIsNone(self.reader.read(max_attempts=1))
+
+class FailingModel(NewtonianMechanicsModel):
+    # fails after a few steps, in the process of the simulation
+    def step(self, delta: float):
+        super().step(delta)
+        if self.time > 10.0 * delta:
+            raise ValueError("the model failed")
+
+def wait_until(condition, timeout: float = 30.0) -> bool:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.01)
+    return True
+
+class SimulationProcessTest(unittest.TestCase):
+    def objects(self) -> list[PointParticle]:
+        return [PointParticle(1e24, Vector([0.0, 0.0]), Vector([0.0, 0.0])), PointParticle(1e20, Vector([1e9, 0.0]), Vector([0.0, 1e3]))]
+
+    def test_running_simulation_has_no_error(self):
+        simulation = SimulationProcess(NewtonianMechanicsModel(CartesianCoordinateSystem(2), self.objects()), 1.0, speed_up=None)
+        simulation.start()
+        try:
+            self.assertTrue(wait_until(lambda: simulation.latest_frame() is not None))
+            self.assertTrue(simulation.is_alive())
+            self.assertIsNone(simulation.exitcode())
+            self.assertIsNone(simulation.error())
+        finally:
+            simulation.stop()
+        self.assertIsNone(simulation.error())
+
+    def test_error_of_a_failed_simulation(self):
+        simulation = SimulationProcess(FailingModel(CartesianCoordinateSystem(2), self.objects()), 1.0, speed_up=None)
+        simulation.start()
+        try:
+            self.assertTrue(wait_until(lambda: not simulation.is_alive()))
+            self.assertNotEqual(simulation.exitcode(), 0)
+            error = simulation.error()
+            self.assertIn("Traceback", error)
+            self.assertIn("ValueError: the model failed", error)
+        finally:
+            simulation.stop()
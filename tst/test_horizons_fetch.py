@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+import tempfile
+import threading
+import unittest
+from time import monotonic
+
+import numpy as np
+
+import gravity_lab.data
+from gravity_lab.data import JPL_HORIZONS_DATETIME_FORMAT, TokenBucket, TrajectoryData, jpl_horizons_fetch_bodies
+from horizons_stub import StubHorizonsHandler, start_stub_server, stop_stub_server
+
+START = datetime(2023, 3, 1)
+STEP = timedelta(hours=1)
+
+def requested_starts(requests: list[dict]) -> list[datetime]:
+    # sorted START_TIME of the VECTORS requests
+    return sorted(datetime.strptime(request['START_TIME'].strip("'"), JPL_HORIZONS_DATETIME_FORMAT) for request in requests
+        if 'START_TIME' in request)
+
+class HorizonsFetchTest(unittest.TestCase):
+    # the requests of gravity_lab.data go to a local stub server, with a small latency so requests overlap
+    def setUp(self):
+        StubHorizonsHandler.reset(response_delay=0.02)
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.server = start_stub_server(self.cache_directory.name)
+        self.max_epochs_per_request = gravity_lab.data.JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST
+        gravity_lab.data.JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST = 5
+        # the rate limit of the real server would make the tests wait
+        self.rate_limiter = gravity_lab.data.jpl_horizons_rate_limiter
+        gravity_lab.data.jpl_horizons_rate_limiter = TokenBucket(rate=1000.0, capacity=1000.0)
+
+    def tearDown(self):
+        gravity_lab.data.jpl_horizons_rate_limiter = self.rate_limiter
+        gravity_lab.data.JPL_HORIZONS_MAX_EPOCHS_PER_REQUEST = self.max_epochs_per_request
+        stop_stub_server(self.server)
+        self.cache_directory.cleanup()
+
+    def assert_uniform_grid(self, trajectory, start: datetime, num_epochs: int):
+        self.assertEqual(len(trajectory), num_epochs)
+        self.assertEqual(trajectory.datetime(0), start)
+        np.testing.assert_allclose(np.diff(trajectory.times), STEP.total_seconds(), rtol=0.0, atol=1e-3)
+
+    def test_chunked_fetch_is_a_uniform_grid(self):
+        bodies = jpl_horizons_fetch_bodies(['Earth', 'Mars'], start=START, stop=START + 22 * STEP, step=STEP)
+        for mass_kg, trajectory in bodies.values():
+            self.assert_uniform_grid(trajectory, START, 23)
+        # one major body listing and 5 chunks of at most 5 epochs per body, sent concurrently
+        self.assertEqual(len(StubHorizonsHandler.requests), 1 + 2 * 5)
+        self.assertEqual(requested_starts(StubHorizonsHandler.requests), sorted([START + i * 5 * STEP for i in range(5)] * 2))
+        self.assertGreater(StubHorizonsHandler.max_active_requests, 1)
+        self.assertLessEqual(StubHorizonsHandler.max_active_requests, gravity_lab.data.JPL_HORIZONS_MAX_WORKERS)
+        self.assertAlmostEqual(bodies['Earth'][0], 5.97219e24)
+
+    def test_extend_only_requests_the_edges(self):
+        trajectory_data = TrajectoryData.load_solar_system_from_jpl_horizons_system(START, START + 4 * STEP, STEP)
+        earth = trajectory_data.object_trajectories['Earth'][1]
+        stored_times = earth.times.copy()
+        StubHorizonsHandler.reset(response_delay=0.02)
+
+        # neither end is on the grid of the stored epochs, the extension is rounded out to it
+        trajectory_data.extend_from_jpl_horizons_system(START - 2 * STEP - timedelta(minutes=20), START + 6 * STEP + timedelta(minutes=20))
+        extended_earth = trajectory_data.object_trajectories['Earth'][1]
+        self.assert_uniform_grid(extended_earth, START - 3 * STEP, 5 + 3 + 3)
+        np.testing.assert_array_equal(extended_earth.times[3:8], stored_times)
+        # one request per body before and after the stored epochs, nothing in between
+        starts = requested_starts(StubHorizonsHandler.requests)
+        body_count = len(trajectory_data.object_trajectories)
+        self.assertEqual(starts, [START - 3 * STEP] * body_count + [START + 5 * STEP] * body_count)
+
+    def test_extend_within_a_step_of_the_last_epoch(self):
+        trajectory_data = TrajectoryData.load_solar_system_from_jpl_horizons_system(START, START + 4 * STEP, STEP)
+        trajectory_data.extend_from_jpl_horizons_system(START, START + 4 * STEP + timedelta(minutes=10))
+        self.assert_uniform_grid(trajectory_data.object_trajectories['Earth'][1], START, 6)
+
+    def test_warm_cache_sends_no_requests(self):
+        TrajectoryData.load_solar_system_from_jpl_horizons_system(START, START + 4 * STEP, STEP)
+        self.assertGreater(len(StubHorizonsHandler.requests), 0)
+        StubHorizonsHandler.reset(response_delay=0.02)
+
+        trajectory_data = TrajectoryData.load_solar_system_from_jpl_horizons_system(START, START + 4 * STEP, STEP)
+        self.assertEqual(StubHorizonsHandler.requests, [])
+        self.assert_uniform_grid(trajectory_data.object_trajectories['Earth'][1], START, 5)
+
+    def test_error_responses_are_not_cached(self):
+        StubHorizonsHandler.error_body_ids = {499}
+        with self.assertRaisesRegex(RuntimeError, 'No ephemeris for target "Mars"'):
+            jpl_horizons_fetch_bodies(['Earth', 'Mars'], start=START, stop=START + 4 * STEP, step=STEP)
+        StubHorizonsHandler.reset(response_delay=0.02)
+
+        # only the error is requested again, the listing and the ephemeris of the earth are cached
+        bodies = jpl_horizons_fetch_bodies(['Earth', 'Mars'], start=START, stop=START + 4 * STEP, step=STEP)
+        self.assertEqual([request['COMMAND'] for request in StubHorizonsHandler.requests], ['499'])
+        self.assert_uniform_grid(bodies['Mars'][1], START, 5)
+
+class TokenBucketTest(unittest.TestCase):
+    def test_bursts_are_capped_at_the_capacity(self):
+        # capacity requests go at once, the others one every 1 / rate seconds
+        rate, capacity, num_requests = 10.0, 3, 6
+        bucket = TokenBucket(rate, capacity)
+        start = monotonic()
+        acquire_times = []
+        lock = threading.Lock()
+
+        def acquire():
+            bucket.acquire()
+            with lock:
+                acquire_times.append(monotonic() - start)
+
+        threads = [threading.Thread(target=acquire) for _ in range(num_requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        acquire_times.sort()
+        self.assertLess(acquire_times[capacity - 1], 0.5 / rate)
+        for i in range(capacity, num_requests):
+            self.assertGreaterEqual(acquire_times[i], (i - capacity + 1) / rate - 1e-3)
@@ -0,0 +1,84 @@
+import io
+import unittest
+
+import numpy as np
+
+from gravity_lab.data import parse_jpl_horizons_body_lines, parse_jpl_horizons_vector_table
+
+# two records of a VECTORS response with negative coordinates, with and without a space after the = signs
+TEXT_VECTOR_TABLE = """\
+*******************************************************************************
+Ephemeris / API_USER Mon Jan  1 00:00:00 2024 Pasadena, USA      / Horizons
+*******************************************************************************
+            JDTDB
+   X     Y     Z
+   VX    VY    VZ
+   LT    RG    RR
+*******************************************************************************
+$$SOE
+2460310.500000000 = A.D. 2024-Jan-01 00:00:00.0000 TDB
+ X =-2.656758880135733E+07 Y = 1.448364640119829E+08 Z =-3.035478133681417E+03
+ VX=-2.980049637706207E+01 VY=-5.525553233396573E+00 VZ= 1.318934839017468E-03
+ LT= 4.911920869613932E+02 RG= 1.472558020716131E+08 RR=-1.658006717009813E-02
+2460311.500000000 = A.D. 2024-Jan-02 00:00:00.0000 TDB
+ X =-2.913779102716474E+07 Y = 1.443401393466371E+08 Z =-2.917640009397268E+03
+ VX=-2.968693012211124E+01 VY=-5.962843062036016E+00 VZ= 1.408102578361133E-03
+ LT= 4.911861089633120E+02 RG= 1.472540099164379E+08 RR=-2.490183022473131E-02
+$$EOE
+*******************************************************************************
+ Reference frame : ICRF
+"""
+
+CSV_VECTOR_TABLE = """\
+            JDTDB,            Calendar Date (TDB),                      X,                      Y,                      Z,                     VX,                     VY,                     VZ,
+$$SOE
+2460310.500000000, A.D. 2024-Jan-01 00:00:00.0000, -2.656758880135733E+07,  1.448364640119829E+08, -3.035478133681417E+03, -2.980049637706207E+01, -5.525553233396573E+00,  1.318934839017468E-03,
+2460311.500000000, A.D. 2024-Jan-02 00:00:00.0000, -2.913779102716474E+07,  1.443401393466371E+08, -2.917640009397268E+03, -2.968693012211124E+01, -5.962843062036016E+00,  1.408102578361133E-03,
+$$EOE
+"""
+
+# in m and m/s
+EXPECTED_COLUMNS = {
+    'epoch': [2460310.5, 2460311.5],
+    'x': [-2.656758880135733E+10, -2.913779102716474E+10],
+    'y': [1.448364640119829E+11, 1.443401393466371E+11],
+    'z': [-3.035478133681417E+06, -2.917640009397268E+06],
+    'vx': [-2.980049637706207E+04, -2.968693012211124E+04],
+    'vy': [-5.525553233396573E+03, -5.962843062036016E+03],
+    'vz': [1.318934839017468E+00, 1.408102578361133E+00]
+}
+
+class HorizonsVectorTableParserTest(unittest.TestCase):
+    def assert_expected_columns(self, columns: dict[str, np.ndarray]):
+        self.assertEqual(set(columns), set(EXPECTED_COLUMNS))
+        for column, expected in EXPECTED_COLUMNS.items():
+            np.testing.assert_allclose(columns[column], expected, rtol=1e-15, err_msg=column)
+
+    def test_signed_text_table(self):
+        self.assert_expected_columns(parse_jpl_horizons_vector_table(io.StringIO(TEXT_VECTOR_TABLE)))
+
+    def test_signed_csv_table(self):
+        self.assert_expected_columns(parse_jpl_horizons_vector_table(io.StringIO(CSV_VECTOR_TABLE)))
+
+    def test_lines_are_streamed(self):
+        # any iterable of lines is parsed, e.g. a generator that is only read once
+        lines = (line for line in TEXT_VECTOR_TABLE.splitlines(keepends=True))
+        self.assert_expected_columns(parse_jpl_horizons_vector_table(lines))
+
+    def test_empty_table(self):
+        columns = parse_jpl_horizons_vector_table(io.StringIO("$$SOE\n$$EOE\n"))
+        self.assertTrue(all(len(values) == 0 for values in columns.values()))
+
+    def test_incomplete_record_is_rejected(self):
+        truncated_table = TEXT_VECTOR_TABLE.replace(" VX=-2.968693012211124E+01 VY=-5.962843062036016E+00 VZ= 1.408102578361133E-03\n", "")
+        with self.assertRaises(RuntimeError):
+            parse_jpl_horizons_vector_table(io.StringIO(truncated_table))
+
+    def test_body_lines_are_read_to_the_end(self):
+        # the mass is in the lines before the ephemeris, the lines after it are read so a streamed response gets cached
+        response = " Mass x10^24 (kg)= 5.97219\n" + TEXT_VECTOR_TABLE + "Coordinate system description:\n"
+        lines = iter(response.splitlines(keepends=True))
+        mass_kg, trajectory = parse_jpl_horizons_body_lines(lines)
+        self.assertAlmostEqual(mass_kg, 5.97219e24)
+        self.assertEqual(len(trajectory), 2)
+        self.assertEqual(list(lines), [])
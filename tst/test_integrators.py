@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import AdaptiveRungeKuttaIntegrator, LeapfrogIntegrator, YoshidaIntegrator
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+CENTRAL_MASS = 2e30
+ORBIT_RADIUS = 1.5e11
+ANGULAR_VELOCITY = np.sqrt(gravitational_constant * CENTRAL_MASS / ORBIT_RADIUS ** 3)
+PERIOD = 2.0 * np.pi / ANGULAR_VELOCITY
+
+def circular_orbit_error(integrator, delta: float, num_steps: int) -> float:
+    # distance of a test particle on a circular orbit from its exact position after num_steps steps. The central
+    # object does not feel the test particle, so it stays at the origin
+    speed = ORBIT_RADIUS * ANGULAR_VELOCITY
+    objects = [PointParticle(CENTRAL_MASS, Vector([0.0, 0.0]), Vector([0.0, 0.0])),
+        TestParticle(Vector([ORBIT_RADIUS, 0.0]), Vector([0.0, speed]))]
+    model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(2), objects, integrator)
+    for _ in range(num_steps):
+        model.step(delta)
+    angle = ANGULAR_VELOCITY * delta * num_steps
+    return float(np.linalg.norm(model.positions[1] - ORBIT_RADIUS * np.array([np.cos(angle), np.sin(angle)])))
+
+# with an error tolerance this large every step is a single Runge-Kutta step
+def fixed_step_dormand_prince() -> AdaptiveRungeKuttaIntegrator:
+    return AdaptiveRungeKuttaIntegrator(rtol=1e6)
+
+class IntegratorConvergenceTest(unittest.TestCase):
+    def assert_step_error_order(self, new_integrator, order: int):
+        # the error of one step of a method of order p is O(delta^(p + 1)), so halving the step divides it by 2^(p + 1)
+        errors = [circular_orbit_error(new_integrator(), PERIOD / steps, 1) for steps in (64, 128)]
+        self.assertAlmostEqual(np.log2(errors[0] / errors[1]), order + 1, delta=0.1)
+
+    def assert_period_error_order(self, new_integrator, order: int):
+        # over a fixed time the errors of the steps add up to O(delta^p)
+        errors = [circular_orbit_error(new_integrator(), PERIOD / steps, steps) for steps in (64, 128)]
+        self.assertAlmostEqual(np.log2(errors[0] / errors[1]), order, delta=0.1)
+
+    def test_leapfrog_is_second_order(self):
+        self.assert_step_error_order(LeapfrogIntegrator, 2)
+        self.assert_period_error_order(LeapfrogIntegrator, 2)
+
+    def test_yoshida_is_fourth_order(self):
+        self.assert_step_error_order(YoshidaIntegrator, 4)
+        self.assert_period_error_order(YoshidaIntegrator, 4)
+
+    def test_dormand_prince_is_fifth_order(self):
+        # over a period of a circular orbit the leading errors of the steps partly cancel, only the step error is checked
+        self.assert_step_error_order(fixed_step_dormand_prince, 5)
+
+    def test_adaptive_runge_kutta_meets_its_tolerance(self):
+        error = circular_orbit_error(AdaptiveRungeKuttaIntegrator(rtol=1e-10), PERIOD / 8, 8)
+        self.assertLess(error, 1e-6 * ORBIT_RADIUS)
+
@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.barnes_hut_model import BarnesHutModel
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.integrators import AdaptiveRungeKuttaIntegrator, LeapfrogIntegrator, YoshidaIntegrator
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel, gravitational_constant
+from gravity_lab.point_particle import KinematicParticle, PointParticle, TestParticle
+from gravity_lab.trajectory_store import Trajectory
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+SUN_MASS = 2e30
+ORBIT_RADIUS = 1.5e11
+DAY = 86400.0
+
+def circle_trajectory(radius: float, angular_velocity: float, num_days: int) -> Trajectory:
+    # a circle in the xy plane sampled every 6 hours, from J2000 + 100 days
+    times = 100.0 * DAY + np.arange(4 * num_days + 1) * DAY / 4.0
+    angles = angular_velocity * times
+    return Trajectory({'time': times, 'x': radius * np.cos(angles), 'y': radius * np.sin(angles), 'z': np.zeros_like(times),
+        'vx': -radius * angular_velocity * np.sin(angles), 'vy': radius * angular_velocity * np.cos(angles),
+        'vz': np.zeros_like(times)}, is_sorted=True)
+
+def planet_and_test_particle() -> list[PointParticle]:
+    speed = np.sqrt(gravitational_constant * SUN_MASS / ORBIT_RADIUS)
+    return [PointParticle(6e24, Vector([0.0, ORBIT_RADIUS, 0.0]), Vector([-speed, 0.0, 0.0])),
+        TestParticle(Vector([-ORBIT_RADIUS, 0.0, 0.0]), Vector([0.0, -speed, 0.0]))]
+
+class KinematicParticleTest(unittest.TestCase):
+    def assert_follows_trajectory(self, model, kinematic: KinematicParticle, num_steps: int, delta: float):
+        for _ in range(num_steps):
+            model.step(delta)
+            coordinate, velocity = kinematic.trajectory.state_at(kinematic.epoch + model.time)
+            self.assertEqual(kinematic.coordinate.components, coordinate.components)
+            self.assertEqual(kinematic.velocity.components, velocity.components)
+
+    def test_follows_its_trajectory_in_every_model(self):
+        trajectory = circle_trajectory(1e9, 2e-6, 10)
+        models = {
+            'loop': lambda objects: NewtonianMechanicsModel(CartesianCoordinateSystem(3), objects),
+            'leapfrog': lambda objects: VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), objects, LeapfrogIntegrator()),
+            'yoshida': lambda objects: VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), objects, YoshidaIntegrator()),
+            'runge-kutta': lambda objects: VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), objects,
+                AdaptiveRungeKuttaIntegrator(rtol=1e-6)),
+            'barnes-hut': lambda objects: BarnesHutModel(CartesianCoordinateSystem(3), objects),
+        }
+        for name, make_model in models.items():
+            for epoch in (None, 103.3 * DAY):
+                with self.subTest(model=name, epoch=epoch):
+                    kinematic = KinematicParticle(SUN_MASS, trajectory, epoch)
+                    # a step size that is not a divisor of the sampling interval
+                    self.assert_follows_trajectory(make_model([kinematic] + planet_and_test_particle()), kinematic, 20, 7000.0)
+
+    def test_forces_of_a_resting_kinematic_particle(self):
+        # a sun resting on its trajectory pulls the other objects exactly like an integrated sun, which does not move
+        # either as the other objects are test particles
+        resting = Trajectory({'time': np.array([0.0, 30.0 * DAY]), **{column: np.zeros(2) for column in ['x', 'y', 'z', 'vx', 'vy', 'vz']}},
+            is_sorted=True)
+        test_particles = lambda: [TestParticle(object.coordinate, object.velocity) for object in planet_and_test_particle()]
+        kinematic_model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), [KinematicParticle(SUN_MASS, resting)] + test_particles())
+        dynamic_model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3),
+            [PointParticle(SUN_MASS, Vector([0.0, 0.0, 0.0]), Vector([0.0, 0.0, 0.0]))] + test_particles())
+        for _ in range(100):
+            kinematic_model.step(DAY / 4.0)
+            dynamic_model.step(DAY / 4.0)
+        np.testing.assert_array_equal(kinematic_model.positions, dynamic_model.positions)
+        np.testing.assert_array_equal(kinematic_model.velocities, dynamic_model.velocities)
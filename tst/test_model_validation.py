@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.data import TrajectoryData
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.trajectory_store import Trajectory
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+SUN_MASS = 2e30
+EARTH_MASS = 6e24
+ORBIT_RADIUS = 1.5e11
+
+def circular_orbit_data(num_days: int) -> TrajectoryData:
+    # a sun and an earth on circular orbits around their center of mass, sampled daily
+    times = np.arange(num_days + 1) * 86400.0
+    angular_velocity = np.sqrt(gravitational_constant * (SUN_MASS + EARTH_MASS) / ORBIT_RADIUS ** 3)
+    angles = angular_velocity * times
+    object_trajectories = {}
+    for name, mass, radius in (('Sun', SUN_MASS, -ORBIT_RADIUS * EARTH_MASS / (SUN_MASS + EARTH_MASS)),
+            ('Earth', EARTH_MASS, ORBIT_RADIUS * SUN_MASS / (SUN_MASS + EARTH_MASS))):
+        columns = {'time': times, 'x': radius * np.cos(angles), 'y': radius * np.sin(angles), 'z': np.zeros_like(times),
+            'vx': -radius * angular_velocity * np.sin(angles), 'vy': radius * angular_velocity * np.cos(angles), 'vz': np.zeros_like(times)}
+        object_trajectories[name] = ({'mass_kg': mass}, Trajectory(columns, is_sorted=True))
+    return TrajectoryData('circular orbit', object_trajectories)
+
+class ValidationSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'orbit.gltraj')
+        circular_orbit_data(30).save(self.path)
+        # the workers of the sweep memory map the file instead of receiving the trajectories
+        self.data = TrajectoryData.open(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_sweep_matches_validation_in_this_process(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3))
+        delta_steps = [86400.0, 21600.0]
+        results = self.data.validation_sweep(model, delta_steps, max_workers=2)
+
+        self.assertEqual([result.delta_step for result in results], delta_steps)
+        for result, delta_step in zip(results, delta_steps):
+            expected = self.data.validate_model(model, delta_step)
+            self.assertEqual(result.object_names, ['Sun', 'Earth'])
+            self.assertEqual(result.num_steps, 30 * 86400.0 / delta_step)
+            np.testing.assert_array_equal(result.times, expected.times)
+            np.testing.assert_array_equal(result.coordinate_errors, expected.coordinate_errors)
+            np.testing.assert_array_equal(result.velocity_errors, expected.velocity_errors)
+        # leapfrog errors shrink with the square of the step
+        final_errors = [result.coordinate_errors[-1, 1] for result in results]
+        self.assertGreater(final_errors[0] / final_errors[1], 10.0)
+
+    def test_sweep_leaves_the_model_unchanged(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3))
+        self.data.validation_sweep(model, [86400.0, 43200.0], max_workers=2)
+        self.assertEqual(model.objects, [])
+        self.assertEqual(model.time, 0.0)
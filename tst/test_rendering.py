@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.ui.rendering import pixel_level_of_detail, polyline_pieces, visible_runs
+
+def spiral(num_points: int) -> np.ndarray:
+    # screen coordinates of a spiral around the center of a 400 x 300 view, dense near the center
+    angles = np.linspace(0.0, 20.0 * np.pi, num_points)
+    radii = np.linspace(0.0, 140.0, num_points)
+    return np.stack([200.0 + radii * np.cos(angles), 150.0 + radii * np.sin(angles)], axis=1)
+
+class PixelLevelOfDetailTest(unittest.TestCase):
+    def test_keeps_the_endpoints(self):
+        screen = spiral(20000)
+        for start, stop in [(0, len(screen)), (10, 11), (10, 500), (len(screen) - 3, len(screen))]:
+            with self.subTest(start=start, stop=stop):
+                indices = pixel_level_of_detail(screen, start, stop)
+                self.assertEqual(indices[0], start)
+                self.assertEqual(indices[-1], stop - 1)
+                self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_dropped_points_are_within_a_pixel(self):
+        screen = spiral(20000)
+        indices = pixel_level_of_detail(screen, 0, len(screen))
+        # the dense spiral is reduced to about one point per pixel of its length
+        length = np.sum(np.linalg.norm(np.diff(screen, axis=0), axis=1))
+        self.assertLess(len(indices), 2.0 * length)
+        self.assertLess(len(indices), len(screen) / 2)
+
+        # every dropped point is in the pixel of the last kept point before it, so the line moves by less than the
+        # diagonal of a pixel
+        previous_kept = indices[np.searchsorted(indices, np.arange(len(screen)), side='right') - 1]
+        distances = np.linalg.norm(screen - screen[previous_kept], axis=1)
+        self.assertLess(distances.max(), np.sqrt(2.0))
+        np.testing.assert_array_equal(np.floor(screen[previous_kept]), np.floor(screen))
+
+    def test_sparse_points_are_all_kept(self):
+        screen = spiral(100)
+        np.testing.assert_array_equal(pixel_level_of_detail(screen, 0, len(screen)), np.arange(len(screen)))
+
+class PolylinePiecesTest(unittest.TestCase):
+    def test_pieces_of_a_line_leaving_the_view(self):
+        # a line in view, out of view to the right and back in view
+        x = np.concatenate([np.linspace(10.0, 390.0, 50), np.linspace(1000.0, 2000.0, 50), np.linspace(390.0, 10.0, 50)])
+        screen = np.stack([x, np.full(len(x), 100.0)], axis=1)
+        runs = visible_runs(screen, 400.0, 300.0)
+        # the segments leaving and entering the view are kept, they cross its edge
+        self.assertEqual(runs, [(0, 51), (99, 150)])
+
+        pieces = polyline_pieces(screen, 400.0, 300.0)
+        self.assertEqual([band for band, _ in pieces], [0, 0])
+        self.assertEqual(pieces[0][1][:2], screen[0].tolist())
+        self.assertEqual(pieces[0][1][-2:], screen[50].tolist())
+        self.assertEqual(pieces[1][1][-2:], screen[-1].tolist())
+
+    def test_bands_share_their_boundary_points(self):
+        screen = spiral(1000)
+        pieces = polyline_pieces(screen, 400.0, 300.0, num_bands=4)
+        self.assertEqual([band for band, _ in pieces], [0, 1, 2, 3])
+        for (_, previous), (_, piece) in zip(pieces[:-1], pieces[1:]):
+            self.assertEqual(previous[-2:], piece[:2])
+        self.assertEqual(pieces[-1][1][-2:], screen[-1].tolist())
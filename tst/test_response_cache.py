@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from time import time
+
+from gravity_lab.response_cache import ResponseCache
+
+URL = 'https://example.com/api'
+
+class CountingRequest():
+    # a request returning a new response per call
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, url: str, params: dict) -> str:
+        self.calls.append((url, params))
+        return f"response {len(self.calls)} for {params}"
+
+def request_lines(url: str, params: dict):
+    # a response received line by line, failing after the second line if params ask for it
+    yield "first line\n"
+    yield "second line\n"
+    if params.get('fail'):
+        raise RuntimeError("connection lost")
+    yield "last line\n"
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.request = CountingRequest()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def age_entry(self, cache: ResponseCache, params: dict, seconds: float):
+        path = os.path.join(cache.directory, ResponseCache.key(URL, params) + '.txt')
+        stored_time = time() - seconds
+        os.utime(path, (stored_time, stored_time))
+
+    def test_hit_skips_the_request(self):
+        cache = ResponseCache(self.directory.name)
+        first = cache.fetch(URL, {'COMMAND': 399, 'format': 'text'}, self.request)
+        # the order of the params does not matter, and values are compared as strings
+        second = cache.fetch(URL, {'format': 'text', 'COMMAND': '399'}, self.request)
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.request.calls), 1)
+
+        cache.fetch(URL, {'COMMAND': 499, 'format': 'text'}, self.request)
+        self.assertEqual(len(self.request.calls), 2)
+
+    def test_expired_entry_is_fetched_again(self):
+        cache = ResponseCache(self.directory.name, ttl_seconds=60.0)
+        params = {'COMMAND': 399}
+        first = cache.fetch(URL, params, self.request)
+        self.age_entry(cache, params, 30.0)
+        self.assertEqual(cache.fetch(URL, params, self.request), first)
+
+        self.age_entry(cache, params, 90.0)
+        self.assertIsNone(cache.get(URL, params))
+        refetched = cache.fetch(URL, params, self.request)
+        self.assertNotEqual(refetched, first)
+        self.assertEqual(len(self.request.calls), 2)
+        # the refetched response is stored again
+        self.assertEqual(cache.get(URL, params), refetched)
+
+    def test_offline_entries_never_expire(self):
+        params = {'COMMAND': 399}
+        cached = ResponseCache(self.directory.name, ttl_seconds=60.0).fetch(URL, params, self.request)
+        offline_cache = ResponseCache(self.directory.name, ttl_seconds=60.0, offline=True)
+        self.age_entry(offline_cache, params, 90.0)
+        self.assertEqual(offline_cache.fetch(URL, params, self.request), cached)
+        with self.assertRaises(RuntimeError):
+            offline_cache.fetch(URL, {'COMMAND': 499}, self.request)
+        self.assertEqual(len(self.request.calls), 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(self.directory.name, max_bytes=100)
+        for command in range(3):
+            cache.fetch(URL, {'COMMAND': command}, self.request)
+            # entries are ordered by their access time
+            self.age_entry(cache, {'COMMAND': command}, 100.0 - command)
+        cache.get(URL, {'COMMAND': 0})
+        cache.fetch(URL, {'COMMAND': 3}, self.request)
+        self.assertIsNotNone(cache.get(URL, {'COMMAND': 0}))
+        self.assertIsNone(cache.get(URL, {'COMMAND': 1}))
+        self.assertIsNotNone(cache.get(URL, {'COMMAND': 3}))
+
+    def test_streamed_response_is_cached_when_read_to_the_end(self):
+        cache = ResponseCache(self.directory.name)
+        lines = cache.fetch_lines(URL, {'COMMAND': 399}, request_lines)
+        self.assertEqual(next(lines), "first line\n")
+        # the response is not cached while it is received
+        self.assertIsNone(cache.get(URL, {'COMMAND': 399}))
+        self.assertEqual(list(lines), ["second line\n", "last line\n"])
+        self.assertEqual(cache.get(URL, {'COMMAND': 399}), "first line\nsecond line\nlast line\n")
+
+        # a hit is read from the cache file
+        self.assertEqual(list(cache.fetch_lines(URL, {'COMMAND': 399}, self.request)), ["first line\n", "second line\n", "last line\n"])
+        self.assertEqual(self.request.calls, [])
+
+    def test_partial_responses_are_not_cached(self):
+        cache = ResponseCache(self.directory.name)
+        lines = cache.fetch_lines(URL, {'COMMAND': 399}, request_lines)
+        next(lines)
+        lines.close()
+        with self.assertRaises(RuntimeError):
+            list(cache.fetch_lines(URL, {'COMMAND': 399, 'fail': True}, request_lines))
+
+        self.assertIsNone(cache.get(URL, {'COMMAND': 399}))
+        self.assertIsNone(cache.get(URL, {'COMMAND': 399, 'fail': True}))
+        # no temporary files are left behind
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -0,0 +1,95 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.gravity_model import ModelRunner
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.spatial_index import UniformGridIndex
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+class UniformGridIndexTest(unittest.TestCase):
+    # every query is compared with a brute force search of all the points
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        # clustered points, so some cells hold many points and most hold none
+        centers = rng.uniform(-100.0, 100.0, size=(10, 3))
+        self.positions = (centers[rng.integers(0, 10, size=2000)] + rng.normal(scale=3.0, size=(2000, 3)))
+        self.index = UniformGridIndex(self.positions, cell_size=2.0)
+        self.query_points = np.concatenate([self.positions[:5] + 0.1, rng.uniform(-120.0, 120.0, size=(5, 3))])
+
+    def test_within_radius(self):
+        for point in self.query_points:
+            for radius in (0.5, 2.0, 7.5):
+                expected = np.flatnonzero(np.linalg.norm(self.positions - point, axis=1) <= radius)
+                np.testing.assert_array_equal(self.index.within_radius(point, radius), expected)
+
+    def test_within_box(self):
+        for point in self.query_points:
+            low, high = point - [1.0, 4.0, 0.5], point + [3.0, 2.0, 6.0]
+            expected = np.flatnonzero(np.all((self.positions >= low) & (self.positions <= high), axis=1))
+            np.testing.assert_array_equal(self.index.within_box(low, high), expected)
+
+    def test_nearest(self):
+        for point in self.query_points:
+            distances = np.linalg.norm(self.positions - point, axis=1)
+            for k in (1, 5, 50):
+                np.testing.assert_array_equal(self.index.nearest(point, k), np.argsort(distances, kind='stable')[:k])
+            max_distance = 4.0
+            within = np.flatnonzero(distances <= max_distance)
+            expected = within[np.argsort(distances[within], kind='stable')][:10]
+            np.testing.assert_array_equal(self.index.nearest(point, 10, max_distance), expected)
+
+    def test_pairs_within(self):
+        radius = 1.5
+        r_vecs = self.positions[:, None, :] - self.positions[None, :, :]
+        first, second = np.nonzero(np.triu(np.einsum('ijk,ijk->ij', r_vecs, r_vecs) <= radius * radius, k=1))
+        np.testing.assert_array_equal(self.index.pairs_within(radius), np.stack([first, second], axis=1))
+
+    def test_pairs_within_more_than_the_cell_size_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.index.pairs_within(3.0)
+
+    def test_update_matches_a_new_index(self):
+        rng = np.random.default_rng(2)
+        for scale in (0.1, 1.0, 20.0):
+            # small moves are updated incrementally, large ones sort all the points again
+            self.positions = self.positions + rng.normal(scale=scale, size=self.positions.shape)
+            self.index.update(self.positions)
+            rebuilt_index = UniformGridIndex(self.positions, cell_size=2.0)
+            np.testing.assert_array_equal(self.index.sorted_keys, rebuilt_index.sorted_keys)
+            self.test_within_radius()
+            self.test_pairs_within()
+
+    def test_far_and_2d_points(self):
+        # the cells of points this far from the origin are clipped
+        positions = np.array([[0.0, 0.0], [1e20, -1e20], [0.5, 0.5], [-1e20, 1e20]])
+        index = UniformGridIndex(positions, cell_size=1.0)
+        np.testing.assert_array_equal(index.within_radius([0.0, 0.0], 1.0), [0, 2])
+        np.testing.assert_array_equal(index.nearest([1e20, -1e20], 1), [1])
+
+class ModelIndexTest(unittest.TestCase):
+    def test_runner_refreshes_the_index(self):
+        for model_type in (NewtonianMechanicsModel, VectorizedNewtonianMechanicsModel):
+            with self.subTest(model=model_type.__name__):
+                rng = np.random.default_rng(1)
+                # objects moving by many cells per step
+                objects = [PointParticle(1e20, Vector(position.tolist()), Vector(velocity.tolist())) for position, velocity in
+                    zip(rng.normal(scale=1e9, size=(50, 3)), rng.normal(scale=1e5, size=(50, 3)))]
+                model = model_type(CartesianCoordinateSystem(3), objects)
+                model.index_objects(cell_size=1e8)
+
+                def check_queries(step_index: int) -> bool:
+                    positions = np.array([object.coordinate.components for object in model.objects])
+                    for i, object in enumerate(model.objects):
+                        self.assertIs(model.coordinate_system.at_coordinate(positions[i], max_distance=1.0), object)
+                    center = positions[0]
+                    expected = [object for object, distance in zip(model.objects, np.linalg.norm(positions - center, axis=1))
+                        if distance <= 5e8]
+                    self.assertEqual(model.coordinate_system.objects_within(center, 5e8), expected)
+                    return False
+
+                self.assertEqual(ModelRunner(model).run(5, 3600.0, check_queries), 5)
+                self.assertEqual(model.coordinate_system.object_index.cell_size, 1e8)
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import NewtonianMechanicsModel
+from gravity_lab.point_particle import PointParticle, TestParticle
+from gravity_lab.vectorized_newtonian_mechanics_model import VectorizedNewtonianMechanicsModel
+
+DURATION = 1000 * 3600.0
+
+def initial_objects() -> list[PointParticle]:
+    # a few stars and a test particle close enough to each other to bend their paths within DURATION
+    rng = np.random.default_rng(3)
+    objects = [PointParticle(float(mass), Vector(position.tolist()), Vector(velocity.tolist())) for mass, position, velocity in
+        zip(rng.uniform(1e29, 1e30, 6), rng.normal(scale=1e11, size=(6, 3)), rng.normal(scale=1e4, size=(6, 3)))]
+    objects.append(TestParticle(Vector([2e11, 0.0, 0.0]), Vector([0.0, 1e4, 0.0])))
+    return objects
+
+def trajectory_difference(softening_length: float, num_steps: int) -> float:
+    # largest distance between the objects of the two models after DURATION, relative to the largest distance
+    # an object moved
+    loop_model = NewtonianMechanicsModel(CartesianCoordinateSystem(3), initial_objects(), softening_length)
+    vectorized_model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), initial_objects(), softening_length=softening_length)
+    start_positions = np.array([object.coordinate.components for object in loop_model.objects])
+    for _ in range(num_steps):
+        loop_model.step(DURATION / num_steps)
+        vectorized_model.step(DURATION / num_steps)
+
+    loop_positions = np.array([object.coordinate.components for object in loop_model.objects])
+    np.testing.assert_array_equal(vectorized_model.positions, [object.coordinate.components for object in vectorized_model.objects])
+    return np.abs(loop_positions - vectorized_model.positions).max() / np.abs(loop_positions - start_positions).max()
+
+class VectorizedModelTest(unittest.TestCase):
+    # The loop of NewtonianMechanicsModel is a first order (semi-implicit Euler) step and the vectorized model steps with
+    # leapfrog, so their trajectories agree up to the error of the loop model, which halves with the step
+    def assert_same_trajectories(self, softening_length: float):
+        coarse_difference = trajectory_difference(softening_length, 500)
+        fine_difference = trajectory_difference(softening_length, 1000)
+        self.assertLess(fine_difference, 0.02)
+        self.assertLess(fine_difference, 0.6 * coarse_difference)
+
+    def test_same_trajectories_as_the_loop_model(self):
+        self.assert_same_trajectories(0.0)
+
+    def test_same_softened_trajectories_as_the_loop_model(self):
+        self.assert_same_trajectories(5e10)
+
+    def test_objects_added_between_steps(self):
+        model = VectorizedNewtonianMechanicsModel(CartesianCoordinateSystem(3), initial_objects()[:3])
+        model.step(3600.0)
+        # the state arrays follow self.objects, e.g. objects added by the UI, and the objects view the arrays
+        model.objects.append(initial_objects()[3])
+        model.step(3600.0)
+        self.assertEqual(model.positions.shape, (4, 3))
+        np.testing.assert_array_equal(model.objects[3].coordinate.components, model.positions[3])
+        np.testing.assert_array_equal(model.objects[3].velocity.components, model.velocities[3])
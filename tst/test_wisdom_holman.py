@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from gravity_lab.cartesian_coordinate_system import CartesianCoordinateSystem
+from gravity_lab.math import Vector
+from gravity_lab.newtonian_mechanics_model import gravitational_constant
+from gravity_lab.point_particle import PointParticle
+from gravity_lab.wisdom_holman_model import WisdomHolmanModel
+
+CENTRAL_MASS = 2e30
+ORBIT_RADIUS = 1.5e11
+ANGULAR_VELOCITY = np.sqrt(gravitational_constant * CENTRAL_MASS / ORBIT_RADIUS ** 3)
+PERIOD = 2.0 * np.pi / ANGULAR_VELOCITY
+
+def orbit_positions(num_steps: int, softening_length: float = 0.0) -> np.ndarray:
+    # positions of a central object and a planet on a circular orbit around it after one period
+    speed = ORBIT_RADIUS * ANGULAR_VELOCITY
+    objects = [PointParticle(CENTRAL_MASS, Vector([0.0, 0.0]), Vector([0.0, 0.0])),
+        PointParticle(1e10, Vector([ORBIT_RADIUS, 0.0]), Vector([0.0, speed]))]
+    model = WisdomHolmanModel(CartesianCoordinateSystem(2), objects, softening_length=softening_length)
+    for _ in range(num_steps):
+        model.step(PERIOD / num_steps)
+    return model.positions.copy()
+
+class WisdomHolmanModelTest(unittest.TestCase):
+    def test_two_body_orbit_is_exact_with_large_steps(self):
+        # without other objects the kepler drift is the whole step, 4 steps per period close the orbit
+        positions = orbit_positions(4)
+        np.testing.assert_allclose(positions[1] - positions[0], [ORBIT_RADIUS, 0.0], rtol=0.0, atol=1e-6 * ORBIT_RADIUS)
+
+    def test_central_force_is_not_softened(self):
+        # the kepler drift is exact, softening only changes the forces between the orbiting objects
+        np.testing.assert_allclose(orbit_positions(64, softening_length=0.1 * ORBIT_RADIUS), orbit_positions(64), rtol=0.0,
+            atol=1e-9 * ORBIT_RADIUS)